@@ -0,0 +1,65 @@
+# compares R data.frame -> pandas transfer through Arrow with the pandas2ri
+# converter on token-shaped R tables, each run in a fresh process so peak RSS
+# belongs to one path only; needs R, rpy2-arrow and the R arrow package
+#
+#   pip install -e .[arrow] && python benchmarks/arrow_transfer.py --rows 100000 1000000
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+
+#an R data.frame shaped like get_tokens output, built inside R
+MAKE_TOKENS = """
+function(n) {
+  words <- c("ball", "dog", "the", "mommy", "juice", "up", "no", "more")
+  pos <- c("n", "v", "det", "pro", "adj", "adv")
+  gloss <- sample(words, n, TRUE)
+  stem <- gloss
+  stem[sample.int(n, n %/% 5)] <- NA
+  data.frame(id = seq_len(n), gloss = gloss, stem = stem,
+             part_of_speech = sample(pos, n, TRUE),
+             speaker_role = sample(c("Target_Child", "Mother", "Father"), n, TRUE),
+             corpus_name = sample(sprintf("Corpus%d", 1:50), n, TRUE),
+             transcript_id = sample.int(10000L, n, TRUE),
+             target_child_age = runif(n, 12, 60),
+             stringsAsFactors = FALSE)
+}
+"""
+
+def measure(path, rows):
+    '''
+    Time one conversion in this process and report it with the peak RSS
+    '''
+    import childespy.childespy as cp
+    r_df = cp._r().ro.r(MAKE_TOKENS)(rows)
+    cp.set_arrow_transfer(enabled=(path == "arrow"))
+    start = time.perf_counter()
+    df = cp.convert_r_na(cp.r_df_to_pandas(r_df))
+    elapsed = time.perf_counter() - start
+    #ru_maxrss is in kilobytes on Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return({"path": path, "rows": rows, "seconds": elapsed, "peak_rss_bytes": peak,
+            "result_bytes": int(df.memory_usage(deep=True).sum())})
+
+def run(sizes):
+    results = []
+    for rows in sizes:
+        for path in ["pandas2ri", "arrow"]:
+            out = subprocess.run([sys.executable, __file__, "--measure", path, "--rows", str(rows)],
+                                 check=True, capture_output=True, text=True).stdout
+            results.append(json.loads(out.strip().splitlines()[-1]))
+    return(results)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark R to pandas transfer")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--measure", choices=["pandas2ri", "arrow"])
+    args = parser.parse_args()
+    if args.measure:
+        print(json.dumps(measure(args.measure, args.rows[0])))
+    else:
+        for result in run(args.rows):
+            print(json.dumps(result))
@@ -0,0 +1,81 @@
+# compares convert_r_vector with the element-wise np.issubdtype checks it
+# replaced, on filter lists of growing size; without R both run against
+# stand-in vector constructors so only the type inference is measured
+#
+#   pip install -e . && python benchmarks/convert_args.py --sizes 100 10000 1000000
+
+import argparse
+import json
+import time
+import types
+
+import numpy as np
+
+import childespy.childespy as cp
+
+def r_namespace():
+    '''
+    The rpy2 objects convert_r_vector uses, or stand-ins of the same shape without R
+    '''
+    try:
+        return(cp._r(), True)
+    except ImportError:
+        return(types.SimpleNamespace(StrVector=list, FloatVector=list, BoolVector=list,
+                                     ListVector=dict, rinterface=types.SimpleNamespace(NULL=None)),
+               False)
+
+def legacy_convert_r_vector(python_input, r):
+    if python_input == None:
+        return(r.rinterface.NULL)
+    if np.issubdtype(type(python_input), bool):
+        r_vec = r.BoolVector([python_input])
+    elif np.issubdtype(type(python_input), list):
+        if type(python_input) == dict:
+            r_vec = r.ListVector(python_input)
+        elif all(np.issubdtype(type(x), str) for x in python_input):
+            r_vec = r.StrVector(python_input)
+        elif all(np.issubdtype(type(x), int) for x in python_input):
+            r_vec = r.FloatVector(python_input)
+        elif all(np.issubdtype(type(x), float) for x in python_input):
+            r_vec = r.FloatVector(python_input)
+        else:
+            raise TypeError(python_input)
+    elif np.issubdtype(type(python_input), str):
+        r_vec = r.StrVector([python_input])
+    elif np.issubdtype(type(python_input), float) or np.issubdtype(type(python_input), int):
+        r_vec = r.FloatVector([python_input])
+    else:
+        raise TypeError(type(python_input))
+    return(r_vec)
+
+def best_of(function, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return(min(times))
+
+def run(sizes, repeat=5):
+    r, has_r = r_namespace()
+    cp._r = lambda: r
+    results = []
+    for size in sizes:
+        inputs = {"names": [f"Child{i}" for i in range(size)],
+                  "ids": list(range(size)),
+                  "ages": [12.0 + i % 48 for i in range(size)]}
+        for name, values in inputs.items():
+            results.append({"input": name, "size": size, "r": has_r,
+                            "legacy_seconds": best_of(lambda: legacy_convert_r_vector(values, r), repeat),
+                            "list_seconds": best_of(lambda: cp.convert_r_vector(values), repeat),
+                            "array_seconds": best_of(lambda: cp.convert_r_vector(np.asarray(values)), repeat)})
+            results[-1]["speedup"] = results[-1]["legacy_seconds"] / results[-1]["list_seconds"]
+    return(results)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark R argument conversion")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10000, 1000000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    for result in run(args.sizes, args.repeat):
+        print(json.dumps(result))
@@ -0,0 +1,55 @@
+# compares FrequencyIndex lookups with the get_types + pandas aggregation they
+# replace, on a synthetic database built with benchmarks/synthetic.py
+#
+#   pip install -e . && python benchmarks/frequency_index.py --tokens 1000000
+
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import time
+
+import childespy
+from childespy import native
+
+import synthetic
+
+def mean_seconds(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return((time.perf_counter() - start) / repeat)
+
+def run(tokens, repeat=1000, directory=None):
+    directory = directory or tempfile.mkdtemp()
+    path = os.path.join(directory, f"synthetic-{tokens}.sqlite")
+    if not os.path.exists(path):
+        synthetic.build(path, tokens=tokens)
+    connection = sqlite3.connect(path)
+
+    start = time.perf_counter()
+    index = childespy.FrequencyIndex.build(connection=connection, backend="native", db_version="synthetic")
+    build_seconds = time.perf_counter() - start
+    index.save(os.path.join(directory, "frequency"))
+    index = childespy.FrequencyIndex.load(os.path.join(directory, "frequency"))
+
+    def aggregate():
+        types = native.get_types("dog", role="Mother", connection=connection)
+        types = types[(types["target_child_age"] >= 24) & (types["target_child_age"] < 36)]
+        return(int(types["count"].sum()))
+    expected = aggregate()
+    assert index.frequency("dog", role="Mother", age=[24, 36]) == expected
+    return({"tokens": tokens, "build_seconds": build_seconds,
+            "get_types_seconds": mean_seconds(aggregate, 10),
+            "frequency_seconds": mean_seconds(lambda: index.frequency("dog", role="Mother", age=[24, 36]), repeat),
+            "trajectory_seconds": mean_seconds(lambda: index.trajectory("dog", role="Mother"), repeat)})
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark FrequencyIndex lookups")
+    parser.add_argument("--tokens", type=int, nargs="+", default=[1000000])
+    parser.add_argument("--repeat", type=int, default=1000)
+    parser.add_argument("--directory", default=None)
+    args = parser.parse_args()
+    for tokens in args.tokens:
+        print(json.dumps(run(tokens, args.repeat, args.directory)))
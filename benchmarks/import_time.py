@@ -0,0 +1,50 @@
+# import-time benchmark: `import childespy` must not start R or install anything
+#
+#   python benchmarks/import_time.py --repeat 10 --max-overhead 0.25
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+import pandas
+pandas_elapsed = time.perf_counter() - start
+import childespy
+elapsed = time.perf_counter() - start
+print(elapsed, elapsed - pandas_elapsed, any(m == "rpy2" or m.startswith("rpy2.") for m in sys.modules))
+"""
+
+def time_import(repeat=10):
+    '''
+    Time `import childespy` in fresh interpreters
+
+    Returns:
+        Lists of total import times and of the time spent on top of importing
+        pandas (in seconds), and whether rpy2 was ever imported
+    '''
+    times, overheads, loaded_r = [], [], False
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", PROBE], check=True,
+                             capture_output=True, text=True).stdout.split()
+        times.append(float(out[0]))
+        overheads.append(float(out[1]))
+        loaded_r = loaded_r or out[2] == "True"
+    return(times, overheads, loaded_r)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark `import childespy`")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--max-overhead", type=float, default=0.25,
+                        help="allowed seconds on top of importing pandas")
+    args = parser.parse_args()
+    times, overheads, loaded_r = time_import(args.repeat)
+    result = {"median_seconds": statistics.median(times),
+              "median_overhead_seconds": statistics.median(overheads),
+              "rpy2_imported": loaded_r}
+    print(json.dumps(result))
+    if loaded_r or result["median_overhead_seconds"] > args.max_overhead:
+        sys.exit(1)
@@ -0,0 +1,76 @@
+# compares the column-wise R NA conversion with the old per-cell
+# np.vectorize(convert_r_to_py) pass on synthetic token-shaped frames
+#
+#   pip install -e . && python benchmarks/na_conversion.py --sizes 10000 100000 1000000
+
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from childespy.childespy import replace_na, R_NA_INTEGER
+
+def na_objects():
+    '''
+    The real rpy2 NA singletons, or stand-ins of the same kind without R
+    '''
+    try:
+        from rpy2 import rinterface
+        rinterface.initr()
+        return(rinterface.NA_Character, type(rinterface.NA_Character))
+    except ImportError:
+        class NACharacterType(str):
+            pass
+        return(NACharacterType("NA_character_"), NACharacterType)
+
+def synthetic_frame(rows, na_character, seed=0):
+    rng = np.random.default_rng(seed)
+    words = np.array(["ball", "dog", "the", "mommy", "juice", "up"], dtype=object)
+    gloss = words[rng.integers(0, len(words), rows)]
+    stem = gloss.copy()
+    stem[rng.random(rows) < 0.2] = na_character
+    #mostly missing, like replacement or error
+    replacement = gloss.copy()
+    replacement[rng.random(rows) < 0.95] = na_character
+    speaker_id = rng.integers(1, 5000, rows).astype(np.int32)
+    speaker_id[rng.random(rows) < 0.01] = R_NA_INTEGER
+    age = rng.uniform(12, 60, rows)
+    age[rng.random(rows) < 0.05] = np.nan
+    #object columns as rpy2 returns them, pandas 3 would infer its string dtype and drop the NA objects
+    return(pd.DataFrame({"id": np.arange(rows, dtype=np.int32),
+                         "gloss": pd.Series(gloss, dtype=object),
+                         "stem": pd.Series(stem, dtype=object),
+                         "replacement": pd.Series(replacement, dtype=object),
+                         "speaker_id": speaker_id, "target_child_age": age}))
+
+def best_of(function, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return(min(times))
+
+def run(sizes, repeat=3):
+    na_character, na_type = na_objects()
+    def convert_r_to_py(r_input):
+        return(None if isinstance(r_input, na_type) else r_input)
+    results = []
+    for rows in sizes:
+        df = synthetic_frame(rows, na_character)
+        vectorize = best_of(lambda: df.apply(np.vectorize(convert_r_to_py)), repeat)
+        columnwise = best_of(lambda: replace_na(df, na_values=(na_character,)), repeat)
+        results.append({"rows": rows, "np_vectorize_seconds": vectorize,
+                        "replace_na_seconds": columnwise,
+                        "speedup": vectorize / columnwise})
+    return(results)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark R NA conversion")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    for result in run(args.sizes, args.repeat):
+        print(json.dumps(result))
@@ -0,0 +1,172 @@
+# end-to-end benchmark of every query function on a synthetic childes-db
+# each case runs in a fresh process (so peak RSS belongs to it alone), calls a
+# public function `--repeat` times after a warmup and records latency
+# percentiles, throughput, rows, mean seconds per instrumentation stage and
+# peak RSS. Results go to a JSON file that --compare diffs across commits
+#
+#   pip install -e . && python benchmarks/suite.py --tokens 1000000 --output before.json
+#   python benchmarks/suite.py --tokens 1000000 --output after.json --compare before.json
+#
+# By default the synthetic SQLite file is queried through the local backend.
+# The native and r backends need a MySQL server loaded with the same tables
+# (and, for r, R with childesr installed, see `python -m childespy setup`):
+# --backend native --db-args host=... user=... password=... db_name=...
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import synthetic
+
+#case name -> (function, keyword arguments)
+CASES = {
+    "get_collections": ("get_collections", {}),
+    "get_corpora": ("get_corpora", {}),
+    "get_transcripts": ("get_transcripts", {"corpus": ["Corpus1", "Corpus2"]}),
+    "get_participants": ("get_participants", {"role": "Target_Child"}),
+    "get_speaker_statistics": ("get_speaker_statistics", {"corpus": "Corpus1"}),
+    "get_tokens": ("get_tokens", {"token": "dog", "role": "Mother"}),
+    "get_tokens_wildcard": ("get_tokens", {"token": "b%"}),
+    "get_tokens_batch": ("get_tokens_batch", {"tokens": synthetic.WORDS, "corpus": "Corpus1"}),
+    "get_types": ("get_types", {"token_type": ["dog", "ball"]}),
+    "get_utterances": ("get_utterances", {"corpus": "Corpus1", "role": "Target_Child"}),
+    "get_contexts": ("get_contexts", {"token": "juice", "corpus": "Corpus1"}),
+    "get_contexts_window": ("get_contexts", {"token": "juice", "corpus": "Corpus1", "window": [2, 2]}),
+    "get_sql_query": ("get_sql_query", {"sql_query_string":
+                                        "SELECT speaker_role, COUNT(*) AS n FROM token GROUP BY speaker_role"}),
+}
+
+def peak_rss():
+    #ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return(peak if sys.platform == "darwin" else peak * 1024)
+
+def measure(case, backend, db_args, repeat, warmup):
+    '''
+    Time one case in this process
+    '''
+    import childespy
+    function_name, kwargs = CASES[case]
+    function = getattr(childespy, function_name)
+    records = []
+    childespy.add_hook(records.append)
+    for _ in range(warmup):
+        function(backend=backend, db_args=db_args, **kwargs)
+    records.clear()
+    baseline_rss = peak_rss()
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(backend=backend, db_args=db_args, **kwargs)
+        seconds.append(time.perf_counter() - start)
+    seconds = np.array(seconds)
+    rows = len(result)
+    stages = {}
+    for record in records:
+        for name, elapsed in record["stages"].items():
+            stages[name] = stages.get(name, 0.0) + elapsed / len(records)
+    return({"case": case, "function": function_name, "backend": backend, "calls": repeat,
+            "rows": rows, "mean_seconds": float(seconds.mean()),
+            "min_seconds": float(seconds.min()), "max_seconds": float(seconds.max()),
+            "p50_seconds": float(np.percentile(seconds, 50)),
+            "p90_seconds": float(np.percentile(seconds, 90)),
+            "p99_seconds": float(np.percentile(seconds, 99)),
+            "calls_per_second": float(1 / seconds.mean()),
+            "rows_per_second": float(rows / seconds.mean()),
+            "stage_seconds": stages,
+            "peak_rss_bytes": peak_rss(), "baseline_peak_rss_bytes": baseline_rss})
+
+def git_commit():
+    try:
+        return(subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return(None)
+
+def run(tokens, cases, backend="local", db_args=None, repeat=20, warmup=2, directory=None):
+    '''
+    Build (or reuse) the synthetic database and run every case in its own process
+
+    Returns:
+        A dictionary with the run settings under "meta" and one result per case under "results"
+    '''
+    if db_args is None:
+        directory = directory or tempfile.gettempdir()
+        path = os.path.join(directory, f"childespy-synthetic-{tokens}.sqlite")
+        if not os.path.exists(path):
+            start = time.perf_counter()
+            synthetic.build(path, tokens=tokens, corpora=max(10, tokens // 200000), indexes=True)
+            print(f"built {path} in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+        db_args = {"path": path}
+    results = []
+    for case in cases:
+        out = subprocess.run([sys.executable, __file__, "--measure", case, "--backend", backend,
+                              "--db-args-json", json.dumps(db_args), "--repeat", str(repeat),
+                              "--warmup", str(warmup)],
+                             check=True, capture_output=True, text=True).stdout
+        results.append(json.loads(out.strip().splitlines()[-1]))
+        print(f"{case}: p50 {results[-1]['p50_seconds'] * 1000:.1f}ms, {results[-1]['rows']} rows",
+              file=sys.stderr)
+    meta = {"tokens": tokens, "backend": backend, "repeat": repeat, "warmup": warmup,
+            "commit": git_commit(), "python": platform.python_version(),
+            "platform": platform.platform(), "machine": platform.machine(),
+            "created": datetime.datetime.now(datetime.timezone.utc).isoformat()}
+    return({"meta": meta, "results": results})
+
+def compare(before, after):
+    '''
+    Rows of p50 latency and peak RSS for each case in both runs, with the after/before ratio
+    '''
+    old = {result["case"]: result for result in before["results"]}
+    rows = []
+    for result in after["results"]:
+        if result["case"] in old:
+            previous = old[result["case"]]
+            rows.append({"case": result["case"],
+                         "p50_before_seconds": previous["p50_seconds"],
+                         "p50_after_seconds": result["p50_seconds"],
+                         "p50_ratio": result["p50_seconds"] / previous["p50_seconds"],
+                         "peak_rss_ratio": result["peak_rss_bytes"] / previous["peak_rss_bytes"]})
+    return(rows)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the childespy query functions")
+    parser.add_argument("--tokens", type=int, default=1000000)
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), default=list(CASES))
+    parser.add_argument("--backend", choices=["local", "native", "r"], default="local")
+    parser.add_argument("--db-args", nargs="+", default=None, metavar="KEY=VALUE",
+                        help="connection settings of a database loaded with the synthetic tables")
+    parser.add_argument("--db-args-json", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--directory", default=None, help="where to keep the synthetic database")
+    parser.add_argument("--output", default=None, help="JSON file for the results")
+    parser.add_argument("--compare", default=None, help="JSON file of an earlier run to compare with")
+    parser.add_argument("--measure", choices=sorted(CASES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.measure:
+        print(json.dumps(measure(args.measure, args.backend, json.loads(args.db_args_json),
+                                 args.repeat, args.warmup)))
+        sys.exit()
+    if args.backend != "local" and not args.db_args:
+        parser.error(f"--backend {args.backend} needs --db-args of a MySQL server loaded with the synthetic tables")
+    db_args = dict(arg.split("=", 1) for arg in args.db_args) if args.db_args else None
+    report = run(args.tokens, args.cases, args.backend, db_args, args.repeat, args.warmup, args.directory)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    if args.compare:
+        with open(args.compare) as f:
+            for row in compare(json.load(f), report):
+                print(json.dumps(row))
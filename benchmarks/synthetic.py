@@ -0,0 +1,156 @@
+# builds a synthetic childes-db-shaped SQLite database for local benchmarks
+# and native backend checks, no network or R needed
+#
+#   python benchmarks/synthetic.py childes.sqlite --tokens 1000000
+
+import argparse
+import random
+import sqlite3
+
+SCHEMA = """
+CREATE TABLE collection (id INTEGER PRIMARY KEY, name TEXT);
+CREATE TABLE corpus (id INTEGER PRIMARY KEY, name TEXT, collection_id INTEGER,
+    collection_name TEXT);
+CREATE TABLE transcript (id INTEGER PRIMARY KEY, language TEXT, date TEXT,
+    filename TEXT, corpus_id INTEGER, corpus_name TEXT, collection_id INTEGER,
+    collection_name TEXT, target_child_id INTEGER, target_child_name TEXT,
+    target_child_age REAL, target_child_sex TEXT, pid TEXT);
+CREATE TABLE participant (id INTEGER PRIMARY KEY, code TEXT, name TEXT, role TEXT,
+    language TEXT, sex TEXT, min_age REAL, max_age REAL, corpus_id INTEGER,
+    corpus_name TEXT, collection_id INTEGER, collection_name TEXT,
+    target_child_id INTEGER, target_child_name TEXT);
+CREATE TABLE transcript_by_speaker (id INTEGER PRIMARY KEY, speaker_id INTEGER,
+    transcript_id INTEGER, num_utterances INTEGER, num_tokens INTEGER,
+    num_types INTEGER, mlu REAL, language TEXT, speaker_code TEXT,
+    speaker_role TEXT, corpus_id INTEGER, corpus_name TEXT, collection_id INTEGER,
+    collection_name TEXT, target_child_id INTEGER, target_child_name TEXT,
+    target_child_age REAL, target_child_sex TEXT);
+CREATE TABLE utterance (id INTEGER PRIMARY KEY, gloss TEXT, stem TEXT,
+    part_of_speech TEXT, type TEXT, language TEXT, num_tokens INTEGER,
+    utterance_order INTEGER, speaker_id INTEGER, speaker_code TEXT,
+    speaker_role TEXT, transcript_id INTEGER, corpus_id INTEGER, corpus_name TEXT,
+    collection_id INTEGER, collection_name TEXT, target_child_id INTEGER,
+    target_child_name TEXT, target_child_age REAL, target_child_sex TEXT);
+CREATE TABLE token (id INTEGER PRIMARY KEY, gloss TEXT, replacement TEXT,
+    stem TEXT, part_of_speech TEXT, token_order INTEGER, language TEXT,
+    utterance_type TEXT, utterance_id INTEGER, speaker_id INTEGER,
+    speaker_code TEXT, speaker_role TEXT, transcript_id INTEGER,
+    corpus_id INTEGER, corpus_name TEXT, collection_id INTEGER,
+    collection_name TEXT, target_child_id INTEGER, target_child_name TEXT,
+    target_child_age REAL, target_child_sex TEXT);
+CREATE TABLE token_frequency (id INTEGER PRIMARY KEY, gloss TEXT, count INTEGER,
+    language TEXT, speaker_id INTEGER, speaker_role TEXT, transcript_id INTEGER,
+    corpus_id INTEGER, corpus_name TEXT, collection_id INTEGER,
+    collection_name TEXT, target_child_id INTEGER, target_child_name TEXT,
+    target_child_age REAL, target_child_sex TEXT);
+"""
+
+WORDS = ["ball", "dog", "mommy", "daddy", "the", "a", "cat", "no", "more",
+         "juice", "up", "go", "want", "that", "is", "what", "see", "car",
+         "baby", "book", "eat", "milk", "yes", "hi", "bye"]
+POS = ["n", "v", "det", "pro", "adj", "adv", "co"]
+ROLES = ["Target_Child", "Mother", "Father", "Investigator", "Sibling"]
+
+#the indexes childespy.local builds in snapshots, kept here so the script runs without childespy
+INDEXED_COLUMNS = [("collection_name",), ("corpus_name",), ("target_child_name",),
+                   ("speaker_role",), ("language",), ("target_child_age",),
+                   ("transcript_id",), ("utterance_id",), ("gloss",), ("stem",),
+                   ("part_of_speech",), ("transcript_id", "utterance_order")]
+
+def create_indexes(db):
+    '''
+    Index the columns childes-db queries filter and join on, as snapshots do
+    '''
+    for table in [row[0] for row in db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]:
+        columns = {row[1] for row in db.execute(f"PRAGMA table_info({table})")}
+        for index_columns in INDEXED_COLUMNS:
+            if set(index_columns) <= columns:
+                db.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{'_'.join(index_columns)} "
+                           f"ON {table} ({', '.join(index_columns)})")
+
+def build(path, tokens=100000, corpora=10, children_per_corpus=3,
+          transcripts_per_child=5, tokens_per_utterance=4, seed=0, indexes=False):
+    '''
+    Write a synthetic childes-db to `path` with roughly `tokens` token rows, indexed like a snapshot if `indexes`
+    '''
+    rng = random.Random(seed)
+    db = sqlite3.connect(path)
+    db.executescript(SCHEMA)
+    collections = [(1, "Eng-NA", "eng"), (2, "French", "fra")]
+    db.executemany("INSERT INTO collection VALUES (?, ?)", [c[:2] for c in collections])
+
+    num_transcripts = corpora * children_per_corpus * transcripts_per_child
+    utterances_per_transcript = max(1, tokens // (num_transcripts * tokens_per_utterance))
+    transcript_id = participant_id = utterance_id = token_id = stat_id = 0
+    for corpus_id in range(1, corpora + 1):
+        collection_id, collection_name, language = collections[corpus_id % len(collections)]
+        corpus_name = f"Corpus{corpus_id}"
+        db.execute("INSERT INTO corpus VALUES (?, ?, ?, ?)",
+                   (corpus_id, corpus_name, collection_id, collection_name))
+        for child in range(children_per_corpus):
+            sex = rng.choice(["male", "female"])
+            child_name = f"Child{corpus_id}_{child}"
+            base = (corpus_id, corpus_name, collection_id, collection_name)
+            speakers = []
+            for role in ROLES[:3]:
+                participant_id += 1
+                speakers.append((participant_id, role[:3].upper(), role))
+                db.execute("INSERT INTO participant VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                           (participant_id, role[:3].upper(), child_name if role == "Target_Child" else role,
+                            role, language, sex if role == "Target_Child" else None,
+                            12.0, 12.0 + 6 * transcripts_per_child, *base,
+                            speakers[0][0], child_name))
+            target_child_id = speakers[0][0]
+            for visit in range(transcripts_per_child):
+                transcript_id += 1
+                age = 12.0 + 6 * visit + rng.random()
+                child = (target_child_id, child_name, age, sex)
+                db.execute("INSERT INTO transcript VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                           (transcript_id, language, "2000-01-01", f"{child_name}/{visit}.cha",
+                            *base, *child, None))
+                utterances, token_rows, counts = [], [], {}
+                for order in range(utterances_per_transcript):
+                    utterance_id += 1
+                    speaker_id, code, role = rng.choice(speakers)
+                    words = [rng.choice(WORDS) for _ in range(tokens_per_utterance)]
+                    pos = [rng.choice(POS) for _ in words]
+                    speaker = (speaker_id, code, role, transcript_id, *base, *child)
+                    utterances.append((utterance_id, " ".join(words), " ".join(words),
+                                       " ".join(pos), "declarative", language,
+                                       len(words), order, *speaker))
+                    for token_order, (word, tag) in enumerate(zip(words, pos)):
+                        token_id += 1
+                        replacement = "doggie" if word == "dog" and rng.random() < 0.1 else None
+                        token_rows.append((token_id, word, replacement, word, tag,
+                                           token_order, language, "declarative",
+                                           utterance_id, *speaker))
+                        counts[(word, speaker)] = counts.get((word, speaker), 0) + 1
+                db.executemany("INSERT INTO utterance VALUES (" + ", ".join("?" * 20) + ")", utterances)
+                db.executemany("INSERT INTO token VALUES (" + ", ".join("?" * 21) + ")", token_rows)
+                for (word, speaker), count in counts.items():
+                    stat_id += 1
+                    db.execute("INSERT INTO token_frequency VALUES (" + ", ".join("?" * 15) + ")",
+                               (stat_id, word, count, language, speaker[0], speaker[2], *speaker[3:]))
+                for speaker_id, code, role in speakers:
+                    said = [u for u in utterances if u[8] == speaker_id]
+                    db.execute("INSERT INTO transcript_by_speaker VALUES (" + ", ".join("?" * 18) + ")",
+                               (speaker_id * 100000 + transcript_id, speaker_id, transcript_id,
+                                len(said), len(said) * tokens_per_utterance,
+                                len({w for u in said for w in u[1].split()}),
+                                float(tokens_per_utterance), language, code, role,
+                                *base, *child))
+    if indexes:
+        create_indexes(db)
+    db.commit()
+    db.close()
+    return(path)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a synthetic childes-db SQLite file")
+    parser.add_argument("path")
+    parser.add_argument("--tokens", type=int, default=100000)
+    parser.add_argument("--corpora", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--indexes", action="store_true", help="index the filter columns like a snapshot")
+    args = parser.parse_args()
+    build(args.path, tokens=args.tokens, corpora=args.corpora, seed=args.seed, indexes=args.indexes)
@@ -1 +1,10 @@
 from .childespy import *
+from .cache import enable_cache, disable_cache, cache_stats, invalidate_cache, ResultCache
+from .session import ChildesSession, ConnectionPool
+from .parallel import parallel_query
+from .local import snapshot, register_snapshot, sync
+from .instrument import stats, reset_stats, add_hook, remove_hook
+from .lazy import LazyQuery, tokens, utterances, types, transcripts, table
+from .frequency import FrequencyIndex
+from .metadata import MetadataCache, get_metadata, set_metadata_ttl, refresh_metadata, set_name_validation
+from .shared import SharedResult, open_result
@@ -0,0 +1,19 @@
+# command line entry point: `python -m childespy setup`
+import argparse
+
+from .childespy import setup
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m childespy")
+    commands = parser.add_subparsers(dest="command", required=True)
+    setup_parser = commands.add_parser("setup", help="install the R packages childespy needs")
+    setup_parser.add_argument("--reinstall", action="store_true",
+                              help="reinstall packages that are already installed")
+    setup_parser.add_argument("--arrow", action="store_true",
+                              help="also install the R arrow package for Arrow transfer")
+    args = parser.parse_args(argv)
+    if args.command == "setup":
+        setup(reinstall=args.reinstall, arrow=args.arrow)
+
+if __name__ == "__main__":
+    main()
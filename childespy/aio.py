@@ -0,0 +1,195 @@
+# asyncio versions of the query functions
+# calls are handed to worker threads (native and local backends, sharing a
+# session's connection pool) or worker processes (the R backend, one embedded R
+# per process, since R can only be called from one thread), so an event loop
+# never blocks and concurrent small queries overlap their network latency:
+#
+#   async with childespy.aio.AsyncClient(backend="native", workers=8) as client:
+#       results = await asyncio.gather(*[client.get_corpora(db_version=v) for v in versions])
+
+import asyncio
+import concurrent.futures
+import functools
+import multiprocessing
+import threading
+import weakref
+
+from . import childespy
+from . import parallel
+from .session import ChildesSession, QUERY_FUNCTIONS
+
+class AsyncClient:
+    '''
+    Runs the query functions in a worker pool and awaits them from asyncio
+
+    At most `max_concurrency` calls are handed to the pool at once, the rest
+    wait without holding a worker. A call that times out or is cancelled
+    while waiting never runs; one that already runs finishes in its worker
+    and its result is discarded.
+
+    Args:
+        db_version: String of the name of the database version to use (default "current")
+        db_args: Dict with host, user, and password defined (default None)
+        backend: String naming the query backend, "r", "native" or "local" (default None, see `set_backend`)
+        executor: "thread", "process" or "auto", processes for the R backend and threads otherwise (default "auto")
+        workers: The number of worker threads or processes, forced to 1 for R in threads (default 4)
+        max_concurrency: The maximum number of calls running or queued in the pool (default None, `workers`)
+        timeout: Seconds after which a call raises asyncio.TimeoutError, None to wait forever (default None)
+    '''
+    def __init__(self, db_version="current", db_args=None, backend=None, executor="auto",
+                 workers=4, max_concurrency=None, timeout=None):
+        self.backend = backend or childespy.get_backend()
+        if executor == "auto":
+            executor = "process" if childespy._backends[self.backend] is None else "thread"
+        if executor not in ("thread", "process"):
+            raise ValueError(f"Unknown executor {executor!r}, expected 'thread', 'process' or 'auto'")
+        if executor == "thread" and childespy._backends[self.backend] is None:
+            #the embedded R is not thread-safe, keep every call on one thread
+            workers = 1
+        self.executor = executor
+        self.workers = workers
+        self.max_concurrency = max_concurrency or workers
+        self.timeout = timeout
+        if executor == "thread":
+            self._session = ChildesSession(db_version, db_args, self.backend, pool_size=workers)
+            self._pool = concurrent.futures.ThreadPoolExecutor(workers, thread_name_prefix="childespy")
+        else:
+            self._session = None
+            self._pool = concurrent.futures.ProcessPoolExecutor(
+                workers, mp_context=multiprocessing.get_context("spawn"),
+                initializer=parallel._init_worker, initargs=(db_version, db_args, self.backend))
+        #one semaphore per event loop, asyncio primitives are bound to a loop
+        self._semaphores = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        #submitted calls not yet finished, cancelled on close
+        self._futures = set()
+
+    def _semaphore(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if loop not in self._semaphores:
+                self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+            return(self._semaphores[loop])
+
+    async def run(self, function_name, *args, timeout=None, **kwargs):
+        '''
+        Await `function_name(*args, **kwargs)` run in the pool
+
+        Args:
+            function_name: The name of a query function, e.g. "get_tokens"
+            timeout: Seconds for this call, overriding the client's (default None)
+        '''
+        if function_name not in QUERY_FUNCTIONS:
+            raise ValueError(f"{function_name} cannot be run asynchronously")
+        timeout = self.timeout if timeout is None else timeout
+        return(await asyncio.wait_for(self._run(function_name, args, kwargs), timeout))
+
+    async def _run(self, function_name, args, kwargs):
+        async with self._semaphore():
+            if self._session is not None:
+                call = functools.partial(getattr(self._session, function_name), *args, **kwargs)
+                future = self._pool.submit(call)
+            else:
+                if args:
+                    raise TypeError("Pass query arguments by keyword when running in processes")
+                future = self._pool.submit(parallel._run_part, function_name, kwargs)
+            with self._lock:
+                self._futures.add(future)
+            future.add_done_callback(self._forget)
+            try:
+                return(await asyncio.wrap_future(future))
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+
+    def _forget(self, future):
+        with self._lock:
+            self._futures.discard(future)
+
+    def _cancel_pending(self):
+        #calls still queued in the pool never start, like shutdown(cancel_futures=True) on python 3.9+
+        with self._lock:
+            futures = list(self._futures)
+        for future in futures:
+            future.cancel()
+
+    def close(self):
+        '''
+        Stop the workers, dropping queued calls, and close the session's connections
+        '''
+        self._cancel_pending()
+        self._pool.shutdown(wait=False)
+        if self._session is not None:
+            self._session.close()
+
+    async def aclose(self):
+        '''
+        Close the client, waiting for running calls to finish without blocking the event loop
+        '''
+        await asyncio.get_running_loop().run_in_executor(None, self._shutdown)
+
+    def _shutdown(self):
+        self._cancel_pending()
+        self._pool.shutdown(wait=True)
+        if self._session is not None:
+            self._session.close()
+
+    async def __aenter__(self):
+        return(self)
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+def _client_method(name):
+    function = getattr(childespy, name)
+
+    async def method(self, *args, **kwargs):
+        return(await self.run(name, *args, **kwargs))
+    method.__name__ = name
+    method.__doc__ = f"Async {name}, takes the arguments of childespy.{name} and `timeout`\n{function.__doc__ or ''}"
+    return(method)
+
+for _name in QUERY_FUNCTIONS:
+    setattr(AsyncClient, _name, _client_method(_name))
+
+#the client behind the module level functions, created on first use
+_default_client = None
+_default_lock = threading.Lock()
+
+def configure(**kwargs):
+    '''
+    Replace the client used by the module level functions, taking the arguments of AsyncClient
+    '''
+    global _default_client
+    with _default_lock:
+        old, _default_client = _default_client, AsyncClient(**kwargs)
+    if old is not None:
+        old.close()
+    return(_default_client)
+
+def _client():
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = AsyncClient()
+        return(_default_client)
+
+def close():
+    '''
+    Close the client used by the module level functions
+    '''
+    global _default_client
+    with _default_lock:
+        old, _default_client = _default_client, None
+    if old is not None:
+        old.close()
+
+def _module_function(name):
+    async def function(*args, **kwargs):
+        return(await _client().run(name, *args, **kwargs))
+    function.__name__ = name
+    function.__doc__ = getattr(AsyncClient, name).__doc__
+    return(function)
+
+for _name in QUERY_FUNCTIONS:
+    globals()[_name] = _module_function(_name)
@@ -0,0 +1,236 @@
+# an opt-in on-disk cache for query results
+# results for a pinned childes-db version never change, so a query is keyed on
+# the function name, its normalized arguments and the resolved db version and
+# stored as a Parquet file (pickle when pyarrow is not installed)
+
+import hashlib
+import json
+import os
+import threading
+
+import pandas as pd
+
+#filters whose order does not matter, sorted before hashing
+SET_ARGUMENTS = {"collection", "language", "corpus", "target_child", "role",
+                 "role_exclude", "sex", "token", "stem", "part_of_speech",
+                 "token_type"}
+#arguments that do not change the result
+IGNORED_ARGUMENTS = {"connection"}
+
+DEFAULT_MAX_BYTES = 10 * 1024 ** 3
+
+def default_directory():
+    '''
+    The cache directory from $CHILDESPY_CACHE_DIR, or ~/.cache/childespy
+    '''
+    return(os.environ.get("CHILDESPY_CACHE_DIR",
+                          os.path.join(os.path.expanduser("~"), ".cache", "childespy")))
+
+def normalize_arguments(arguments):
+    '''
+    Put query arguments in a canonical, JSON-serializable form
+
+    Scalars passed to list filters become one element lists and set-like
+    filters are sorted, so `corpus="Brown"` and `corpus=["Brown"]` share a key.
+    Passwords in `db_args` are dropped.
+    '''
+    normalized = {}
+    for name, value in arguments.items():
+        if name in IGNORED_ARGUMENTS:
+            continue
+        if name == "db_args" and value is not None:
+            value = {k: v for k, v in value.items() if k != "password"}
+        elif name in SET_ARGUMENTS and value is not None:
+            value = [value] if isinstance(value, (str, int, float)) else list(value)
+            value = sorted(value, key=str)
+        elif isinstance(value, tuple):
+            value = list(value)
+        normalized[name] = value
+    return(normalized)
+
+class ResultCache:
+    '''
+    A size-bounded directory of query results with LRU eviction
+
+    Files live under `<directory>/<db_version>/<function>-<hash>.<format>`, and
+    reading a file refreshes its modification time, which eviction uses as
+    the last access time.
+
+    Args:
+        directory: Path of the cache directory (default from `default_directory()`)
+        max_bytes: Total size above which the least recently used results are removed (default 10 GB)
+        format: "parquet" or "pickle" (default "parquet" when pyarrow is installed)
+    '''
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES, format=None):
+        self.directory = os.path.expanduser(directory or default_directory())
+        self.max_bytes = max_bytes
+        if format is None:
+            try:
+                import pyarrow
+                format = "parquet"
+            except ImportError:
+                format = "pickle"
+        if format not in ("parquet", "pickle"):
+            raise ValueError(f"Unknown cache format {format!r}, expected 'parquet' or 'pickle'")
+        self.format = format
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path(self, function_name, arguments, db_version):
+        '''
+        Path of the cached result for a query
+        '''
+        normalized = json.dumps(normalize_arguments(arguments), sort_keys=True, default=str)
+        digest = hashlib.sha256(f"{function_name}\0{normalized}".encode()).hexdigest()[:32]
+        return(os.path.join(self.directory, str(db_version),
+                            f"{function_name}-{digest}.{self.format}"))
+
+    def get(self, path):
+        '''
+        Load a cached result, or return None on a miss
+        '''
+        try:
+            if self.format == "parquet":
+                df = pd.read_parquet(path)
+            else:
+                df = pd.read_pickle(path)
+        except (FileNotFoundError, OSError):
+            with self._lock:
+                self.misses += 1
+            return(None)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return(df)
+
+    def put(self, path, df):
+        '''
+        Store a result and evict old results if the cache is over its size limit
+        '''
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        #write to a temporary file so readers never see a partial result
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        if self.format == "parquet":
+            df.to_parquet(tmp_path)
+        else:
+            df.to_pickle(tmp_path)
+        os.replace(tmp_path, path)
+        self.evict(keep=path)
+
+    def entries(self):
+        '''
+        Returns (path, size, last access time) for every cached result
+        '''
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for filename in files:
+                if filename.endswith(".tmp"):
+                    continue
+                path = os.path.join(root, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((path, stat.st_size, stat.st_mtime))
+        return(entries)
+
+    def evict(self, keep=None):
+        '''
+        Remove least recently used results until the cache fits in `max_bytes`, never removing `keep`
+        '''
+        entries = sorted(self.entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            with self._lock:
+                self.evictions += 1
+
+    def invalidate(self, function_name=None, db_version=None):
+        '''
+        Remove cached results, optionally only those of one function and/or db version
+
+        Returns:
+            The number of results removed
+        '''
+        removed = 0
+        for path, _, _ in self.entries():
+            version = os.path.basename(os.path.dirname(path))
+            name = os.path.basename(path).rsplit("-", 1)[0]
+            if db_version is not None and version != str(db_version):
+                continue
+            if function_name is not None and name != function_name:
+                continue
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        return(removed)
+
+    def stats(self):
+        '''
+        Returns a dictionary of hit/miss/eviction counts and the current cache size
+        '''
+        entries = self.entries()
+        return({"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "entries": len(entries), "bytes": sum(size for _, size, _ in entries),
+                "max_bytes": self.max_bytes, "directory": self.directory})
+
+#the cache used by the query functions, None while caching is off
+active_cache = None
+
+def enable_cache(directory=None, max_bytes=DEFAULT_MAX_BYTES, format=None):
+    '''
+    Turn on result caching for the query functions
+
+    Queries made with an explicit `connection` are never cached.
+
+    Args:
+        directory: Path of the cache directory (default $CHILDESPY_CACHE_DIR or ~/.cache/childespy)
+        max_bytes: Total cache size above which least recently used results are evicted (default 10 GB)
+        format: "parquet" or "pickle" (default "parquet" when pyarrow is installed)
+
+    Returns:
+        The ResultCache in use
+    '''
+    global active_cache
+    active_cache = ResultCache(directory, max_bytes, format)
+    return(active_cache)
+
+def disable_cache():
+    '''
+    Turn off result caching, leaving cached files on disk
+    '''
+    global active_cache
+    active_cache = None
+
+def cache_stats():
+    '''
+    Returns the statistics of the active cache, or None if caching is off
+    '''
+    return(None if active_cache is None else active_cache.stats())
+
+def invalidate_cache(function_name=None, db_version=None):
+    '''
+    Remove results from the active cache, optionally only those of one function and/or db version
+
+    Returns:
+        The number of results removed
+    '''
+    if active_cache is None:
+        return(0)
+    return(active_cache.invalidate(function_name, db_version))
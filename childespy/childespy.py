@@ -1,120 +1,595 @@
 # a wrapper for the childesr package
-
-#import rpy2 objects and interface
-from rpy2 import rinterface
-from rpy2 import rinterface_lib as r_lib
-from rpy2.robjects.vectors import StrVector, FloatVector, BoolVector, ListVector
-from rpy2.robjects.conversion import localconverter
-import rpy2.robjects as ro
-from rpy2.robjects import pandas2ri
+#
+# importing childespy does not start R: the R runtime and childesr are loaded
+# the first time a query needs them, and R packages are installed explicitly
+# with `setup()` (or `python -m childespy setup`)
+
+import contextlib
+import functools
+import inspect
+import re
+import threading
+import types
+import warnings
 import numpy as np
-pandas2ri.activate()
-
-#install childesr if not installed and then import
-from rpy2.robjects.packages import importr
+import pandas as pd
+from . import cache
+from . import instrument
+from . import local
+from . import metadata
+from . import native
+from . import shared
 
 childesr_version = "0.2.1"
-utils = importr('utils')
-#need remotes to install most up to data version of childesr
-# version supported for this release is 0.2.1
 
-def install_remotes():
-    try:
-        remotes = importr('remotes')
-    except:
-        utils.install_packages('remotes')
-        remotes = importr('remotes')
-    return remotes
+#the loaded rpy2 modules and R packages, filled in by _r() on first use
+_r_session = None
+_r_lock = threading.Lock()
+
+def _start_r():
+    #import rpy2 objects and interface, which starts the embedded R
+    from rpy2 import rinterface
+    from rpy2 import rinterface_lib as r_lib
+    from rpy2.robjects.vectors import StrVector, FloatVector, BoolVector, ListVector
+    from rpy2.robjects.conversion import localconverter
+    import rpy2.robjects as ro
+    from rpy2.robjects import pandas2ri
+    from rpy2.robjects.packages import importr, PackageNotInstalledError
+    #no global pandas2ri.activate(): childesr results stay R data.frames until
+    #r_df_to_pandas converts them, through Arrow when it is available
+
+    utils = importr('utils')
+    packages = {}
+    for packname in ['childesr', 'curl']:
+        try:
+            packages[packname] = importr(packname)
+        except PackageNotInstalledError as e:
+            raise ImportError(f"R package {packname!r} is not installed, run childespy.setup() "
+                              "or `python -m childespy setup` first") from e
+    installed_version = ".".join(str(x) for x in utils.packageVersion("childesr")[0])
+    if installed_version != childesr_version:
+        warnings.warn(f"childesr {installed_version} is installed but childespy supports "
+                      f"{childesr_version}, run childespy.setup() to reinstall it")
+    return(types.SimpleNamespace(
+        rinterface=rinterface, r_lib=r_lib, ro=ro, pandas2ri=pandas2ri,
+        localconverter=localconverter, StrVector=StrVector, FloatVector=FloatVector,
+        BoolVector=BoolVector, ListVector=ListVector,
+        utils=utils, **packages))
+
+def _r():
+    # start R and load childesr on first use
+    global _r_session
+    if _r_session is None:
+        with _r_lock, instrument.stage("r_startup"):
+            if _r_session is None:
+                _r_session = _start_r()
+    return(_r_session)
+
+class _RPackage:
+    '''
+    Stands in for an R package until R is started by its first use
+    '''
+    def __init__(self, name):
+        self._name = name
 
-remotes = install_remotes()
+    def __getattr__(self, attr):
+        r_object = getattr(getattr(_r(), self._name), attr)
+        if not callable(r_object):
+            return(r_object)
+        #calls into R (building, running and collecting the query) are the "query" stage
+        return(instrument.timed("query")(r_object))
 
-def importr_tryhard(packname, version=None):
-    try:
-        rpack = importr(packname)
-    except:
-        if version == None:
-            utils.install_packages(packname)
-        else:
-            remotes.install_version(packname, version)
-        rpack = importr(packname)
-    return rpack
+    def __repr__(self):
+        return(f"<R package {self._name!r}, loaded on first use>")
 
-#check which version of childesr is/was installed
-try:
-    if str(list(utils.packageVersion("childesr")[0])).strip("[]").replace(", ", ".") != childesr_version:
-        print("Reinstalling childesr version", childesr_version)
+childesr = _RPackage("childesr")
+utils = _RPackage("utils")
 
-        utils.install_packages("childesr")
-        childesr = importr_tryhard("childesr")
-    else:
-        childesr = importr_tryhard("childesr")
-except:
-    print("Installing childesr...")
-    utils.install_packages("childesr")
-    childesr = importr_tryhard("childesr")
+def setup(reinstall = False, arrow = False):
+    '''
+    Install the R packages childespy needs (remotes, curl and the supported childesr version)
 
-curl = importr_tryhard('curl')
+    Args:
+        reinstall: A boolean indicating whether to reinstall packages that are already installed (default False)
+        arrow: A boolean indicating whether to also install the R arrow package for Arrow transfer (default False)
+    '''
+    from rpy2.robjects.packages import importr, isinstalled
+    utils = importr('utils')
+    #need remotes to install the supported version of childesr
+    for packname in ['remotes', 'curl'] + (['arrow'] if arrow else []):
+        if reinstall or not isinstalled(packname):
+            utils.install_packages(packname)
+    installed = isinstalled('childesr') and \
+        ".".join(str(x) for x in utils.packageVersion("childesr")[0]) == childesr_version
+    if reinstall or not installed:
+        print("Installing childesr version", childesr_version)
+        importr('remotes').install_version('childesr', childesr_version)
 
 ### helper functions ###
+@instrument.timed("convert_args")
 def convert_null(conv_arg):
-    return(rinterface.NULL if conv_arg == None else conv_arg)
+    return(_r().rinterface.NULL if conv_arg == None else conv_arg)
 
-def convert_r_vector(python_input):
-    #need to do gross returns in each if - better option?
-    if python_input == None:
-        #if none return null
-        return(rinterface.NULL)
-    if np.issubdtype(type(python_input), bool):
-        r_vec = BoolVector([python_input])
-    elif np.issubdtype(type(python_input), list):
-        if type(python_input) == dict:
-            r_vec = ListVector(python_input)
-        elif all(np.issubdtype(type(x), str) for x in python_input):
-            r_vec = StrVector(python_input)
-        elif all(np.issubdtype(type(x), int) for x in python_input):
-            r_vec = FloatVector(python_input)
-        elif all(np.issubdtype(type(x), float) for x in python_input):
-            r_vec = FloatVector(python_input)
-        else:
-            raise TypeError(f"Python to R conversion not lists containing mixed datatypes: {python_input}")
-    elif np.issubdtype(type(python_input), str):
-        r_vec = StrVector([python_input])
-    elif np.issubdtype(type(python_input), float) or np.issubdtype(type(python_input), int):
-        r_vec = FloatVector([python_input])
+#R vector types for the types pandas infers for list-like arguments
+_R_VECTOR_KINDS = {"string": "str", "empty": "str", "integer": "float",
+                   "floating": "float", "mixed-integer-float": "float", "boolean": "bool"}
+
+def _r_vector_values(python_input):
+    '''
+    Infer the R vector type of a list-like argument once, without R
+
+    Returns:
+        A tuple of "str", "float" or "bool" and the values, as a list of
+        strings or a contiguous float64/bool numpy array
+    '''
+    if isinstance(python_input, (np.ndarray, pd.Series, pd.Index)):
+        values = np.asarray(python_input).ravel()
+        #typed arrays need no inference
+        if values.dtype.kind in "iuf":
+            return("float", np.ascontiguousarray(values, dtype=np.float64))
+        if values.dtype.kind == "b":
+            return("bool", np.ascontiguousarray(values))
+        if values.dtype.kind == "U":
+            return("str", values.tolist())
     else:
-        raise TypeError(f"Python to R conversion not implemented for datatype: {type(python_input)}")
-    return(r_vec)
+        values = list(python_input)
+    kind = _R_VECTOR_KINDS.get(pd.api.types.infer_dtype(values, skipna=False))
+    if kind is None:
+        raise TypeError(f"Python to R conversion not lists containing mixed datatypes: {python_input}")
+    if kind == "str":
+        return(kind, values.tolist() if isinstance(values, np.ndarray) else values)
+    return(kind, np.asarray(values, dtype=np.float64 if kind == "float" else bool))
+
+def _float_vector(r, values):
+    #an R numeric vector filled straight from the array buffer when rpy2 can
+    try:
+        return(r.FloatVector(r.rinterface.FloatSexpVector.from_memoryview(memoryview(values))))
+    except (AttributeError, TypeError, ValueError):
+        return(r.FloatVector(values))
+
+@instrument.timed("convert_args")
+def convert_r_vector(python_input):
+    '''
+    Convert a filter argument to an R vector
+
+    Strings, numbers and booleans become length one vectors, dicts become
+    lists, and lists, tuples, sets, numpy arrays and pandas Series/Index
+    become character, numeric or logical vectors of their values.
+    '''
+    r = _r()
+    if python_input is None:
+        return(r.rinterface.NULL)
+    if isinstance(python_input, dict):
+        return(r.ListVector(python_input))
+    if isinstance(python_input, (bool, np.bool_)):
+        return(r.BoolVector([bool(python_input)]))
+    if isinstance(python_input, str):
+        return(r.StrVector([python_input]))
+    if isinstance(python_input, (int, float, np.number)):
+        return(r.FloatVector([float(python_input)]))
+    if isinstance(python_input, (list, tuple, set, frozenset, range, np.ndarray, pd.Series, pd.Index)):
+        kind, values = _r_vector_values(python_input)
+        if kind == "str":
+            return(r.StrVector(values))
+        if kind == "float":
+            return(_float_vector(r, values))
+        return(r.BoolVector(values.tolist()))
+    raise TypeError(f"Python to R conversion not implemented for datatype: {type(python_input)}")
 
 def convert_r_to_py(r_input):
-    if isinstance(r_input, r_lib.sexp.NACharacterType):
+    if isinstance(r_input, _r().r_lib.sexp.NACharacterType):
         return(None)
     else:
         return(r_input)
 
+#R's NA_integer_, which reaches python as the smallest 32 bit integer
+R_NA_INTEGER = np.iinfo(np.int32).min
+
+#nullable dtypes for object columns whose non-missing values share a type
+_nullable_dtypes = {"boolean": "boolean", "integer": "Int64",
+                    "floating": "float64", "mixed-integer-float": "float64"}
+
+def replace_na(df, na_values = (), na_integer = R_NA_INTEGER):
+    '''
+    Replace R NA sentinels with pandas missing values, one column at a time
+
+    Args:
+        df: A pandas dataframe converted from R
+        na_values: The NA objects to look for in object columns, matched by value and type (default ())
+        na_integer: The value standing for NA in integer columns (default R_NA_INTEGER)
+
+    Returns:
+        The dataframe with NA objects replaced by None (object columns holding
+        only booleans or numbers get a nullable dtype) and integer NAs masked
+        in a nullable integer column. Float columns already hold NaN and are
+        left untouched.
+    '''
+    na_values = list(na_values)
+    na_types = list({type(na) for na in na_values})
+    columns = {}
+    for name, column in df.items():
+        if column.dtype == object and na_values:
+            #hash lookup finds the candidates, their type weeds out real strings like "NA_character_"
+            mask = np.array(column.isin(na_values))
+            if mask.any():
+                mask[mask] = column[mask].map(type).isin(na_types).to_numpy()
+            if mask.any():
+                values = column.to_numpy().copy()
+                values[mask] = None
+                column = pd.Series(values, index=column.index, name=name)
+                inferred = pd.api.types.infer_dtype(column, skipna=True)
+                if inferred in _nullable_dtypes:
+                    column = column.astype(_nullable_dtypes[inferred])
+        elif column.dtype.kind == "i" and na_integer is not None:
+            mask = column.to_numpy() == na_integer
+            if mask.any():
+                column = column.astype(f"Int{column.dtype.itemsize * 8}").mask(mask)
+        columns[name] = column
+    return(pd.DataFrame(columns, index=df.index))
+
+@instrument.timed("convert_na")
+def convert_r_na(df):
+    '''
+    Replace the R NA values left by r_df_to_pandas with pandas missing values
+    '''
+    rinterface = _r().rinterface
+    return(replace_na(df, na_values=(rinterface.NA_Character, rinterface.NA_Logical,
+                                     rinterface.NA_Integer)))
+
+#string columns become categoricals when at most this share of their values is distinct
+CATEGORY_MAX_RATIO = 0.5
+
+def _is_id_column(name):
+    return(name == "id" or name.endswith("_id"))
+
+def _smallest_integer_dtype(column, nullable):
+    low, high = column.min(), column.max()
+    for bits in (8, 16, 32, 64):
+        info = np.iinfo(f"int{bits}")
+        if info.min <= low and high <= info.max:
+            return(f"Int{bits}" if nullable else f"int{bits}")
+    return(column.dtype)
+
+def _compact_column(name, column, category_max_ratio, float32_ages):
+    if len(column) == 0 or pd.api.types.is_bool_dtype(column):
+        return(column)
+    has_na = bool(column.isna().any())
+    if pd.api.types.is_integer_dtype(column):
+        if column.notna().any():
+            return(column.astype(_smallest_integer_dtype(column, has_na or not isinstance(column.dtype, np.dtype))))
+        return(column)
+    if pd.api.types.is_float_dtype(column):
+        values = column.dropna()
+        if _is_id_column(name) and len(values) and (values == np.round(values)).all():
+            return(column.astype(_smallest_integer_dtype(values, True)))
+        if float32_ages and "age" in name:
+            return(column.astype("float32"))
+        return(column)
+    if pd.api.types.infer_dtype(column, skipna=True) in ("string", "empty"):
+        if column.nunique(dropna=True) <= category_max_ratio * len(column):
+            return(column.astype("category"))
+    return(column)
+
+def _same_values(original, compacted, tolerance):
+    # compare two columns value by value, ignoring dtypes
+    missing = original.isna().to_numpy()
+    if not np.array_equal(missing, compacted.isna().to_numpy()):
+        return(False)
+    if tolerance:
+        return(bool(np.allclose(original.to_numpy(dtype=float)[~missing],
+                                compacted.to_numpy(dtype=float)[~missing], rtol=tolerance)))
+    return(bool((original.to_numpy(dtype=object)[~missing] ==
+                 compacted.to_numpy(dtype=object)[~missing]).all()))
+
+@instrument.timed("compact")
+def compact_dtypes(df, category_max_ratio = CATEGORY_MAX_RATIO, float32_ages = True, check = True):
+    '''
+    Shrink a result dataframe by giving its columns compact dtypes
+
+    String columns with few distinct values (language, corpus_name,
+    speaker_role, part_of_speech, ...) become categoricals, integer and ID
+    columns get the smallest integer type holding their values (nullable when
+    they have missing values) and age columns become float32.
+
+    Args:
+        df: A pandas dataframe returned by a query function
+        category_max_ratio: The largest share of distinct values for which a string column becomes a categorical (default 0.5)
+        float32_ages: A boolean indicating whether to store columns with "age" in their name as float32, about 7 significant digits (default True)
+        check: A boolean indicating whether to verify that every value is unchanged, ages up to float32 precision (default True)
+
+    Returns:
+        The compacted dataframe. `attrs["compact"]` holds the memory used before
+        and after, in bytes, and the bytes saved.
+    '''
+    columns = {name: _compact_column(name, column, category_max_ratio, float32_ages)
+               for name, column in df.items()}
+    compacted = pd.DataFrame(columns, index=df.index)
+    if check:
+        for name in df.columns:
+            tolerance = 1e-6 if compacted[name].dtype == np.float32 else None
+            if not _same_values(df[name], compacted[name], tolerance):
+                raise ValueError(f"Compacting column {name!r} changed its values")
+    before = int(df.memory_usage(deep=True).sum())
+    after = int(compacted.memory_usage(deep=True).sum())
+    compacted.attrs["compact"] = {"bytes_before": before, "bytes_after": after,
+                                  "bytes_saved": before - after}
+    instrument.logger.debug("compact_dtypes saved %d of %d bytes", before - after, before)
+    return(compacted)
+
+#how r_df_to_pandas converts: through Arrow when available ("auto"), always (True) or never (False)
+_arrow_transfer = {"enabled": "auto", "pyarrow_dtypes": False}
+
+def _arrow_converter():
+    # returns a function handing an R data.frame to pyarrow through the Arrow
+    # C data interface, or None when pyarrow, rpy2-arrow or R's arrow is missing
+    r = _r()
+    if not hasattr(r, "to_arrow"):
+        try:
+            import pyarrow
+            import rpy2_arrow.pyarrow_rarrow as pyra
+            from rpy2.robjects.packages import importr, isinstalled
+            if not isinstalled('arrow'):
+                raise ImportError("R package 'arrow' is not installed")
+            importr('arrow')
+            r_table = r.ro.r('function(df) arrow::Table$create(df)')
+            r.to_arrow = lambda r_df: pyra.rarrow_to_py_table(r_table(r_df))
+        except ImportError:
+            r.to_arrow = None
+    return(r.to_arrow)
+
+def set_arrow_transfer(enabled = "auto", pyarrow_dtypes = False):
+    '''
+    Choose how R data.frames are converted to pandas
+
+    With Arrow transfer, R hands its data.frame over as an Arrow table through
+    the Arrow C data interface, so string columns are not copied into Python
+    objects cell by cell. It needs pyarrow, rpy2-arrow and the R arrow package
+    (`pip3 install childespy[arrow]` and `childespy.setup(arrow=True)`).
+
+    Args:
+        enabled: True to always use Arrow, False to always use the pandas2ri converter, "auto" to use Arrow when available (default "auto")
+        pyarrow_dtypes: A boolean indicating whether to keep pyarrow-backed columns instead of numpy ones (default False)
+    '''
+    if enabled not in (True, False, "auto"):
+        raise ValueError("`enabled` must be True, False or \"auto\"")
+    if enabled is True and _arrow_converter() is None:
+        raise ImportError("Arrow transfer needs pyarrow, rpy2-arrow and the R arrow package, "
+                          "see childespy.setup(arrow=True)")
+    _arrow_transfer["enabled"] = enabled
+    _arrow_transfer["pyarrow_dtypes"] = pyarrow_dtypes
+
+@instrument.timed("r_df_to_pandas")
 def r_df_to_pandas(r_df):
-    with localconverter(ro.default_converter + pandas2ri.converter):
-        pd_from_r_df = ro.conversion.rpy2py(r_df)
+    r = _r()
+    if "tbl_lazy" in r_df.rclass:
+        #childesr leaves a query on a given connection remote, collect it here
+        r_df = r.ro.packages.importr('dplyr').collect(r_df)
+    to_arrow = _arrow_converter() if _arrow_transfer["enabled"] else None
+    if to_arrow is not None:
+        try:
+            table = to_arrow(r_df)
+        except Exception:
+            #columns Arrow cannot represent fall back to the pandas2ri converter
+            if _arrow_transfer["enabled"] is True:
+                raise
+        else:
+            types_mapper = pd.ArrowDtype if _arrow_transfer["pyarrow_dtypes"] else None
+            return(table.to_pandas(types_mapper=types_mapper))
+    with r.localconverter(r.ro.default_converter + r.pandas2ri.converter):
+        pd_from_r_df = r.ro.conversion.rpy2py(r_df)
     return(pd_from_r_df)
+
+### backends ###
+# "r" sends queries through childesr, "native" runs the equivalent SQL over a
+# DB-API connection and builds the dataframe straight from the cursor, and
+# "local" runs the native queries against a snapshot file
+_backends = {"r": None, "native": native, "local": local}
+_default_backend = "r"
+
+def set_backend(backend):
+    '''
+    Set the backend used by query functions called without `backend`
+
+    Args:
+        backend: String naming the query backend, "r", "native" or "local"
+    '''
+    global _default_backend
+    if backend not in _backends:
+        raise ValueError(f"Unknown backend {backend!r}, expected one of {sorted(_backends)}")
+    _default_backend = backend
+
+def get_backend():
+    '''
+    Returns the name of the default query backend
+    '''
+    return(_default_backend)
+
+#dispatched functions that manage connections rather than query, left out of the query stats
+_CONNECTION_FUNCTIONS = {"connect_to_childes", "check_connection", "clear_connections"}
+
+#small, rarely changing tables kept in the metadata cache
+_METADATA_TABLES = {"get_collections", "get_corpora"}
+
+def _dispatch(r_function):
+    # run the decorated childesr wrapper, or the function of the same name on
+    # another backend with the same arguments, going through the metadata
+    # cache for the small tables and the result cache when one is enabled and
+    # no explicit connection was given, and record query calls for the
+    # instrumentation
+    signature = inspect.signature(r_function)
+    name = r_function.__name__
+
+    @functools.wraps(r_function)
+    def query_function(*args, **kwargs):
+        arguments = signature.bind(*args, **kwargs)
+        arguments.apply_defaults()
+        arguments = dict(arguments.arguments)
+        backend = arguments.pop("backend") or _default_backend
+        compact = arguments.pop("compact", False)
+        output = arguments.pop("output", None)
+        if backend not in _backends:
+            raise ValueError(f"Unknown backend {backend!r}, expected one of {sorted(_backends)}")
+        if _backends[backend] is None:
+            run = lambda: r_function(*args, **kwargs)
+        else:
+            run = lambda: getattr(_backends[backend], name)(**arguments)
+        if name in _CONNECTION_FUNCTIONS:
+            return(run())
+        metadata.validate_arguments(arguments, backend)
+        if name in _METADATA_TABLES and arguments["connection"] is None:
+            query = run
+
+            def run():
+                with instrument.stage("cache_read"):
+                    return(metadata.default_cache.table(name, arguments["db_version"], arguments["db_args"],
+                                                        backend, query))
+        if output is not None:
+            if compact:
+                raise ValueError("`compact` shrinks dataframes in memory and cannot be combined with `output`")
+            with instrument.record_query(name, backend):
+                return(shared.write_result(_result_chunks(name, arguments, backend, run), output))
+
+        with instrument.record_query(name, backend) as record:
+            result_cache = cache.active_cache
+            if result_cache is None or arguments.get("connection", True) is not None:
+                result = run()
+            else:
+                path = result_cache.path(name, dict(arguments, backend=backend),
+                                         resolve_db_version(arguments["db_version"],
+                                                            arguments.get("db_args"), backend))
+                with instrument.stage("cache_read"):
+                    result = result_cache.get(path)
+                if result is None:
+                    result = run()
+                    with instrument.stage("cache_write"):
+                        try:
+                            result_cache.put(path, result)
+                        except Exception as error:
+                            #a full or unwritable cache directory must not lose a fetched result
+                            warnings.warn(f"Could not cache the {name} result: {error}")
+            if compact:
+                result = compact_dtypes(result)
+            record.result = result
+            return(result)
+    return(query_function)
+#query functions whose results are written to `output` files in chunks
+_STREAMED = {"get_tokens": "iter_tokens", "get_utterances": "iter_utterances"}
+
+def _result_chunks(name, arguments, backend, run):
+    # the result of a query function as dataframes, paged for the big tables
+    # and in one piece otherwise; an empty paged result runs the query
+    # function once more so the file still gets its columns
+    if name in _STREAMED:
+        empty = True
+        for chunk in globals()[_STREAMED[name]](**arguments, backend=backend):
+            empty = False
+            yield(chunk)
+        if not empty:
+            return
+    yield(run())
+
+@contextlib.contextmanager
+def _fetcher(connection, db_version, db_args, backend):
+    # a function running a (sql, params) pair over one connection on `backend`,
+    # connecting for the duration of the block when no connection is given;
+    # childesr only takes query strings so the parameters are inlined for it
+    backend = backend or _default_backend
+    if backend not in _backends:
+        raise ValueError(f"Unknown backend {backend!r}, expected one of {sorted(_backends)}")
+    own_connection = connection is None
+    if own_connection:
+        connection = connect_to_childes(db_version, db_args, backend=backend)
+    try:
+        if _backends[backend] is None:
+            yield(lambda sql, params: _r_read_query(native.render_query(sql, params), connection))
+        else:
+            yield(lambda sql, params: native.read_query(sql, params, connection))
+    finally:
+        if own_connection:
+            _disconnect(connection, backend)
+
+def _r_read_query(sql, connection):
+    # run a query string over an R DBI connection and collect the result;
+    # childesr's get_sql_query would leave a remote tbl on a given connection
+    with instrument.stage("query"):
+        r_df = _r().ro.packages.importr('DBI').dbGetQuery(connection, sql)
+    return(convert_r_na(r_df_to_pandas(r_df)))
+
+def _iter_query(query, chunk_size, connection, db_version, db_args, backend):
+    # page through a native.Query on any backend
+    with _fetcher(connection, db_version, db_args, backend) as fetch:
+        yield from native.keyset_pages(query, fetch, chunk_size)
+
+def _disconnect(connection, backend):
+    # close a connection made by connect_to_childes on `backend`
+    if _backends[backend] is None:
+        _r().ro.packages.importr('DBI').dbDisconnect(connection)
+    else:
+        native.raw_connection(connection).close()
+
+def _is_valid(connection, backend):
+    # check that a connection made by connect_to_childes can still run queries
+    try:
+        if _backends[backend] is None:
+            return(bool(_r().ro.packages.importr('DBI').dbIsValid(connection)[0]))
+        connection = native.raw_connection(connection)
+        if hasattr(connection, "ping"):
+            connection.ping(reconnect=False)
+        else:
+            cursor = connection.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+            cursor.close()
+        return(True)
+    except Exception:
+        return(False)
 ### function conversion ###
 
 
 #get db info
-def get_db_info():
+def get_db_info(backend = None):
     '''
-    Returns a dictionary with the most recent database info from childes
+    Returns a dictionary with the most recent database info from childes, kept in the metadata cache
+
+    Args:
+        backend: String naming the query backend; "r" asks childesr, the others read the public settings file without R (default None, see `set_backend`)
     '''
+    return(metadata.default_cache.db_info(backend))
+
+def _fetch_db_info(backend):
+    # get_db_info without the cache
+    if (backend or _default_backend) != "r":
+        return(native.get_db_info())
     r_db_info = childesr.get_db_info()
     db_dict = dict(zip(r_db_info.names, map(list,list(r_db_info))))
     return db_dict
 
+def resolve_db_version(db_version = "current", db_args = None, backend = None):
+    '''
+    Returns the name of the database a `db_version` argument refers to
+
+    The local backend reads it from the snapshot file, without a connection.
+    Otherwise a `db_name` in `db_args` names the database queried, and
+    "current" is resolved with the cached get_db_info().
+    '''
+    if (backend or _default_backend) == "local":
+        return(local.snapshot_info(local.snapshot_path(db_version, db_args))["db_version"])
+    if db_args is not None and "db_name" in db_args:
+        return(db_args["db_name"])
+    if db_version != "current":
+        return(db_version)
+    return(metadata.default_cache.db_info(backend)["current"][0])
+
 #connect to childes
 # note: this returns an R 'MySQLConnection' object, no python equivalent
-def connect_to_childes(db_version = "current", db_args = None):
+@_dispatch
+def connect_to_childes(db_version = "current", db_args = None, backend = None):
     """Connects to childes-db
 
     Args:
         db_version: String of the name of the database version to use (default "current")
         db_args: Dict with host, user, and password defined (default None)
+        backend: String naming the query backend, "r" (childesr), "native" (SQL from python) or "local" (a snapshot) (default None, see `set_backend`)
 
     Returns:
         An R MySQLConnection object connection
@@ -123,13 +598,15 @@ def connect_to_childes(db_version = "current", db_args = None):
     return(childesr.connect_to_childes(db_version, db_args))
 
 #check_connection
-def check_connection(db_version = "current", db_args = None):
+@_dispatch
+def check_connection(db_version = "current", db_args = None, backend = None):
     '''
     Check if connecting to childes db is possible
 
     Args:
         db_version: String of the name of the database version to use (default "current")
         db_args: Dict with host, user, and password defined (default None)
+        backend: String naming the query backend, "r" (childesr), "native" (SQL from python) or "local" (a snapshot) (default None, see `set_backend`)
 
     Returns:
         Boolean indicating whether a connection was successfully formed
@@ -138,13 +615,19 @@ def check_connection(db_version = "current", db_args = None):
     return(childesr.check_connection(db_version, db_args)[0])
 
 #clear_connections
-def clear_connections():
+@_dispatch
+def clear_connections(backend = None):
     '''
     Clear all MySQL connections
+
+    Args:
+        backend: String naming the query backend, "r" (childesr), "native" (SQL from python) or "local" (a snapshot) (default None, see `set_backend`)
     '''
     return(childesr.clear_connections())
 
-def get_collections(connection = None, db_version = "current", db_args = None):
+@_dispatch
+def get_collections(connection = None, db_version = "current", db_args = None, backend = None, compact = False,
+                    output = None):
     '''
     Get the collections from childesdb
 
@@ -152,19 +635,24 @@ def get_collections(connection = None, db_version = "current", db_args = None):
         connection: A connection to the CHILDES database (default None)
         db_version: String of the name of the database version to use (default "current")
         db_args: Dict with host, user, and password defined (default None)
+        backend: String naming the query backend, "r" (childesr), "native" (SQL from python) or "local" (a snapshot) (default None, see `set_backend`)
+        compact: A boolean indicating whether to shrink the result with `compact_dtypes` (categoricals, small integers, float32 ages) (default False)
+        output: Path of an Arrow IPC file to write the result to as it is fetched, returning a `SharedResult` handle instead of a dataframe (default None)
 
     Returns:
-        A pandas dataframe of Collection data. If `connection` is supplied, the result remains a remote query, otherwise it is retrieved locally.
+        A pandas dataframe of Collection data. The result is retrieved locally, also when `connection` is supplied.
     '''
     connection = convert_null(connection)
     db_args = convert_r_vector(db_args)
     collections = childesr.get_collections(connection, db_version, db_args)
     collections = r_df_to_pandas(collections)
-    collections = collections.apply(np.vectorize(convert_r_to_py))
+    collections = convert_r_na(collections)
     return(collections)
 
 #get_corpora
-def get_corpora(connection = None, db_version = "current", db_args = None):
+@_dispatch
+def get_corpora(connection = None, db_version = "current", db_args = None, backend = None, compact = False,
+                output = None):
     '''
     Get the corpora data
 
@@ -172,22 +660,27 @@ def get_corpora(connection = None, db_version = "current", db_args = None):
         connection: A connection to the CHILDES database (default None)
         db_version: String of the name of the database version to use (default "current")
         db_args: Dict with host, user, and password defined (default None)
+        backend: String naming the query backend, "r" (childesr), "native" (SQL from python) or "local" (a snapshot) (default None, see `set_backend`)
+        compact: A boolean indicating whether to shrink the result with `compact_dtypes` (categoricals, small integers, float32 ages) (default False)
+        output: Path of an Arrow IPC file to write the result to as it is fetched, returning a `SharedResult` handle instead of a dataframe (default None)
 
     Returns:
-        A pandas dataframe of Corpus data. If `connection` is supplied, the result remains a remote query, otherwise it is retrieved locally.
+        A pandas dataframe of Corpus data. The result is retrieved locally, also when `connection` is supplied.
     '''
     #convert arguments
     connection = convert_null(connection)
     db_args = convert_r_vector(db_args)
     r_corpora = childesr.get_corpora(connection, db_version, db_args)
     r_corpora = r_df_to_pandas(r_corpora)
-    r_corpora = r_corpora.apply(np.vectorize(convert_r_to_py))
+    r_corpora = convert_r_na(r_corpora)
 
     return(r_corpora)
 
 #get_transcripts
+@_dispatch
 def get_transcripts(collection = None, corpus= None, target_child=None,
-connection= None, db_version = "current", db_args = None):
+connection= None, db_version = "current", db_args = None, backend = None, compact = False,
+output = None):
     '''
     Gets the transcripts with supplied filters
 
@@ -198,9 +691,12 @@ connection= None, db_version = "current", db_args = None):
         connection: A connection to the CHILDES database (default None)
         db_version: String of the name of the database version to use (default "current")
         db_args: Dict with host, user, and password defined (default None)
+        backend: String naming the query backend, "r" (childesr), "native" (SQL from python) or "local" (a snapshot) (default None, see `set_backend`)
+        compact: A boolean indicating whether to shrink the result with `compact_dtypes` (categoricals, small integers, float32 ages) (default False)
+        output: Path of an Arrow IPC file to write the result to as it is fetched, returning a `SharedResult` handle instead of a dataframe (default None)
 
     Returns:
-    A pandas dataframe of Transcript data, filtered down by supplied arguments. If `connection` is supplied, the result remains a remote query, otherwise it is retrieved locally.
+    A pandas dataframe of Transcript data, filtered down by supplied arguments. The result is retrieved locally, also when `connection` is supplied.
     '''
     # convert base
     connection = convert_null(connection)
@@ -213,14 +709,16 @@ connection= None, db_version = "current", db_args = None):
 
     r_transcripts = childesr.get_transcripts(collection, corpus, target_child, connection, db_version,db_args)
     r_transcripts = r_df_to_pandas(r_transcripts)
-    r_transcripts = r_transcripts.apply(np.vectorize(convert_r_to_py))
+    r_transcripts = convert_r_na(r_transcripts)
 
     return(r_transcripts)
 
 #get_participants
+@_dispatch
 def get_participants(collection = None, corpus = None, target_child = None,
                     role = None, role_exclude = None, age = None, sex = None,
-                    connection = None, db_version = "current", db_args = None):
+                    connection = None, db_version = "current", db_args = None, backend = None, compact = False,
+                    output = None):
     '''
     Gets the participant data filtered by the supplied arguments
 
@@ -235,9 +733,12 @@ def get_participants(collection = None, corpus = None, target_child = None,
         connection: A connection to the CHILDES database (default None)
         db_version: String of the name of the database version to use (default "current")
         db_args: Dict with host, user, and password defined (default None)
+        backend: String naming the query backend, "r" (childesr), "native" (SQL from python) or "local" (a snapshot) (default None, see `set_backend`)
+        compact: A boolean indicating whether to shrink the result with `compact_dtypes` (categoricals, small integers, float32 ages) (default False)
+        output: Path of an Arrow IPC file to write the result to as it is fetched, returning a `SharedResult` handle instead of a dataframe (default None)
 
     Returns:
-    A pandas dataframe of Participant data, filtered down by supplied arguments. If `connection` is supplied, the result remains a remote query, otherwise it is retrieved locally.
+    A pandas dataframe of Participant data, filtered down by supplied arguments. The result is retrieved locally, also when `connection` is supplied.
     '''
     # convert base
     connection = convert_null(connection)
@@ -255,14 +756,16 @@ def get_participants(collection = None, corpus = None, target_child = None,
     #get r table
     r_participants = childesr.get_participants(collection, corpus, target_child, role, role_exclude, age, sex, connection, db_version, db_args)
     r_participants = r_df_to_pandas(r_participants)
-    r_participants = r_participants.apply(np.vectorize(convert_r_to_py))
+    r_participants = convert_r_na(r_participants)
 
     return(r_participants)
 
 #get_speaker_statistics
+@_dispatch
 def get_speaker_statistics(collection = None, corpus = None, target_child = None,
                             role = None, role_exclude = None, age = None, sex = None,
-                            connection = None, db_version = "current", db_args = None):
+                            connection = None, db_version = "current", db_args = None, backend = None, compact = False,
+                            output = None):
     '''
     Gets the speaker data filtered by the supplied arguments
 
@@ -277,9 +780,12 @@ def get_speaker_statistics(collection = None, corpus = None, target_child = None
         connection: A connection to the CHILDES database (default None)
         db_version: String of the name of the database version to use (default "current")
         db_args: Dict with host, user, and password defined (default None)
+        backend: String naming the query backend, "r" (childesr), "native" (SQL from python) or "local" (a snapshot) (default None, see `set_backend`)
+        compact: A boolean indicating whether to shrink the result with `compact_dtypes` (categoricals, small integers, float32 ages) (default False)
+        output: Path of an Arrow IPC file to write the result to as it is fetched, returning a `SharedResult` handle instead of a dataframe (default None)
 
     Returns:
-    A pandas dataframe of Speaker statistics data, filtered down by supplied arguments. If `connection` is supplied, the result remains a remote query, otherwise it is retrieved locally.
+    A pandas dataframe of Speaker statistics data, filtered down by supplied arguments. The result is retrieved locally, also when `connection` is supplied.
     '''
     # convert base
     connection = convert_null(connection)
@@ -297,18 +803,20 @@ def get_speaker_statistics(collection = None, corpus = None, target_child = None
     #get r table
     r_speaker_statistics = childesr.get_speaker_statistics(collection, corpus, target_child, role, role_exclude, age, sex, connection, db_version, db_args)
     r_speaker_statistics = r_df_to_pandas(r_speaker_statistics)
-    r_speaker_statistics = r_speaker_statistics.apply(np.vectorize(convert_r_to_py))
+    r_speaker_statistics = convert_r_na(r_speaker_statistics)
 
     return(r_speaker_statistics)
 
 #get_content - not in the package
 
 #get_tokens
+@_dispatch
 def get_tokens(token, collection = None, language = None, corpus = None,
                 target_child = None, role = None, role_exclude = None,
                 age = None, sex = None, stem = None,
                 part_of_speech = None, replace = True, connection = None,
-                db_version = "current", db_args = None):
+                db_version = "current", db_args = None, backend = None, compact = False,
+                output = None):
     '''
     Gets the token data filtered by the supplied arguments
 
@@ -327,9 +835,12 @@ def get_tokens(token, collection = None, language = None, corpus = None,
         connection: A connection to the CHILDES database (default None)
         db_version: String of the name of the database version to use (default "current")
         db_args: Dict with host, user, and password defined (default None)
+        backend: String naming the query backend, "r" (childesr), "native" (SQL from python) or "local" (a snapshot) (default None, see `set_backend`)
+        compact: A boolean indicating whether to shrink the result with `compact_dtypes` (categoricals, small integers, float32 ages) (default False)
+        output: Path of an Arrow IPC file to write the result to as it is fetched, returning a `SharedResult` handle instead of a dataframe (default None)
 
     Returns:
-    A pandas dataframe of Token data, filtered down by supplied arguments. If `connection` is supplied, the result remains a remote query, otherwise it is retrieved locally.
+    A pandas dataframe of Token data, filtered down by supplied arguments. The result is retrieved locally, also when `connection` is supplied.
     '''
 
     connection = convert_null(connection)
@@ -354,13 +865,178 @@ def get_tokens(token, collection = None, language = None, corpus = None,
                     part_of_speech, replace, connection,
                     db_version, db_args)
     r_get_tokens = r_df_to_pandas(r_get_tokens)
-    r_get_tokens = r_get_tokens.apply(np.vectorize(convert_r_to_py))
+    r_get_tokens = convert_r_na(r_get_tokens)
     return(r_get_tokens)
+
+#get_tokens_batch
+def like_to_regex(pattern):
+    '''
+    Compile a SQL LIKE pattern (`%`, `_`, backslash escapes) to a case-insensitive regular expression
+    '''
+    parts, escaped = [], False
+    for char in pattern:
+        if escaped:
+            parts.append(re.escape(char))
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char == "%":
+            parts.append(".*")
+        elif char == "_":
+            parts.append(".")
+        else:
+            parts.append(re.escape(char))
+    return(re.compile("".join(parts), re.IGNORECASE | re.DOTALL))
+
+def _is_wildcard(pattern):
+    return(re.search(r"(?<!\\)[%_]", pattern) is not None)
+
+def _tag_patterns(tokens, patterns):
+    # one row per (token, matching pattern), with the pattern in a `pattern` column
+    gloss = tokens["gloss"].astype(object).where(tokens["gloss"].notna(), "").astype(str).str.lower()
+    exact = [p for p in patterns if not _is_wildcard(p)]
+    positions, tags = [], []
+    by_gloss = {}
+    for pattern in exact:
+        by_gloss.setdefault(pattern.replace("\\", "").lower(), []).append(pattern)
+    for value, matched in by_gloss.items():
+        rows = np.flatnonzero((gloss == value).to_numpy())
+        for pattern in matched:
+            positions.append(rows)
+            tags.append(np.full(len(rows), pattern, dtype=object))
+    for pattern in patterns:
+        if _is_wildcard(pattern):
+            regex = like_to_regex(pattern)
+            rows = np.flatnonzero(gloss.map(lambda g: regex.fullmatch(g) is not None).to_numpy())
+            positions.append(rows)
+            tags.append(np.full(len(rows), pattern, dtype=object))
+    if not positions:
+        return(tokens.iloc[:0].assign(pattern=pd.Series(dtype=object)))
+    positions = np.concatenate(positions)
+    tagged = tokens.iloc[positions].reset_index(drop=True)
+    tagged["pattern"] = np.concatenate(tags)
+    return(tagged)
+
+def get_tokens_batch(tokens, collection = None, language = None, corpus = None,
+                     target_child = None, role = None, role_exclude = None,
+                     age = None, sex = None, stem = None,
+                     part_of_speech = None, replace = True, batch_size = 1000,
+                     as_dict = False, connection = None,
+                     db_version = "current", db_args = None, backend = None):
+    '''
+    Looks up many token patterns with the same filters in a few queries
+
+    Patterns are sent `batch_size` at a time over one connection: exact
+    patterns as one case-insensitive IN list, wildcard patterns as LIKE
+    alternatives, so 5,000 words take a handful of round trips instead of
+    5,000 queries. Each
+    returned row is tagged with the pattern it matched; a token matching
+    several patterns appears once per pattern.
+
+    Args:
+        tokens: A list of token patterns (`\%` matches any number of wildcard characters, `_` matches exactly one wildcard character)
+        collection: A string or list of strings of one or more names of collections (default None)
+        language: A string or list of strings of one or more languages (default None)
+        corpus: A string or list of strings of one or more names of corpora (default None)
+        target_child: A string or list of strings of one or more names of children (default None)
+        role: A string or list of strings of one or more roles to include (default None)
+        role_exclude: A string or list of strings of one or more roles to exclude (default None)
+        age: An int or float of an single age value or a list of ints or floats with min age value (inclusive) and max age value (exclusive) in months. For a single age value, participants are returned for which that age is within their age range; for two ages, participants are returned for whose age overlaps with the interval between those two ages. (default None)
+        sex: A string of values "male" and/or "female" (default None)
+        stem: A string or list of strings of one or more stem patterns (default None)
+        part_of_speech: A string or list of strings of one or more parts of speech (default None)
+        replace: A boolean indicating whether to replace "gloss" with "replacement" (i.e. phonologically assimilated form), when available (default True)
+        batch_size: The number of patterns sent per query (default 1000)
+        as_dict: A boolean indicating whether to return a dict of dataframes keyed by pattern instead of one dataframe (default False)
+        connection: A connection to the CHILDES database, reused for every batch (default None)
+        db_version: String of the name of the database version to use (default "current")
+        db_args: Dict with host, user, and password defined (default None)
+        backend: String naming the query backend, "r" (childesr), "native" (SQL from python) or "local" (a snapshot) (default None, see `set_backend`)
+
+    Returns:
+    A pandas dataframe of Token data with a `pattern` column, or a dict mapping every pattern to its (possibly empty) dataframe
+    '''
+    patterns = list(dict.fromkeys([tokens] if isinstance(tokens, str) else tokens))
+    if batch_size < 1:
+        raise ValueError("`batch_size` must be at least 1")
+    gloss = native.REPLACED_GLOSS if replace else "gloss"
+    results = []
+    with instrument.record_query("get_tokens_batch", backend or _default_backend) as record:
+        with _fetcher(connection, db_version, db_args, backend) as fetch:
+            for start in range(0, len(patterns), batch_size):
+                batch = patterns[start:start + batch_size]
+                #lowercased on both sides, as LIKE ignores case but IN does not on every server
+                exact = list(dict.fromkeys(p.replace("\\", "").lower() for p in batch if not _is_wildcard(p)))
+                wildcard = [p for p in batch if _is_wildcard(p)]
+                query = native.token_query(None, collection=collection, language=language,
+                                           corpus=corpus, target_child=target_child, role=role,
+                                           role_exclude=role_exclude, age=age, sex=sex, stem=stem,
+                                           part_of_speech=part_of_speech)
+                matches = []
+                if exact:
+                    matches.append(f"LOWER({gloss}) IN ({', '.join('?' * len(exact))})")
+                matches.extend(f"{gloss} LIKE ?" for _ in wildcard)
+                query.where(f"({' OR '.join(matches)})", *exact, *wildcard)
+                chunk = fetch(query.sql(), query.params)
+                if replace:
+                    chunk = native.replace_gloss(chunk)
+                results.append(_tag_patterns(chunk, batch))
+        tagged = pd.concat(results, ignore_index=True) if results else pd.DataFrame(columns=["pattern"])
+        record.result = tagged
+    if not as_dict:
+        return(tagged)
+    groups = {pattern: group.reset_index(drop=True) for pattern, group in tagged.groupby("pattern", sort=False)}
+    empty = tagged.iloc[:0]
+    return({pattern: groups.get(pattern, empty) for pattern in patterns})
+
+#iter_tokens
+def iter_tokens(token, collection = None, language = None, corpus = None,
+                target_child = None, role = None, role_exclude = None,
+                age = None, sex = None, stem = None,
+                part_of_speech = None, replace = True, chunk_size = 100000,
+                connection = None, db_version = "current", db_args = None,
+                backend = None):
+    '''
+    Iterates over the token data filtered by the supplied arguments in chunks
+
+    Takes the same filters as get_tokens and pages through the result in `id`
+    order, so memory use depends on `chunk_size` rather than the result size.
+
+    Args:
+        token: A string or list of strings of one or more token patterns (`\%` matches any number of wildcard characters, `_` matches exactly one wildcard character)
+        collection: A string or list of strings of one or more names of collections (default None)
+        language: A string or list of strings of one or more languages (default None)
+        corpus: A string or list of strings of one or more names of corpora (default None)
+        target_child: A string or list of strings of one or more names of children (default None)
+        role: A string or list of strings of one or more roles to include (default None)
+        role_exclude: A string or list of strings of one or more roles to exclude (default None)
+        age: An int or float of an single age value or a list of ints or floats with min age value (inclusive) and max age value (exclusive) in months. For a single age value, participants are returned for which that age is within their age range; for two ages, participants are returned for whose age overlaps with the interval between those two ages. (default None)
+        sex: A string of values "male" and/or "female" (default None)
+        stem: A string or list of strings of one or more stem patterns (default None)
+        part_of_speech: A string or list of strings of one or more parts of speech (default None)
+        replace: A boolean indicating whether to replace "gloss" with "replacement" (i.e. phonologically assimilated form), when available (default True)
+        chunk_size: The maximum number of rows per yielded dataframe (default 100000)
+        connection: A connection to the CHILDES database, reused for every chunk (default None)
+        db_version: String of the name of the database version to use (default "current")
+        db_args: Dict with host, user, and password defined (default None)
+        backend: String naming the query backend, "r" (childesr), "native" (SQL from python) or "local" (a snapshot) (default None, see `set_backend`)
+
+    Yields:
+    Pandas dataframes of at most `chunk_size` rows of Token data
+    '''
+    query = native.token_query(token, collection=collection, language=language,
+                               corpus=corpus, target_child=target_child, role=role,
+                               role_exclude=role_exclude, age=age, sex=sex, stem=stem,
+                               part_of_speech=part_of_speech, replace=replace)
+    for chunk in _iter_query(query, chunk_size, connection, db_version, db_args, backend):
+        yield(native.replace_gloss(chunk) if replace else chunk)
 #get_types
+@_dispatch
 def get_types(token_type=None, collection = None, language = None, corpus = None,
                            role = None, role_exclude = None, age = None,
                            sex = None, target_child = None, connection = None,
-                           db_version = "current", db_args = None):
+                           db_version = "current", db_args = None, backend = None, compact = False,
+                           output = None):
     '''
     Gets the token data filtered by the supplied arguments
 
@@ -377,9 +1053,12 @@ def get_types(token_type=None, collection = None, language = None, corpus = None
         connection: A connection to the CHILDES database (default None)
         db_version: String of the name of the database version to use (default "current")
         db_args: Dict with host, user, and password defined (default None)
+        backend: String naming the query backend, "r" (childesr), "native" (SQL from python) or "local" (a snapshot) (default None, see `set_backend`)
+        compact: A boolean indicating whether to shrink the result with `compact_dtypes` (categoricals, small integers, float32 ages) (default False)
+        output: Path of an Arrow IPC file to write the result to as it is fetched, returning a `SharedResult` handle instead of a dataframe (default None)
 
     Returns:
-    A pandas dataframe of Type data, filtered down by supplied arguments. If `connection` is supplied, the result remains a remote query, otherwise it is retrieved locally.
+    A pandas dataframe of Type data, filtered down by supplied arguments. The result is retrieved locally, also when `connection` is supplied.
     '''
 
     connection = convert_null(connection)
@@ -400,15 +1079,17 @@ def get_types(token_type=None, collection = None, language = None, corpus = None
                                sex, target_child, token_type, connection,
                                db_version, db_args)
     r_types = r_df_to_pandas(r_types)
-    r_types = r_types.apply(np.vectorize(convert_r_to_py))
+    r_types = convert_r_na(r_types)
 
     return(r_types)
 
 #get_utterances
+@_dispatch
 def get_utterances(collection = None, language = None, corpus = None,
                            role = None, role_exclude = None, age = None,
                            sex = None, target_child = None, connection = None,
-                           db_version = "current", db_args = None):
+                           db_version = "current", db_args = None, backend = None, compact = False,
+                           output = None):
     '''
     Gets the utterance data filtered by the supplied arguments
 
@@ -424,9 +1105,12 @@ def get_utterances(collection = None, language = None, corpus = None,
         connection: A connection to the CHILDES database (default None)
         db_version: String of the name of the database version to use (default "current")
         db_args: Dict with host, user, and password defined (default None)
+        backend: String naming the query backend, "r" (childesr), "native" (SQL from python) or "local" (a snapshot) (default None, see `set_backend`)
+        compact: A boolean indicating whether to shrink the result with `compact_dtypes` (categoricals, small integers, float32 ages) (default False)
+        output: Path of an Arrow IPC file to write the result to as it is fetched, returning a `SharedResult` handle instead of a dataframe (default None)
 
     Returns:
-    A pandas dataframe of Type data, filtered down by supplied arguments. If `connection` is supplied, the result remains a remote query, otherwise it is retrieved locally.
+    A pandas dataframe of Type data, filtered down by supplied arguments. The result is retrieved locally, also when `connection` is supplied.
     '''
     connection = convert_null(connection)
     db_args = convert_r_vector(db_args)
@@ -445,16 +1129,53 @@ def get_utterances(collection = None, language = None, corpus = None,
                                sex, target_child, connection,
                                db_version, db_args)
     r_utterances = r_df_to_pandas(r_utterances)
-    r_utterances = r_utterances.apply(np.vectorize(convert_r_to_py))
+    r_utterances = convert_r_na(r_utterances)
 
     return(r_utterances)
+
+#iter_utterances
+def iter_utterances(collection = None, language = None, corpus = None,
+                    role = None, role_exclude = None, age = None,
+                    sex = None, target_child = None, chunk_size = 100000,
+                    connection = None, db_version = "current", db_args = None,
+                    backend = None):
+    '''
+    Iterates over the utterance data filtered by the supplied arguments in chunks
+
+    Takes the same filters as get_utterances and pages through the result in
+    `id` order, so memory use depends on `chunk_size` rather than the result size.
+
+    Args:
+        collection: A string or list of strings of one or more names of collections (default None)
+        language: A string or list of strings of one or more languages (default None)
+        corpus: A string or list of strings of one or more names of corpora (default None)
+        target_child: A string or list of strings of one or more names of children (default None)
+        role: A string or list of strings of one or more roles to include (default None)
+        role_exclude: A string or list of strings of one or more roles to exclude (default None)
+        age: An int or float of an single age value or a list of ints or floats with min age value (inclusive) and max age value (exclusive) in months. For a single age value, participants are returned for which that age is within their age range; for two ages, participants are returned for whose age overlaps with the interval between those two ages. (default None)
+        sex: A string of values "male" and/or "female" (default None)
+        chunk_size: The maximum number of rows per yielded dataframe (default 100000)
+        connection: A connection to the CHILDES database, reused for every chunk (default None)
+        db_version: String of the name of the database version to use (default "current")
+        db_args: Dict with host, user, and password defined (default None)
+        backend: String naming the query backend, "r" (childesr), "native" (SQL from python) or "local" (a snapshot) (default None, see `set_backend`)
+
+    Yields:
+    Pandas dataframes of at most `chunk_size` rows of Utterance data
+    '''
+    query = native.utterance_query(collection=collection, language=language,
+                                   corpus=corpus, role=role, role_exclude=role_exclude,
+                                   age=age, sex=sex, target_child=target_child)
+    yield from _iter_query(query, chunk_size, connection, db_version, db_args, backend)
 #get_contexts
+@_dispatch
 def get_contexts(token = None, collection=None, language=None, corpus=None,
                         role=None, role_exclude=None, age=None,
                         sex=None, target_child=None,
                         window = [0,0], remove_duplicates = True,
                         connection=None, db_version = "current",
-                        db_args=None):
+                        db_args=None, backend=None, compact=False,
+                        output=None):
     '''
     Gets the contexts surrounding a token filtered by the supplied arguments
 
@@ -472,9 +1193,12 @@ def get_contexts(token = None, collection=None, language=None, corpus=None,
         connection: A connection to the CHILDES database (default None)
         db_version: String of the name of the database version to use (default "current")
         db_args: Dict with host, user, and password defined (default None)
+        backend: String naming the query backend, "r" (childesr), "native" (SQL from python) or "local" (a snapshot) (default None, see `set_backend`)
+        compact: A boolean indicating whether to shrink the result with `compact_dtypes` (categoricals, small integers, float32 ages) (default False)
+        output: Path of an Arrow IPC file to write the result to as it is fetched, returning a `SharedResult` handle instead of a dataframe (default None)
 
     Returns:
-    A pandas dataframe of Type data, filtered down by supplied arguments. If `connection` is supplied, the result remains a remote query, otherwise it is retrieved locally.
+    A pandas dataframe of Type data, filtered down by supplied arguments. The result is retrieved locally, also when `connection` is supplied.
     '''
     connection = convert_null(connection)
     db_args = convert_r_vector(db_args)
@@ -498,12 +1222,14 @@ def get_contexts(token = None, collection=None, language=None, corpus=None,
                             connection, db_version,
                             db_args)
     r_contexts = r_df_to_pandas(r_contexts)
-    r_contexts = r_contexts.apply(np.vectorize(convert_r_to_py))
+    r_contexts = convert_r_na(r_contexts)
 
     return(r_contexts)
 
 # can impliment after childesr updated
-def get_sql_query(sql_query_string, connection = None, db_version = "current", db_args=None):
+@_dispatch
+def get_sql_query(sql_query_string, connection = None, db_version = "current", db_args=None, backend=None, compact=False,
+                  output=None):
     '''
     Run a SQL Query string on the CHILDES #database
     Args:
@@ -511,11 +1237,14 @@ def get_sql_query(sql_query_string, connection = None, db_version = "current", d
         connection: A connection to the CHILDES database (default None)
         db_version: String of the name of the database version to use (default "current")
         db_args: Dict with host, user, and password defined (default None)
+        backend: String naming the query backend, "r" (childesr), "native" (SQL from python) or "local" (a snapshot) (default None, see `set_backend`)
+        compact: A boolean indicating whether to shrink the result with `compact_dtypes` (categoricals, small integers, float32 ages) (default False)
+        output: Path of an Arrow IPC file to write the result to as it is fetched, returning a `SharedResult` handle instead of a dataframe (default None)
     '''
     connection = convert_null(connection)
     db_args = convert_r_vector(db_args)
 
     r_sql_query = childesr.get_sql_query(sql_query_string, connection, db_version, db_args)
     r_sql_query = r_df_to_pandas(r_sql_query)
-    r_sql_query = r_sql_query.apply(np.vectorize(convert_r_to_py))
+    r_sql_query = convert_r_na(r_sql_query)
     return(r_sql_query)
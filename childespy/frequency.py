@@ -0,0 +1,266 @@
+# a precomputed word frequency index
+# FrequencyIndex.build() streams the token_frequency (or token) table of one db
+# version once and sums the counts per (word, corpus, speaker role, age bin).
+# The sums are stored column-wise, sorted by word, in .npy files that are
+# memory-mapped on load, so frequency and age trajectory lookups are a binary
+# search and a slice instead of a database query
+
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from . import native
+
+#tables and count columns the index can be built from, by key
+SOURCES = {"gloss": ("token_frequency", "count"), "stem": ("token", None)}
+#aggregated rows held in memory before they are summed again while building
+REAGGREGATE_ROWS = 5000000
+#bin id of rows without a target child age
+NO_AGE = -1
+
+_ARRAYS = ["words", "offsets", "corpus", "role", "age_bin", "count"]
+
+def _aggregate(frames):
+    df = pd.concat(frames, ignore_index=True)
+    return(df.groupby(["word", "corpus", "role", "age_bin"], sort=False, observed=True)
+           ["count"].sum().reset_index())
+
+class FrequencyIndex:
+    '''
+    Word counts by corpus, speaker role and age bin of one db version
+
+    Rows are sorted by word and `offsets[i]:offsets[i + 1]` are the rows of
+    `words[i]`, so a lookup is a binary search in the word list followed by
+    a scan of that word's few rows. Build it once, save it and load it
+    memory-mapped in later sessions:
+
+        index = childespy.FrequencyIndex.build(db_version="2020.1")
+        index.save("freq-2020.1")
+        index = childespy.FrequencyIndex.load("freq-2020.1")
+        index.frequency("dog", corpus="Brown", role="Mother", age=[24, 36])
+
+    Args:
+        words: Sorted numpy array of the distinct words
+        offsets: Numpy array of the first row of each word, with the number of rows appended
+        corpora: List of corpus names, indexed by the `corpus` codes
+        roles: List of speaker roles, indexed by the `role` codes
+        corpus: Numpy array of the corpus code of each row
+        role: Numpy array of the speaker role code of each row
+        age_bin: Numpy array of the age bin of each row, `floor(age / bin_months)` or -1 without an age
+        count: Numpy array of the count of each row
+        bin_months: Width of the age bins in months (default 6)
+        key: "gloss" or "stem", the column the words come from (default "gloss")
+        db_version: String of the db version the index was built from (default None)
+    '''
+    def __init__(self, words, offsets, corpora, roles, corpus, role, age_bin, count,
+                 bin_months=6, key="gloss", db_version=None):
+        self.words = words
+        self.offsets = offsets
+        self.corpora = list(corpora)
+        self.roles = list(roles)
+        self.corpus = corpus
+        self.role = role
+        self.age_bin = age_bin
+        self.count = count
+        self.bin_months = bin_months
+        self.key = key
+        self.db_version = db_version
+        self._corpus_codes = {name: code for code, name in enumerate(self.corpora)}
+        self._role_codes = {name: code for code, name in enumerate(self.roles)}
+
+    @classmethod
+    def build(cls, db_version="current", key="gloss", bin_months=6, collection=None,
+              corpus=None, language=None, chunk_size=100000, connection=None,
+              db_args=None, backend=None):
+        '''
+        Build the index by streaming one table of a db version
+
+        Counts come from the token_frequency table for glosses and from
+        counting token rows for stems. Use backend="local" to build from a
+        snapshot.
+
+        Args:
+            db_version: String of the name of the database version to use (default "current")
+            key: "gloss" or "stem" (default "gloss")
+            bin_months: Width of the age bins in months (default 6)
+            collection: A string or list of strings of collections to restrict the index to (default None)
+            corpus: A string or list of strings of corpora to restrict the index to (default None)
+            language: A string or list of strings of languages to restrict the index to (default None)
+            chunk_size: The number of rows fetched per query (default 100000)
+            connection: A connection to the CHILDES database (default None)
+            db_args: Dict with host, user, and password defined (default None)
+            backend: String naming the query backend, "r", "native" or "local" (default None, see `set_backend`)
+
+        Returns:
+        A FrequencyIndex
+        '''
+        from .childespy import _iter_query, resolve_db_version
+        if key not in SOURCES:
+            raise ValueError(f"Unknown key {key!r}, expected one of {sorted(SOURCES)}")
+        table, count_column = SOURCES[key]
+        query = native.Query(table)
+        query.isin("collection_name", collection)
+        query.isin("corpus_name", corpus)
+        query.isin("language", language)
+        query.columns = ", ".join(["id", key, "corpus_name", "speaker_role", "target_child_age"] +
+                                  ([count_column] if count_column else []))
+
+        partials, held = [], 0
+        for chunk in _iter_query(query, chunk_size, connection, db_version, db_args, backend):
+            chunk = chunk[chunk[key].notna()]
+            age = pd.to_numeric(chunk["target_child_age"], errors="coerce")
+            partials.append(_aggregate([pd.DataFrame({
+                "word": chunk[key].astype(str).to_numpy(),
+                "corpus": chunk["corpus_name"].astype(str).to_numpy(),
+                "role": chunk["speaker_role"].fillna("").astype(str).to_numpy(),
+                "age_bin": np.floor(age / bin_months).fillna(NO_AGE).astype(np.int16).to_numpy(),
+                "count": (chunk[count_column].astype(np.int64).to_numpy() if count_column
+                          else np.ones(len(chunk), dtype=np.int64))})]))
+            held += len(partials[-1])
+            if held > REAGGREGATE_ROWS:
+                partials = [_aggregate(partials)]
+                held = len(partials[0])
+        if partials:
+            counts = _aggregate(partials)
+        else:
+            counts = pd.DataFrame({"word": [], "corpus": [], "role": [], "age_bin": [], "count": []})
+
+        words, word_codes = np.unique(counts["word"].to_numpy(dtype=str), return_inverse=True)
+        corpora, corpus_codes = np.unique(counts["corpus"].to_numpy(dtype=str), return_inverse=True)
+        roles, role_codes = np.unique(counts["role"].to_numpy(dtype=str), return_inverse=True)
+        order = np.lexsort((counts["age_bin"].to_numpy(), role_codes, corpus_codes, word_codes))
+        offsets = np.searchsorted(word_codes[order], np.arange(len(words) + 1)).astype(np.int64)
+        db_version = resolve_db_version(db_version, db_args, backend)
+        return(cls(words, offsets, corpora.tolist(), roles.tolist(),
+                   corpus_codes[order].astype(np.int32), role_codes[order].astype(np.int16),
+                   counts["age_bin"].to_numpy(dtype=np.int16)[order],
+                   counts["count"].to_numpy(dtype=np.int64)[order],
+                   bin_months, key, db_version))
+
+    def save(self, path):
+        '''
+        Write the index to the directory `path`, replacing an existing index there
+        '''
+        path = os.path.abspath(os.path.expanduser(path))
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        if os.path.exists(tmp_path):
+            shutil.rmtree(tmp_path)
+        os.makedirs(tmp_path)
+        for name in _ARRAYS:
+            np.save(os.path.join(tmp_path, f"{name}.npy"), np.asarray(getattr(self, name)))
+        with open(os.path.join(tmp_path, "index.json"), "w") as f:
+            json.dump({"corpora": self.corpora, "roles": self.roles, "bin_months": self.bin_months,
+                       "key": self.key, "db_version": self.db_version}, f)
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.replace(tmp_path, path)
+        return(path)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        '''
+        Open an index written by `save`, memory-mapping its arrays unless `mmap` is False
+        '''
+        path = os.path.expanduser(path)
+        with open(os.path.join(path, "index.json")) as f:
+            info = json.load(f)
+        #plain ndarray views of the maps, indexing np.memmap is several times slower
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"),
+                                mmap_mode="r" if mmap else None).view(np.ndarray)
+                  for name in _ARRAYS}
+        return(cls(arrays["words"], arrays["offsets"], info["corpora"], info["roles"],
+                   arrays["corpus"], arrays["role"], arrays["age_bin"], arrays["count"],
+                   info["bin_months"], info["key"], info["db_version"]))
+
+    def __len__(self):
+        return(len(self.words))
+
+    def __contains__(self, word):
+        return(self._rows(word) is not None)
+
+    def __repr__(self):
+        return(f"<FrequencyIndex {self.key} of {self.db_version}: {len(self.words)} words, "
+               f"{len(self.count)} counts, {self.bin_months} month age bins>")
+
+    def _rows(self, word):
+        #the slice of rows of `word`, or None
+        i = int(np.searchsorted(self.words, word))
+        if i == len(self.words) or self.words[i] != word:
+            return(None)
+        return(slice(int(self.offsets[i]), int(self.offsets[i + 1])))
+
+    def _mask(self, rows, corpus, role, age):
+        #rows of a word matching the filters, as a boolean mask (or True for all)
+        mask = True
+        for codes, values, column in ((self._corpus_codes, corpus, self.corpus),
+                                      (self._role_codes, role, self.role)):
+            if values is None:
+                continue
+            wanted = [codes[value] for value in native.as_list(values) if value in codes]
+            if len(wanted) == 1:
+                mask = mask & (column[rows] == wanted[0])
+            else:
+                mask = mask & np.isin(column[rows], wanted)
+        if age is not None:
+            age = native.as_list(age)
+            bins = self.age_bin[rows]
+            if len(age) == 1:
+                mask = mask & (bins == int(np.floor(age[0] / self.bin_months)))
+            else:
+                #bins whose start lies in [min age, max age)
+                start = bins.astype(np.float64) * self.bin_months
+                mask = mask & (bins != NO_AGE) & (start >= age[0]) & (start < age[1])
+        return(mask)
+
+    def frequency(self, word, corpus=None, role=None, age=None):
+        '''
+        The number of occurrences of a word
+
+        Args:
+            word: The gloss or stem to look up
+            corpus: A string or list of strings of corpora to count in (default None, all)
+            role: A string or list of strings of speaker roles to count (default None, all)
+            age: An age in months, counting its bin, or a [min, max) list of ages counting the bins starting in it (default None, all)
+
+        Returns:
+        The count as an int, 0 for unknown words
+        '''
+        rows = self._rows(word)
+        if rows is None:
+            return(0)
+        counts = self.count[rows]
+        mask = self._mask(rows, corpus, role, age)
+        return(int(counts.sum() if mask is True else counts[mask].sum()))
+
+    def trajectory(self, word, corpus=None, role=None):
+        '''
+        The counts of a word per age bin
+
+        Returns:
+        A pandas series of counts indexed by the first month of each age bin, without rows lacking an age
+        '''
+        rows = self._rows(word)
+        if rows is None:
+            return(pd.Series(dtype="int64", name=word).rename_axis("age"))
+        mask = self._mask(rows, corpus, role, None)
+        bins, counts = self.age_bin[rows], self.count[rows]
+        if mask is not True:
+            bins, counts = bins[mask], counts[mask]
+        has_age = bins != NO_AGE
+        bins, counts = bins[has_age], counts[has_age]
+        unique_bins, inverse = np.unique(bins, return_inverse=True)
+        totals = np.bincount(inverse, weights=counts, minlength=len(unique_bins)).astype(np.int64)
+        return(pd.Series(totals, index=pd.Index(unique_bins.astype(np.int64) * self.bin_months, name="age"),
+                         name=word))
+
+    def to_frame(self):
+        '''
+        The whole index as a pandas dataframe with word, corpus, role, age_bin and count columns
+        '''
+        return(pd.DataFrame({"word": np.repeat(self.words, np.diff(self.offsets)),
+                             "corpus": pd.Categorical.from_codes(self.corpus, self.corpora),
+                             "role": pd.Categorical.from_codes(self.role, self.roles),
+                             "age_bin": self.age_bin, "count": self.count}))
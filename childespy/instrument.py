@@ -0,0 +1,185 @@
+# per-call performance instrumentation for the query functions
+# every call through a query function produces a record with the wall time of
+# each stage (argument conversion, the R or SQL query, conversion to pandas,
+# NA cleanup, cache reads and writes), the rows and bytes returned and the
+# memory the call took. Records go to registered hooks, the "childespy" logger
+# and a bounded history summarized by stats()
+
+import collections
+import functools
+import logging
+import sys
+import threading
+import time
+import tracemalloc
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:
+    #not available on Windows
+    resource = None
+
+logger = logging.getLogger("childespy")
+
+#the most recent records, summarized by stats()
+history = collections.deque(maxlen=10000)
+_hooks = []
+_local = threading.local()
+
+def _peak_rss():
+    #peak resident set size of the process in bytes, ru_maxrss is in bytes on
+    #macOS and kilobytes elsewhere
+    if resource is None:
+        return(None)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return(peak if sys.platform == "darwin" else peak * 1024)
+
+def add_hook(callback):
+    '''
+    Call `callback(record)` with the record dictionary of every finished query
+    '''
+    _hooks.append(callback)
+
+def remove_hook(callback):
+    '''
+    Stop calling a callback registered with add_hook
+    '''
+    _hooks.remove(callback)
+
+class stage:
+    '''
+    A context manager adding the wall time of a block to a stage of the current query
+
+    Stages nest: time spent in an inner stage is only counted for the inner
+    one. Outside of a query the block simply runs.
+    '''
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.record = getattr(_local, "record", None)
+        if self.record is not None:
+            self.record["_stack"].append([self.name, time.perf_counter(), 0.0])
+        return(self)
+
+    def __exit__(self, *exc_info):
+        if self.record is None:
+            return
+        name, start, inner = self.record["_stack"].pop()
+        elapsed = time.perf_counter() - start
+        stages = self.record["stages"]
+        stages[name] = stages.get(name, 0.0) + elapsed - inner
+        if self.record["_stack"]:
+            self.record["_stack"][-1][2] += elapsed
+
+def timed(name):
+    '''
+    Decorator running a function inside `stage(name)`
+    '''
+    def decorator(function):
+        @functools.wraps(function)
+        def timed_function(*args, **kwargs):
+            with stage(name):
+                return(function(*args, **kwargs))
+        return(timed_function)
+    return(decorator)
+
+class record_query:
+    '''
+    A context manager recording one query function call
+
+    Args:
+        function: Name of the query function
+        backend: Name of the backend running it
+    '''
+    def __init__(self, function, backend):
+        self.function = function
+        self.backend = backend
+        self.result = None
+
+    def __enter__(self):
+        self.outer = getattr(_local, "record", None)
+        self.record = {"function": self.function, "backend": self.backend,
+                       "stages": {}, "_stack": []}
+        if self.outer is None:
+            _local.record = self.record
+            self.start_rss = _peak_rss()
+            self.traced = tracemalloc.is_tracing() and hasattr(tracemalloc, "reset_peak")
+            if self.traced:
+                #python 3.9+, the peak then covers this call only
+                tracemalloc.reset_peak()
+                self.start_traced = tracemalloc.get_traced_memory()[0]
+        self.start = time.perf_counter()
+        return(self)
+
+    def __exit__(self, exc_type, exc, traceback):
+        if self.outer is not None:
+            #a query function called by another one is part of the outer record
+            return
+        _local.record = None
+        record = self.record
+        del record["_stack"]
+        record["seconds"] = time.perf_counter() - self.start
+        record["error"] = None if exc_type is None else repr(exc)
+        record["cached"] = "cache_read" in record["stages"] and "query" not in record["stages"]
+        result = self.result
+        if isinstance(result, pd.DataFrame):
+            record["rows"] = len(result)
+            record["bytes"] = int(result.memory_usage(index=True, deep=True).sum())
+        else:
+            record["rows"] = record["bytes"] = None
+        #how far the call raised the process peak, 0 when it stayed below an earlier peak
+        end_rss = _peak_rss()
+        record["peak_rss_growth_bytes"] = None if end_rss is None else end_rss - self.start_rss
+        record["traced_peak_bytes"] = (tracemalloc.get_traced_memory()[1] - self.start_traced
+                                       if self.traced else None)
+        history.append(record)
+        logger.debug("%s (%s backend) took %.3fs: %s, %s rows",
+                     record["function"], record["backend"], record["seconds"],
+                     ", ".join(f"{name} {seconds:.3f}s" for name, seconds in record["stages"].items()),
+                     record["rows"])
+        for callback in list(_hooks):
+            try:
+                callback(record)
+            except Exception:
+                logger.exception("childespy instrumentation hook %r failed", callback)
+
+def stats(by = "function"):
+    '''
+    Summarize the recorded query calls
+
+    Args:
+        by: Column or list of columns to group by, e.g. "function" or ["function", "backend"] (default "function")
+
+    Returns:
+        A pandas dataframe with the number of calls, errors and cache hits, the total
+        and mean seconds, the seconds spent in each stage, rows and bytes returned
+        and the largest growth of the process peak memory and traced peak of one call
+    '''
+    records = list(history)
+    if not records:
+        return(pd.DataFrame())
+    df = pd.DataFrame([{"function": r["function"], "backend": r["backend"],
+                        "seconds": r["seconds"], "rows": r["rows"], "bytes": r["bytes"],
+                        "error": r["error"] is not None, "cached": r["cached"],
+                        "peak_rss_growth_bytes": r["peak_rss_growth_bytes"],
+                        "traced_peak_bytes": r["traced_peak_bytes"],
+                        **{f"{name}_seconds": seconds for name, seconds in r["stages"].items()}}
+                       for r in records])
+    stage_columns = [c for c in df.columns if c.endswith("_seconds") and c != "seconds"]
+    grouped = df.groupby(by)
+    summary = grouped.agg(calls=("seconds", "size"), errors=("error", "sum"),
+                          cache_hits=("cached", "sum"), seconds=("seconds", "sum"),
+                          mean_seconds=("seconds", "mean"), rows=("rows", "sum"),
+                          bytes=("bytes", "sum"),
+                          peak_rss_growth_bytes=("peak_rss_growth_bytes", "max"),
+                          traced_peak_bytes=("traced_peak_bytes", "max"))
+    return(summary.join(grouped[stage_columns].sum()))
+
+def reset_stats():
+    '''
+    Forget all recorded query calls
+    '''
+    history.clear()
@@ -0,0 +1,263 @@
+# lazy, composable queries
+# tokens(), utterances(), ... return a LazyQuery that only builds SQL; filters,
+# projections, grouping and aggregation are added by chaining and the whole
+# thing runs as one statement on the server when collected:
+#
+#   childespy.tokens(language="eng", role="Target_Child") \
+#       .groupby("gloss", "target_child_age").count().collect()
+
+import re
+
+import numpy as np
+import pandas as pd
+
+from . import childespy
+from . import instrument
+from . import native
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+_AGGREGATE = re.compile(r"^\s*(count|sum|avg|min|max)\s*\(\s*(distinct\s+)?([A-Za-z_][A-Za-z0-9_]*|\*)\s*\)\s*$",
+                        re.IGNORECASE)
+
+def _identifier(name):
+    if not _IDENTIFIER.match(name):
+        raise ValueError(f"{name!r} is not a column name")
+    return(name)
+
+class LazyQuery:
+    '''
+    A query over one childes-db table that runs only when collected
+
+    Every method returns a new LazyQuery, so partial queries can be reused.
+
+    Args:
+        query: The native.Query holding the table and its filters
+        expressions: Dict of column names computed by SQL expressions, e.g. the replaced gloss (default None)
+        connection: A connection to the CHILDES database (default None)
+        db_version: String of the name of the database version to use (default "current")
+        db_args: Dict with host, user, and password defined (default None)
+        backend: String naming the query backend, "r", "native" or "local" (default None, see `set_backend`)
+    '''
+    def __init__(self, query, expressions=None, connection=None, db_version="current",
+                 db_args=None, backend=None):
+        self._query = query
+        self._expressions = dict(expressions or {})
+        self._columns = None
+        self._groups = None
+        self._aggregates = None
+        self._order = []
+        self._limit = None
+        self.connection = connection
+        self.db_version = db_version
+        self.db_args = db_args
+        self.backend = backend
+
+    def _copy(self):
+        lazy = LazyQuery(self._query.copy(), self._expressions, self.connection,
+                         self.db_version, self.db_args, self.backend)
+        lazy._columns = self._columns
+        lazy._groups = self._groups
+        lazy._aggregates = self._aggregates
+        lazy._order = list(self._order)
+        lazy._limit = self._limit
+        return(lazy)
+
+    def _column(self, name):
+        #the SQL for a column, computed columns are expanded
+        return(self._expressions.get(_identifier(name), name))
+
+    def where(self, clause=None, *params, **filters):
+        '''
+        Add filters, either a SQL condition with `?` placeholders or column=value keywords
+
+        A list, tuple, set, numpy array or pandas Series value matches any of its values:
+
+            query.where("target_child_age < ?", 24).where(speaker_role=["Mother", "Father"])
+        '''
+        lazy = self._copy()
+        if clause is not None:
+            lazy._query.where(f"({clause})", *params)
+        for name, value in filters.items():
+            column = lazy._column(name)
+            if isinstance(value, (list, tuple, set, np.ndarray, pd.Series, pd.Index)):
+                lazy._query.isin(column, value)
+            elif value is None:
+                lazy._query.where(f"{column} IS NULL")
+            else:
+                lazy._query.where(f"{column} = ?", value)
+        return(lazy)
+
+    def select(self, *columns):
+        '''
+        Only fetch the given columns
+        '''
+        lazy = self._copy()
+        lazy._columns = [_identifier(column) for column in columns]
+        return(lazy)
+
+    def groupby(self, *columns):
+        '''
+        Group by columns, followed by count() or agg()
+        '''
+        lazy = self._copy()
+        lazy._groups = [_identifier(column) for column in columns]
+        return(lazy)
+
+    def agg(self, **aggregates):
+        '''
+        Aggregate (per group after groupby), e.g. agg(n="count(*)", types="count(distinct gloss)", age="avg(target_child_age)")
+
+        Supported functions are count, sum, avg, min and max of one column, optionally distinct.
+        '''
+        lazy = self._copy()
+        lazy._aggregates = []
+        for name, expression in aggregates.items():
+            match = _AGGREGATE.match(expression)
+            if match is None:
+                raise ValueError(f"Unsupported aggregate {expression!r}")
+            function, distinct, column = match.groups()
+            column = "*" if column == "*" else lazy._column(column)
+            lazy._aggregates.append((_identifier(name), f"{function.upper()}({'DISTINCT ' if distinct else ''}{column})"))
+        return(lazy)
+
+    def count(self, name="n"):
+        '''
+        Count rows (per group after groupby) into a column called `name`
+        '''
+        return(self.agg(**{name: "count(*)"}))
+
+    def order_by(self, *columns, descending=False):
+        '''
+        Sort the result by columns (including aggregate names)
+        '''
+        lazy = self._copy()
+        direction = " DESC" if descending else ""
+        lazy._order.extend(f"{_identifier(column)}{direction}" for column in columns)
+        return(lazy)
+
+    def limit(self, n):
+        '''
+        Fetch at most `n` rows
+        '''
+        lazy = self._copy()
+        lazy._limit = int(n)
+        return(lazy)
+
+    def sql(self):
+        '''
+        Returns the query as a (sql, params) pair with `?` placeholders
+        '''
+        def output(name):
+            return(name if name not in self._expressions else f"{self._expressions[name]} AS {name}")
+        if self._aggregates:
+            groups = self._groups or []
+            columns = [output(name) for name in groups] + \
+                      [f"{expression} AS {name}" for name, expression in self._aggregates]
+        elif self._groups:
+            raise ValueError("groupby needs count() or agg()")
+        elif self._columns:
+            columns = [output(name) for name in self._columns]
+        else:
+            columns = ["*"]
+        query = self._query.copy()
+        query.columns = ", ".join(columns)
+        sql = query.sql()
+        if self._aggregates and self._groups:
+            sql += " GROUP BY " + ", ".join(self._column(name) for name in self._groups)
+        if self._order:
+            sql += " ORDER BY " + ", ".join(self._order)
+        if self._limit is not None:
+            sql += f" LIMIT {self._limit}"
+        return(sql, list(query.params))
+
+    def collect(self):
+        '''
+        Run the query on the server and return the result as a pandas dataframe
+        '''
+        sql, params = self.sql()
+        backend = self.backend or childespy.get_backend()
+        with instrument.record_query("collect", backend) as record:
+            if childespy._backends[backend] is None:
+                result = childespy.get_sql_query(native.render_query(sql, params), self.connection,
+                                                 self.db_version, self.db_args, backend="r")
+            else:
+                module = childespy._backends[backend]
+                connection = self.connection
+                if connection is None:
+                    with instrument.stage("connect"):
+                        connection = module.connect_to_childes(self.db_version, self.db_args)
+                try:
+                    result = native.read_query(sql, params, connection)
+                finally:
+                    if self.connection is None:
+                        connection.close()
+            if not (self._columns or self._aggregates) and "gloss" in self._expressions:
+                result = native.replace_gloss(result)
+            record.result = result
+        return(result)
+
+    to_pandas = collect
+
+    def __repr__(self):
+        sql, params = self.sql()
+        return(f"<LazyQuery {sql} {params}>")
+
+def _lazy(query, expressions=None, connection=None, db_version="current", db_args=None, backend=None):
+    return(LazyQuery(query, expressions, connection, db_version, db_args, backend))
+
+def tokens(token=None, collection=None, language=None, corpus=None,
+           target_child=None, role=None, role_exclude=None,
+           age=None, sex=None, stem=None, part_of_speech=None, replace=True,
+           connection=None, db_version="current", db_args=None, backend=None):
+    '''
+    A lazy token query taking the filters of get_tokens
+    '''
+    query = native.token_query(token, collection=collection, language=language,
+                               corpus=corpus, target_child=target_child, role=role,
+                               role_exclude=role_exclude, age=age, sex=sex, stem=stem,
+                               part_of_speech=part_of_speech, replace=replace)
+    expressions = {"gloss": native.REPLACED_GLOSS} if replace else None
+    return(_lazy(query, expressions, connection, db_version, db_args, backend))
+
+def utterances(collection=None, language=None, corpus=None,
+               role=None, role_exclude=None, age=None,
+               sex=None, target_child=None,
+               connection=None, db_version="current", db_args=None, backend=None):
+    '''
+    A lazy utterance query taking the filters of get_utterances
+    '''
+    query = native.utterance_query(collection=collection, language=language,
+                                   corpus=corpus, role=role, role_exclude=role_exclude,
+                                   age=age, sex=sex, target_child=target_child)
+    return(_lazy(query, None, connection, db_version, db_args, backend))
+
+def types(token_type=None, collection=None, language=None, corpus=None,
+          role=None, role_exclude=None, age=None,
+          sex=None, target_child=None,
+          connection=None, db_version="current", db_args=None, backend=None):
+    '''
+    A lazy type query taking the filters of get_types
+    '''
+    query = native.speaker_filters(native.Query("token_frequency"), collection=collection,
+                                   language=language, corpus=corpus,
+                                   target_child=target_child, role=role,
+                                   role_exclude=role_exclude, age=age, sex=sex)
+    query.like_any("gloss", token_type)
+    return(_lazy(query, None, connection, db_version, db_args, backend))
+
+def transcripts(collection=None, corpus=None, target_child=None,
+                connection=None, db_version="current", db_args=None, backend=None):
+    '''
+    A lazy transcript query taking the filters of get_transcripts
+    '''
+    query = native.Query("transcript")
+    query.isin("collection_name", collection)
+    query.isin("corpus_name", corpus)
+    query.isin("target_child_name", target_child)
+    return(_lazy(query, None, connection, db_version, db_args, backend))
+
+def table(name, connection=None, db_version="current", db_args=None, backend=None):
+    '''
+    A lazy query over any childes-db table, e.g. table("participant")
+    '''
+    return(_lazy(native.Query(_identifier(name)), None, connection, db_version, db_args, backend))
@@ -0,0 +1,419 @@
+# local offline snapshots of childes-db
+# snapshot() copies the tables of one db version into an indexed SQLite file,
+# and the "local" backend runs the native queries against that file, so
+# machines without access to the public server can use the same API
+
+import ast
+import contextlib
+import datetime
+import os
+import sqlite3
+import threading
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from . import native
+
+#tables copied by snapshot(), all of them with an `id` column
+TABLES = ["collection", "corpus", "transcript", "participant",
+          "transcript_by_speaker", "utterance", "token", "token_frequency"]
+
+#tables with a transcript_id column, synced transcript by transcript
+TRANSCRIPT_TABLES = ["transcript_by_speaker", "utterance", "token", "token_frequency"]
+
+#content columns of each transcript table summed into sync()'s checksum, those a table has
+CHECKSUM_COLUMNS = {
+    "transcript_by_speaker": ["speaker_id", "num_utterances", "num_tokens", "num_types", "num_morphemes"],
+    "utterance": ["gloss", "stem", "actual_phonology", "model_phonology", "type", "part_of_speech",
+                  "num_morphemes", "num_tokens", "utterance_order", "speaker_id"],
+    "token": ["gloss", "replacement", "stem", "part_of_speech", "prefix", "suffix", "english",
+              "clitic", "token_order", "utterance_id", "speaker_id"],
+    "token_frequency": ["gloss", "count", "speaker_id"],
+}
+
+#columns the query functions filter or join on, indexed when a table has them
+INDEXED_COLUMNS = [("collection_name",), ("corpus_name",), ("target_child_name",),
+                   ("speaker_role",), ("language",), ("target_child_age",),
+                   ("transcript_id",), ("utterance_id",), ("gloss",), ("stem",),
+                   ("part_of_speech",), ("transcript_id", "utterance_order")]
+
+#snapshot paths by db_version, filled in by snapshot() and register_snapshot()
+_snapshots = {}
+_snapshots_lock = threading.Lock()
+
+def default_directory():
+    '''
+    The snapshot directory from $CHILDESPY_SNAPSHOT_DIR, or ~/.childespy/snapshots
+    '''
+    return(os.environ.get("CHILDESPY_SNAPSHOT_DIR",
+                          os.path.join(os.path.expanduser("~"), ".childespy", "snapshots")))
+
+def snapshot_info(path):
+    '''
+    Returns the metadata stored in a snapshot file as a dictionary
+    '''
+    with contextlib.closing(sqlite3.connect(f"file:{path}?mode=ro", uri=True)) as connection:
+        return(dict(connection.execute("SELECT key, value FROM snapshot_info").fetchall()))
+
+def register_snapshot(path, db_version=None):
+    '''
+    Make a snapshot file available to the local backend
+
+    Args:
+        path: Path of a snapshot file
+        db_version: String of the db version to register it as (default None, the version stored in the file)
+    '''
+    path = os.path.abspath(os.path.expanduser(path))
+    names = [db_version] if db_version is not None else []
+    if db_version is None or db_version == "current":
+        names.append(snapshot_info(path)["db_version"])
+    with _snapshots_lock:
+        for name in names:
+            _snapshots[name] = path
+    return(path)
+
+def snapshot_path(db_version="current", db_args=None):
+    '''
+    Find the snapshot file for a db version
+
+    Looks at `db_args["path"]`, then snapshots registered in this process,
+    then `<default_directory()>/<db_version>.sqlite`.
+    '''
+    if db_args is not None and "path" in db_args:
+        return(os.path.expanduser(db_args["path"]))
+    with _snapshots_lock:
+        if db_version in _snapshots:
+            return(_snapshots[db_version])
+    path = os.path.join(default_directory(), f"{db_version}.sqlite")
+    if os.path.exists(path):
+        return(path)
+    raise FileNotFoundError(f"No local snapshot of db version {db_version!r}, "
+                            "create one with childespy.snapshot() or pass db_args={'path': ...}")
+
+### backend functions ###
+def connect_to_childes(db_version="current", db_args=None):
+    """Opens a snapshot file
+
+    Args:
+        db_version: String of the name of the database version to use (default "current")
+        db_args: Dict with the snapshot `path` (default None, see `snapshot_path`)
+
+    Returns:
+        A sqlite3 connection
+    """
+    path = snapshot_path(db_version, db_args)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Snapshot file {path} does not exist")
+    return(sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False))
+
+def check_connection(db_version="current", db_args=None):
+    try:
+        connect_to_childes(db_version, db_args).close()
+    except Exception:
+        return(False)
+    return(True)
+
+def clear_connections():
+    #local connections are closed by the functions that open them
+    return(None)
+
+def _with_snapshot(native_function):
+    def function(*args, connection=None, db_version="current", db_args=None, **kwargs):
+        own_connection = connection is None
+        if own_connection:
+            connection = connect_to_childes(db_version, db_args)
+        try:
+            return(native_function(*args, connection=connection, db_version=db_version,
+                                   db_args=db_args, **kwargs))
+        finally:
+            if own_connection:
+                connection.close()
+    function.__name__ = native_function.__name__
+    function.__doc__ = native_function.__doc__
+    return(function)
+
+for _name in ["get_collections", "get_corpora", "get_transcripts", "get_participants",
+              "get_speaker_statistics", "get_tokens", "get_types", "get_utterances",
+              "get_contexts", "get_sql_query"]:
+    globals()[_name] = _with_snapshot(getattr(native, _name))
+
+### building snapshots ###
+def _create_indexes(connection, table):
+    columns = {row[1] for row in connection.execute(f"PRAGMA table_info({table})")}
+    for index_columns in INDEXED_COLUMNS:
+        if set(index_columns) <= columns:
+            name = f"idx_{table}_{'_'.join(index_columns)}"
+            connection.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(index_columns)})")
+
+def _table_query(table, collection=None, corpus=None):
+    query = native.Query(table)
+    if table == "collection":
+        return(query.isin("name", collection))
+    if table == "corpus":
+        return(query.isin("collection_name", collection).isin("name", corpus))
+    return(query.isin("collection_name", collection).isin("corpus_name", corpus))
+
+def snapshot(db_version="current", path=None, collection=None, corpus=None,
+             tables=None, chunk_size=100000, db_args=None, backend=None):
+    '''
+    Copy the tables of a childes-db version into a local, indexed SQLite file
+
+    Tables are streamed in chunks of `chunk_size` rows, so the copy never holds
+    a whole table in memory. The file is written next to `path` and moved into
+    place when complete, then registered for the "local" backend:
+
+        childespy.snapshot("2020.1", "childes-2020.1.sqlite")
+        childespy.get_tokens(token="dog", db_version="2020.1", backend="local")
+
+    Args:
+        db_version: String of the name of the database version to copy (default "current")
+        path: Path of the snapshot file (default None, `<default_directory()>/<db version>.sqlite`)
+        collection: A string or list of strings of collections to restrict the copy to (default None)
+        corpus: A string or list of strings of corpora to restrict the copy to (default None)
+        tables: A list of the tables to copy (default None, all of TABLES)
+        chunk_size: The number of rows fetched per query (default 100000)
+        db_args: Dict with host, user, and password defined (default None)
+        backend: String naming the backend to copy from, "r" or "native" (default None, see `set_backend`)
+
+    Returns:
+        The path of the snapshot file
+    '''
+    from .childespy import _iter_query, get_sql_query, resolve_db_version
+    if backend == "local":
+        raise ValueError("Snapshots are copied from the \"r\" or \"native\" backend")
+    resolved_version = resolve_db_version(db_version, db_args, backend)
+    if path is None:
+        path = os.path.join(default_directory(), f"{resolved_version}.sqlite")
+    path = os.path.abspath(os.path.expanduser(path))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    connection = sqlite3.connect(tmp_path)
+    try:
+        for table in tables or TABLES:
+            query = _table_query(table, collection, corpus)
+            for chunk in _iter_query(query, chunk_size, None, db_version, db_args, backend):
+                chunk.to_sql(table, connection, if_exists="append", index=False)
+            if not connection.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (table,)).fetchall():
+                #nothing matched, keep the columns so queries still work
+                empty = get_sql_query(f"SELECT * FROM {table} WHERE 1 = 0", None, db_version,
+                                      db_args, backend=backend)
+                empty.to_sql(table, connection, index=False)
+            _create_indexes(connection, table)
+        info = {"db_version": resolved_version,
+                "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                "collection": repr(collection), "corpus": repr(corpus)}
+        connection.execute("CREATE TABLE snapshot_info (key TEXT PRIMARY KEY, value TEXT)")
+        connection.executemany("INSERT INTO snapshot_info VALUES (?, ?)", info.items())
+        connection.commit()
+    except BaseException:
+        connection.close()
+        os.remove(tmp_path)
+        raise
+    connection.close()
+    os.replace(tmp_path, path)
+    register_snapshot(path, db_version)
+    register_snapshot(path, resolved_version)
+    return(path)
+
+### syncing snapshots ###
+def _concat_ws(separator, *values):
+    #MySQL's CONCAT_WS, skipping NULLs and writing integral floats (integer
+    #columns with NULLs in a snapshot) as MySQL writes the integers
+    return(separator.join(str(int(value)) if isinstance(value, float) and value.is_integer() else str(value)
+                          for value in values if value is not None))
+
+def _crc32(value):
+    return(None if value is None else zlib.crc32(str(value).encode("utf-8")))
+
+class _BitXor:
+    def __init__(self):
+        self.value = 0
+
+    def step(self, value):
+        if value is not None:
+            self.value ^= value
+
+    def finalize(self):
+        return(self.value)
+
+def add_sql_functions(connection):
+    '''
+    Register MySQL's CONCAT_WS, CRC32 and BIT_XOR on a sqlite3 connection, so sync() can checksum a snapshot
+    '''
+    connection.create_function("CONCAT_WS", -1, _concat_ws)
+    connection.create_function("CRC32", 1, _crc32)
+    connection.create_aggregate("BIT_XOR", 1, _BitXor)
+    return(connection)
+
+def _fingerprints(fetch, tables, checksum_columns, collection, corpus):
+    #one row per transcript with the row count, id range, id sum and a
+    #checksum of the content columns of each table
+    fingerprints = None
+    for table in tables:
+        query = _table_query(table, collection, corpus)
+        columns = ", ".join(checksum_columns[table]) or "''"
+        query.columns = (f"transcript_id, COUNT(*) AS {table}_rows, MIN(id) AS {table}_min_id, "
+                         f"MAX(id) AS {table}_max_id, SUM(id) AS {table}_id_sum, "
+                         f"BIT_XOR(CRC32(CONCAT_WS('|', {columns}))) AS {table}_checksum")
+        counts = fetch(f"{query.sql()} GROUP BY transcript_id", query.params)
+        counts = counts.dropna(subset=["transcript_id"]).astype("float64").set_index("transcript_id")
+        fingerprints = counts if fingerprints is None else fingerprints.join(counts, how="outer")
+    return(fingerprints.fillna(0))
+
+def _normalize(value):
+    #compare values across drivers, which differ in how they return ints, floats and dates
+    if value is None or (isinstance(value, float) and value != value):
+        return(None)
+    if isinstance(value, float) and value.is_integer():
+        return(str(int(value)))
+    return(str(value))
+
+def _normalized(df):
+    #an object array, so no pandas version infers a dtype that turns None into NaN
+    return(np.frompyfunc(_normalize, 1, 1)(df.to_numpy(dtype=object)).astype(object))
+
+def _columns(connection, table):
+    return([row[1] for row in connection.execute(f"PRAGMA table_info({table})")])
+
+def sync(previous, db_version="current", path=None, chunk_size=100000, batch_size=500,
+         db_args=None, backend=None):
+    '''
+    Update a snapshot to another db version, downloading only the transcripts that changed
+
+    Transcripts are matched by id. A transcript is unchanged when its row in
+    the transcript table and the row count, id range, id sum and a checksum
+    of the content columns (CHECKSUM_COLUMNS, computed by the server) of
+    each of its tables are the same in both versions. Those rows are kept from the old
+    snapshot. Changed and new transcripts are downloaded, removed ones are
+    deleted, and the small collection, corpus and participant tables are
+    copied again. A table whose columns changed is copied in full. The
+    collection and corpus restrictions of the old snapshot are kept.
+
+        report = childespy.sync("childes-2020.1.sqlite", "2021.1")
+        report["transcripts"].groupby("status").size()
+
+    Args:
+        previous: Path of the old snapshot, or the db version it is registered as
+        db_version: String of the name of the database version to sync to (default "current")
+        path: Path of the new snapshot (default None, `<default_directory()>/<db version>.sqlite`, which may be `previous`)
+        chunk_size: The number of rows fetched per query (default 100000)
+        batch_size: The number of transcripts downloaded per query (default 500)
+        db_args: Dict with host, user, and password defined (default None)
+        backend: String naming the backend to copy from, "r" or "native" (default None, see `set_backend`)
+
+    Returns:
+        A dictionary with the `path` of the new snapshot, the `db_version` and
+        `previous_db_version`, a `transcripts` dataframe of the added,
+        changed and removed transcripts (id, corpus_name, filename, status),
+        the number of `unchanged` transcripts and the number of `rows`
+        downloaded per table
+    '''
+    from .childespy import _fetcher, _iter_query, resolve_db_version
+    if backend == "local":
+        raise ValueError("Snapshots are synced from the \"r\" or \"native\" backend")
+    previous_path = previous if os.path.exists(os.path.expanduser(previous)) else snapshot_path(previous)
+    previous_path = os.path.abspath(os.path.expanduser(previous_path))
+    info = snapshot_info(previous_path)
+    collection, corpus = ast.literal_eval(info["collection"]), ast.literal_eval(info["corpus"])
+    resolved_version = resolve_db_version(db_version, db_args, backend)
+    if path is None:
+        path = os.path.join(default_directory(), f"{resolved_version}.sqlite")
+    path = os.path.abspath(os.path.expanduser(path))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    #a copy of the old snapshot becomes the new one
+    old = sqlite3.connect(f"file:{previous_path}?mode=ro", uri=True)
+    try:
+        copy = add_sql_functions(sqlite3.connect(tmp_path))
+        old.backup(copy)
+    finally:
+        old.close()
+    tables = [table for table in TABLES if _columns(copy, table)]
+    transcript_tables = [table for table in TRANSCRIPT_TABLES if table in tables]
+    rows = {}
+    try:
+        with _fetcher(None, db_version, db_args, backend) as fetch:
+            empty = {table: fetch(f"SELECT * FROM {table} WHERE 1 = 0", []) for table in tables}
+            #which transcripts changed
+            query = _table_query("transcript", collection, corpus)
+            new_transcripts = fetch(query.sql(), query.params)
+            old_transcripts = pd.read_sql("SELECT * FROM transcript", copy)
+            checksum_columns = {table: [column for column in CHECKSUM_COLUMNS[table]
+                                        if column in empty[table].columns and column in _columns(copy, table)]
+                                for table in transcript_tables}
+            new_prints = _fingerprints(fetch, transcript_tables, checksum_columns, collection, corpus)
+            old_prints = _fingerprints(lambda sql, params: pd.read_sql(sql, copy, params=tuple(params)),
+                                       transcript_tables, checksum_columns, None, None)
+            new_ids = set(new_transcripts["id"].astype("int64"))
+            old_ids = set(old_transcripts["id"].astype("int64"))
+            common = sorted(new_ids & old_ids)
+            columns = [c for c in new_transcripts.columns if c in old_transcripts.columns]
+            new_rows, old_rows = _normalized(new_transcripts[columns]), _normalized(old_transcripts[columns])
+            new_positions = pd.Index(new_transcripts["id"].astype("int64")).get_indexer(common)
+            old_positions = pd.Index(old_transcripts["id"].astype("int64")).get_indexer(common)
+            prints = new_prints.reindex(common, fill_value=0).join(
+                old_prints.reindex(common, fill_value=0), rsuffix="_old")
+            differs = pd.Series(False, index=pd.Index(common))
+            for column in new_prints.columns:
+                differs |= prints[column].to_numpy() != prints[f"{column}_old"].to_numpy()
+            #numpy compares None equal to None, pandas would not
+            differs |= (new_rows[new_positions] != old_rows[old_positions]).any(axis=1)
+            status = {**{i: "added" for i in new_ids - old_ids},
+                      **{i: "removed" for i in old_ids - new_ids},
+                      **{i: "changed" for i in differs.index[differs]}}
+            stale = [i for i, s in status.items() if s != "added"]
+            fresh = [i for i, s in status.items() if s != "removed"]
+
+            for table in tables:
+                columns = list(empty[table].columns)
+                full_copy = table not in transcript_tables or columns != _columns(copy, table)
+                rows[table] = 0
+                if full_copy:
+                    copy.execute(f"DELETE FROM {table}")
+                    if columns != _columns(copy, table):
+                        copy.execute(f"DROP TABLE {table}")
+                        empty[table].to_sql(table, copy, index=False)
+                    query = _table_query(table, collection, corpus)
+                    batches = [query]
+                else:
+                    copy.execute("CREATE TEMP TABLE IF NOT EXISTS sync_ids (id INTEGER PRIMARY KEY)")
+                    copy.execute("DELETE FROM sync_ids")
+                    copy.executemany("INSERT INTO sync_ids VALUES (?)", [(int(i),) for i in stale])
+                    copy.execute(f"DELETE FROM {table} WHERE transcript_id IN (SELECT id FROM sync_ids)")
+                    batches = [native.Query(table).isin("transcript_id", fresh[i:i + batch_size])
+                               for i in range(0, len(fresh), batch_size)]
+                for query in batches:
+                    for chunk in _iter_query(query, chunk_size, None, db_version, db_args, backend):
+                        chunk.to_sql(table, copy, if_exists="append", index=False)
+                        rows[table] += len(chunk)
+                _create_indexes(copy, table)
+        copy.execute("DELETE FROM snapshot_info WHERE key IN ('db_version', 'created', 'synced_from')")
+        copy.executemany("INSERT INTO snapshot_info VALUES (?, ?)",
+                         [("db_version", resolved_version),
+                          ("created", datetime.datetime.now(datetime.timezone.utc).isoformat()),
+                          ("synced_from", info["db_version"])])
+        copy.commit()
+    except BaseException:
+        copy.close()
+        os.remove(tmp_path)
+        raise
+    copy.close()
+    os.replace(tmp_path, path)
+    register_snapshot(path, db_version)
+    register_snapshot(path, resolved_version)
+
+    transcripts = pd.concat([new_transcripts, old_transcripts[old_transcripts["id"].isin(list(old_ids - new_ids))]],
+                            ignore_index=True)
+    transcripts["id"] = transcripts["id"].astype("int64")
+    transcripts = transcripts[transcripts["id"].isin(list(status))][["id", "corpus_name", "filename"]]
+    transcripts = transcripts.assign(status=transcripts["id"].map(status)).sort_values("id", ignore_index=True)
+    return({"path": path, "db_version": resolved_version, "previous_db_version": info["db_version"],
+            "transcripts": transcripts, "unchanged": len(common) - int(differs.sum()), "rows": rows})
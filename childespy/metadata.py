@@ -0,0 +1,205 @@
+# an in-process cache of the small, rarely changing metadata tables
+# get_db_info(), the collection table and the corpus table are kept for `ttl`
+# seconds per db_version/db_args/backend and shared by all threads, together
+# with name-to-id and collection-to-corpora maps, so validating and expanding
+# user supplied names does not need a query. The module level get_db_info,
+# get_collections and get_corpora read through it when no connection is given
+
+import difflib
+import threading
+import time
+
+from . import native
+
+DEFAULT_TTL = 3600
+
+def _key(db_version, db_args, backend):
+    return((db_version, None if db_args is None else tuple(sorted(db_args.items())), backend))
+
+class Metadata:
+    '''
+    The collections and corpora of one database with lookup maps
+
+    Attributes:
+        collections: A pandas dataframe of the collection table
+        corpora: A pandas dataframe of the corpus table
+        collection_ids: Dict of collection name to id
+        corpus_ids: Dict of corpus name to id
+        corpus_collections: Dict of corpus name to collection name
+        collection_corpora: Dict of collection name to the list of its corpus names
+    '''
+    def __init__(self, collections, corpora):
+        self.collections = collections
+        self.corpora = corpora
+        self.collection_ids = {name: int(i) for name, i in zip(collections["name"], collections["id"])}
+        self.corpus_ids = {name: int(i) for name, i in zip(corpora["name"], corpora["id"])}
+        self.corpus_collections = dict(zip(corpora["name"], corpora["collection_name"]))
+        self.collection_corpora = {name: [] for name in self.collection_ids}
+        for corpus, collection in self.corpus_collections.items():
+            self.collection_corpora.setdefault(collection, []).append(corpus)
+
+    def validate(self, collection=None, corpus=None):
+        '''
+        Raise ValueError naming the collections and corpora that do not exist, with close matches
+        '''
+        problems = []
+        for kind, names, known in (("collection", collection, self.collection_ids),
+                                   ("corpus", corpus, self.corpus_ids)):
+            for name in native.as_list(names) or []:
+                if name not in known:
+                    close = difflib.get_close_matches(name, list(known), n=3)
+                    hint = f" (did you mean {', '.join(map(repr, close))}?)" if close else ""
+                    problems.append(f"unknown {kind} {name!r}{hint}")
+        if problems:
+            raise ValueError("; ".join(problems))
+
+    def expand(self, collection):
+        '''
+        Returns the list of corpus names in a collection or list of collections
+        '''
+        self.validate(collection=collection)
+        return([corpus for name in native.as_list(collection) for corpus in self.collection_corpora[name]])
+
+class MetadataCache:
+    '''
+    A thread-safe TTL cache of db info and Metadata per db_version/db_args/backend
+
+    Each entry is loaded by one thread while others asking for it wait, and is
+    reloaded on the first use after `ttl` seconds or after `refresh()`.
+
+    Args:
+        ttl: Seconds an entry stays fresh, None to keep entries until refreshed (default 3600)
+    '''
+    def __init__(self, ttl=DEFAULT_TTL):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        #entries as key -> (value, time loaded)
+        self._entries = {}
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    def _fresh(self, key):
+        entry = self._entries.get(key)
+        if entry is not None and (self.ttl is None or time.monotonic() - entry[1] < self.ttl):
+            return(entry)
+        return(None)
+
+    def _get(self, key, load):
+        with self._lock:
+            entry = self._fresh(key)
+            if entry is not None:
+                self.hits += 1
+                return(entry[0])
+            loading = self._loading.setdefault(key, threading.Lock())
+        with loading:
+            with self._lock:
+                #another thread may have loaded it while this one waited
+                entry = self._fresh(key)
+                if entry is not None:
+                    self.hits += 1
+                    return(entry[0])
+            value = load()
+            with self._lock:
+                self._entries[key] = (value, time.monotonic())
+                self.misses += 1
+        return(value)
+
+    def db_info(self, backend=None):
+        '''
+        The cached result of get_db_info(), read through childesr on the r backend
+        and from the public settings file otherwise
+
+        Args:
+            backend: String naming the query backend, "r", "native" or "local" (default None, see `set_backend`)
+        '''
+        from .childespy import _fetch_db_info, get_backend
+        source = "r" if (backend or get_backend()) == "r" else "native"
+        return(dict(self._get(("db_info", source), lambda: _fetch_db_info(source))))
+
+    def table(self, name, db_version="current", db_args=None, backend=None, load=None):
+        '''
+        The cached result of a get_collections or get_corpora call, run with `load()` when missing or stale
+        '''
+        return(self._get(_key(db_version, db_args, backend) + (name,), load).copy())
+
+    def metadata(self, db_version="current", db_args=None, backend=None):
+        '''
+        The cached Metadata of a database
+
+        Args:
+            db_version: String of the name of the database version to use (default "current")
+            db_args: Dict with host, user, and password defined (default None)
+            backend: String naming the query backend, "r", "native" or "local" (default None, see `set_backend`)
+        '''
+        from .childespy import get_backend, get_collections, get_corpora
+        backend = backend or get_backend()
+
+        def load():
+            return(Metadata(get_collections(db_version=db_version, db_args=db_args, backend=backend),
+                            get_corpora(db_version=db_version, db_args=db_args, backend=backend)))
+        return(self._get(_key(db_version, db_args, backend), load))
+
+    def refresh(self, db_version=None):
+        '''
+        Drop the entries of a db version, or every entry (including db info) when db_version is None
+        '''
+        with self._lock:
+            if db_version is None:
+                self._entries.clear()
+            else:
+                for key in [key for key in self._entries if key[0] == db_version]:
+                    del self._entries[key]
+
+    def stats(self):
+        '''
+        Returns a dictionary of hits, misses and the number of cached entries
+        '''
+        with self._lock:
+            return({"hits": self.hits, "misses": self.misses, "entries": len(self._entries)})
+
+#the cache used by the module level functions and by db version resolution
+default_cache = MetadataCache()
+
+#whether query functions check their collection and corpus names against the cache first
+_validation = {"enabled": False}
+
+def set_name_validation(enabled=True):
+    '''
+    Check the `collection` and `corpus` arguments of every query function
+    against the cached metadata before querying, raising ValueError with
+    close matches for unknown names instead of returning an empty result
+    '''
+    _validation["enabled"] = enabled
+
+def validate_arguments(arguments, backend):
+    '''
+    Validate the collection and corpus names of a query function call when
+    set_name_validation() is on
+    '''
+    names = {kind: arguments.get(kind) for kind in ("collection", "corpus")}
+    if not _validation["enabled"] or all(value is None for value in names.values()):
+        return
+    default_cache.metadata(arguments.get("db_version", "current"), arguments.get("db_args"),
+                           backend).validate(**names)
+
+def get_metadata(db_version="current", db_args=None, backend=None):
+    '''
+    The cached collections, corpora and lookup maps of a database, see Metadata
+
+        childespy.get_metadata().validate(corpus=["Brown", "Providence"])
+        corpora = childespy.get_metadata().expand("Eng-NA")
+    '''
+    return(default_cache.metadata(db_version, db_args, backend))
+
+def set_metadata_ttl(ttl):
+    '''
+    Set the seconds metadata stays cached, None to keep it until refresh_metadata()
+    '''
+    default_cache.ttl = ttl
+
+def refresh_metadata(db_version=None):
+    '''
+    Forget cached metadata of a db version, or all of it when db_version is None
+    '''
+    default_cache.refresh(db_version)
@@ -0,0 +1,502 @@
+# a native python backend for childes-db
+# runs the same queries as childesr directly over a DB-API connection
+# (pymysql for the public MySQL server, sqlite3 for local stand-ins) and
+# builds pandas dataframes straight from the cursor, so no R interpreter
+# or R data.frame copy is involved
+
+import json
+import numbers
+import sys
+import urllib.request
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from .instrument import stage
+
+#connections opened by this module, closed by clear_connections()
+_open_connections = weakref.WeakSet()
+
+#the gloss shown to users when `replace` is True
+REPLACED_GLOSS = "CASE WHEN replacement IS NULL OR replacement = '' THEN gloss ELSE replacement END"
+
+### helper functions ###
+def as_list(python_input):
+    '''
+    Normalize a filter argument (None, a scalar or an iterable) to a list or None
+    '''
+    if python_input is None:
+        return(None)
+    if isinstance(python_input, (str, bytes, bool, int, float)):
+        return([python_input])
+    if isinstance(python_input, np.generic):
+        return([python_input.item()])
+    if isinstance(python_input, (np.ndarray, pd.Series, pd.Index)):
+        #python scalars, DB-API drivers do not take numpy ones
+        return(np.asarray(python_input).ravel().tolist())
+    return([x.item() if isinstance(x, np.generic) else x for x in python_input])
+
+def raw_connection(connection):
+    '''
+    Return the DB-API connection behind `connection`, unwrapping SQLAlchemy engines
+    '''
+    if hasattr(connection, "raw_connection"):
+        return(connection.raw_connection())
+    return(connection)
+
+def paramstyle(connection):
+    '''
+    Look up the DB-API paramstyle of the driver module a connection belongs to
+    '''
+    module = sys.modules.get(type(connection).__module__.split(".")[0])
+    return(getattr(module, "paramstyle", "qmark"))
+
+def format_query(sql, connection):
+    '''
+    Convert a query written with `?` placeholders to the paramstyle of `connection`
+    '''
+    style = paramstyle(connection)
+    if style in ("format", "pyformat"):
+        return(sql.replace("%", "%%").replace("?", "%s"))
+    return(sql)
+
+class Query:
+    '''
+    A small SQL builder for the single-table filters childesr applies
+    '''
+    def __init__(self, table, columns="*"):
+        self.table = table
+        self.columns = columns
+        self.clauses = []
+        self.params = []
+
+    def where(self, clause, *params):
+        self.clauses.append(clause)
+        self.params.extend(params)
+        return(self)
+
+    def isin(self, column, values, negate=False):
+        values = as_list(values)
+        if values is None:
+            return(self)
+        placeholders = ", ".join("?" * len(values))
+        operator = "NOT IN" if negate else "IN"
+        return(self.where(f"{column} {operator} ({placeholders})", *values))
+
+    def like_any(self, column, patterns):
+        patterns = as_list(patterns)
+        if patterns is None:
+            return(self)
+        clause = " OR ".join(f"{column} LIKE ?" for _ in patterns)
+        return(self.where(f"({clause})", *patterns))
+
+    def age_point(self, column, age):
+        #a single age selects the month starting at that age, two ages select [min, max)
+        age = as_list(age)
+        if age is None:
+            return(self)
+        if len(age) not in (1, 2):
+            raise ValueError("`age` argument must be of length 1 or 2")
+        low, high = (age[0], age[0] + 1) if len(age) == 1 else age
+        return(self.where(f"{column} >= ? AND {column} < ?", low, high))
+
+    def age_range(self, min_column, max_column, age):
+        #participants whose age range contains the age, or overlaps [min, max)
+        age = as_list(age)
+        if age is None:
+            return(self)
+        if len(age) not in (1, 2):
+            raise ValueError("`age` argument must be of length 1 or 2")
+        if len(age) == 1:
+            return(self.where(f"{min_column} <= ? AND {max_column} >= ?", age[0], age[0]))
+        return(self.where(f"{max_column} >= ? AND {min_column} < ?", age[0], age[1]))
+
+    def copy(self):
+        query = Query(self.table, self.columns)
+        query.clauses = list(self.clauses)
+        query.params = list(self.params)
+        return(query)
+
+    def sql(self):
+        sql = f"SELECT {self.columns} FROM {self.table}"
+        if self.clauses:
+            sql += " WHERE " + " AND ".join(self.clauses)
+        return(sql)
+
+def sql_literal(value):
+    '''
+    Quote a query parameter as a MySQL literal, for backends that only take query strings
+    '''
+    if value is None:
+        return("NULL")
+    if isinstance(value, bool):
+        return("1" if value else "0")
+    if isinstance(value, numbers.Number):
+        return(str(value))
+    value = str(value).replace("\\", "\\\\").replace("'", "''")
+    return(f"'{value}'")
+
+def render_query(sql, params):
+    '''
+    Inline `?` placeholders as quoted literals
+    '''
+    parts = sql.split("?")
+    if len(parts) != len(params) + 1:
+        raise ValueError(f"Query has {len(parts) - 1} placeholders but {len(params)} parameters")
+    rendered = [parts[0]]
+    for value, part in zip(params, parts[1:]):
+        rendered.append(sql_literal(value))
+        rendered.append(part)
+    return("".join(rendered))
+
+def speaker_filters(query, collection=None, language=None, corpus=None,
+                    target_child=None, role=None, role_exclude=None,
+                    age=None, sex=None):
+    '''
+    Apply the collection/corpus/child/speaker filters shared by the utterance-level tables
+    '''
+    query.isin("collection_name", collection)
+    query.isin("language", language)
+    query.isin("corpus_name", corpus)
+    query.isin("target_child_name", target_child)
+    query.isin("speaker_role", role)
+    query.isin("speaker_role", role_exclude, negate=True)
+    query.age_point("target_child_age", age)
+    query.isin("target_child_sex", sex)
+    return(query)
+
+def read_query(sql, params=(), connection=None, db_version="current", db_args=None):
+    '''
+    Run a query and build a pandas dataframe directly from the cursor
+
+    Args:
+        sql: A query string using `?` placeholders
+        params: A sequence of query parameters (default ())
+        connection: A DB-API connection or SQLAlchemy engine (default None, opens and closes a connection)
+        db_version: String of the name of the database version to use (default "current")
+        db_args: Dict with host, user, and password defined (default None)
+
+    Returns:
+        A pandas dataframe of the query result
+    '''
+    own_connection = connection is None
+    if own_connection:
+        with stage("connect"):
+            connection = connect_to_childes(db_version, db_args)
+    connection = raw_connection(connection)
+    try:
+        cursor = connection.cursor()
+        try:
+            with stage("query"):
+                if params:
+                    cursor.execute(format_query(sql, connection), tuple(params))
+                else:
+                    cursor.execute(sql)
+            with stage("fetch"):
+                columns = [description[0] for description in cursor.description]
+                df = pd.DataFrame.from_records(cursor.fetchall(), columns=columns)
+        finally:
+            cursor.close()
+    finally:
+        if own_connection:
+            connection.close()
+    return(df)
+
+def run(query, connection, db_version, db_args):
+    return(read_query(query.sql(), query.params, connection, db_version, db_args))
+
+### connections ###
+#the public server settings and db versions childesr's get_db_info() reads
+DB_INFO_URL = "https://langcog.github.io/childes-db-website/childes-db.json"
+
+def get_db_info():
+    '''
+    Returns a dictionary with the most recent database info from childes, read
+    from DB_INFO_URL without R, with every value a list like childesr's
+    '''
+    try:
+        with urllib.request.urlopen(DB_INFO_URL, timeout=30) as response:
+            db_info = json.load(response)
+    except (OSError, ValueError) as error:
+        raise ConnectionError(f"Could not read the childes-db settings from {DB_INFO_URL} ({error}), "
+                              "pass db_args with host, user, password and db_name instead") from error
+    return({key: value if isinstance(value, list) else [value] for key, value in db_info.items()})
+
+def resolve_db_args(db_version="current", db_args=None):
+    '''
+    Fill in the server credentials and database name for a db version
+
+    Settings missing from `db_args` (and the name of the "current" version)
+    are looked up with `get_db_info()`, cached by the metadata layer.
+    '''
+    args = {} if db_args is None else dict(db_args)
+    if db_args is None or (db_version == "current" and "db_name" not in args):
+        from .childespy import resolve_db_version
+        from .metadata import default_cache
+        db_info = default_cache.db_info(backend="native")
+        for key in ("host", "user", "password"):
+            args.setdefault(key, db_info[key][0])
+        db_version = resolve_db_version(db_version, backend="native")
+    args.setdefault("db_name", db_version)
+    return(args)
+
+def connect_to_childes(db_version="current", db_args=None):
+    """Connects to childes-db with pymysql
+
+    Args:
+        db_version: String of the name of the database version to use (default "current")
+        db_args: Dict with host, user, and password defined (default None)
+
+    Returns:
+        A DB-API connection
+    """
+    try:
+        import pymysql
+    except ImportError:
+        raise ImportError("The native backend needs pymysql to connect to childes-db: pip install pymysql")
+    args = resolve_db_args(db_version, db_args)
+    connection = pymysql.connect(host=args["host"], user=args["user"],
+                                 password=args["password"], database=args["db_name"],
+                                 port=int(args.get("port", 3306)), charset="utf8mb4")
+    _open_connections.add(connection)
+    return(connection)
+
+def check_connection(db_version="current", db_args=None):
+    '''
+    Check if connecting to childes db is possible
+    '''
+    try:
+        connect_to_childes(db_version, db_args).close()
+    except Exception:
+        return(False)
+    return(True)
+
+def clear_connections():
+    '''
+    Close all connections opened by the native backend
+    '''
+    for connection in list(_open_connections):
+        try:
+            connection.close()
+        except Exception:
+            pass
+    _open_connections.clear()
+
+### query functions ###
+def get_collections(connection=None, db_version="current", db_args=None):
+    return(run(Query("collection"), connection, db_version, db_args))
+
+def get_corpora(connection=None, db_version="current", db_args=None):
+    return(run(Query("corpus"), connection, db_version, db_args))
+
+def get_transcripts(collection=None, corpus=None, target_child=None,
+                    connection=None, db_version="current", db_args=None):
+    query = Query("transcript")
+    query.isin("collection_name", collection)
+    query.isin("corpus_name", corpus)
+    query.isin("target_child_name", target_child)
+    return(run(query, connection, db_version, db_args))
+
+def get_participants(collection=None, corpus=None, target_child=None,
+                     role=None, role_exclude=None, age=None, sex=None,
+                     connection=None, db_version="current", db_args=None):
+    query = Query("participant")
+    query.isin("collection_name", collection)
+    query.isin("corpus_name", corpus)
+    query.isin("target_child_name", target_child)
+    query.isin("role", role)
+    query.isin("role", role_exclude, negate=True)
+    query.age_range("min_age", "max_age", age)
+    query.isin("sex", sex)
+    return(run(query, connection, db_version, db_args))
+
+def get_speaker_statistics(collection=None, corpus=None, target_child=None,
+                           role=None, role_exclude=None, age=None, sex=None,
+                           connection=None, db_version="current", db_args=None):
+    query = speaker_filters(Query("transcript_by_speaker"), collection=collection,
+                            corpus=corpus, target_child=target_child, role=role,
+                            role_exclude=role_exclude, age=age, sex=sex)
+    return(run(query, connection, db_version, db_args))
+
+def token_query(token, collection=None, language=None, corpus=None,
+                target_child=None, role=None, role_exclude=None,
+                age=None, sex=None, stem=None, part_of_speech=None,
+                replace=True, columns="*"):
+    '''
+    Build the filtered token query shared by get_tokens and get_contexts
+    '''
+    query = speaker_filters(Query("token", columns), collection=collection,
+                            language=language, corpus=corpus,
+                            target_child=target_child, role=role,
+                            role_exclude=role_exclude, age=age, sex=sex)
+    query.like_any(REPLACED_GLOSS if replace else "gloss", token)
+    query.like_any("stem", stem)
+    query.isin("part_of_speech", part_of_speech)
+    return(query)
+
+def replace_gloss(tokens):
+    '''
+    Replace "gloss" with "replacement" where a replacement is available
+    '''
+    if "replacement" in tokens.columns and len(tokens):
+        replacement = tokens["replacement"]
+        has_replacement = replacement.notna() & (replacement != "")
+        tokens.loc[has_replacement, "gloss"] = replacement[has_replacement]
+    return(tokens)
+
+def get_tokens(token, collection=None, language=None, corpus=None,
+               target_child=None, role=None, role_exclude=None,
+               age=None, sex=None, stem=None,
+               part_of_speech=None, replace=True, connection=None,
+               db_version="current", db_args=None):
+    query = token_query(token, collection=collection, language=language,
+                        corpus=corpus, target_child=target_child, role=role,
+                        role_exclude=role_exclude, age=age, sex=sex, stem=stem,
+                        part_of_speech=part_of_speech, replace=replace)
+    tokens = run(query, connection, db_version, db_args)
+    if replace:
+        tokens = replace_gloss(tokens)
+    return(tokens)
+
+def get_types(token_type=None, collection=None, language=None, corpus=None,
+              role=None, role_exclude=None, age=None,
+              sex=None, target_child=None, connection=None,
+              db_version="current", db_args=None):
+    query = speaker_filters(Query("token_frequency"), collection=collection,
+                            language=language, corpus=corpus,
+                            target_child=target_child, role=role,
+                            role_exclude=role_exclude, age=age, sex=sex)
+    query.like_any("gloss", token_type)
+    return(run(query, connection, db_version, db_args))
+
+def utterance_query(collection=None, language=None, corpus=None,
+                    role=None, role_exclude=None, age=None,
+                    sex=None, target_child=None):
+    return(speaker_filters(Query("utterance"), collection=collection,
+                           language=language, corpus=corpus,
+                           target_child=target_child, role=role,
+                           role_exclude=role_exclude, age=age, sex=sex))
+
+def get_utterances(collection=None, language=None, corpus=None,
+                   role=None, role_exclude=None, age=None,
+                   sex=None, target_child=None, connection=None,
+                   db_version="current", db_args=None):
+    query = utterance_query(collection=collection, language=language,
+                            corpus=corpus, role=role, role_exclude=role_exclude,
+                            age=age, sex=sex, target_child=target_child)
+    return(run(query, connection, db_version, db_args))
+
+def context_windows(utterances, target_ids, window=[0, 0], remove_duplicates=True):
+    '''
+    The utterances within `window` of each target utterance, with the target id as `context_id`
+
+    `utterances` must hold every utterance of the targets' transcripts. They
+    are sorted into a (transcript_id, utterance_order) index once, each
+    window becomes a range of that index found by binary search, and the
+    ranges are expanded with numpy, so the cost grows with the size of the
+    result rather than with targets times transcript length.
+
+    Args:
+        utterances: A dataframe of utterances with id, transcript_id and utterance_order columns
+        target_ids: The ids of the target utterances
+        window: A length 2 list of how many utterances before and after each target to include (default [0, 0])
+        remove_duplicates: A boolean indicating whether to keep each utterance only in its first context (default True)
+
+    Returns:
+    A pandas dataframe of the utterances ordered by context_id and utterance_order
+    '''
+    before, after = (int(n) for n in as_list(window))
+    utterances = utterances.sort_values(["transcript_id", "utterance_order"], kind="stable",
+                                        ignore_index=True)
+    transcripts = utterances["transcript_id"].to_numpy()
+    orders = utterances["utterance_order"].to_numpy(dtype=np.int64)
+
+    #targets in context_id order, located in the index
+    positions = pd.Index(utterances["id"]).get_indexer(np.unique(np.asarray(target_ids)))
+    positions = positions[positions >= 0]
+    if len(positions) == 0:
+        return(utterances.iloc[:0].assign(context_id=pd.Series(dtype="int64")).reset_index(drop=True))
+
+    #one int64 key per row: the transcript's rank, then the order within it
+    transcript_codes = np.concatenate([[0], np.cumsum(transcripts[1:] != transcripts[:-1])])
+    low_order = orders.min()
+    stride = int(orders.max() - low_order) + 1
+    keys = transcript_codes * stride + (orders - low_order)
+    target_codes = transcript_codes[positions] * stride
+    target_orders = orders[positions] - low_order
+    starts = np.searchsorted(keys, target_codes + np.clip(target_orders - before, 0, stride - 1), "left")
+    ends = np.searchsorted(keys, target_codes + np.clip(target_orders + after, 0, stride - 1), "right")
+
+    #expand the [start, end) ranges into row positions
+    counts = ends - starts
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    rows = np.repeat(starts, counts) + offsets
+    contexts = utterances.iloc[rows].reset_index(drop=True)
+    contexts["context_id"] = np.repeat(utterances["id"].to_numpy()[positions], counts).astype("int64")
+    if remove_duplicates:
+        contexts = contexts.drop_duplicates(subset="id")
+    return(contexts.reset_index(drop=True))
+
+def get_contexts(token=None, collection=None, language=None, corpus=None,
+                 role=None, role_exclude=None, age=None,
+                 sex=None, target_child=None,
+                 window=[0, 0], remove_duplicates=True,
+                 connection=None, db_version="current",
+                 db_args=None):
+    before, after = as_list(window)
+    #utterances containing a matching token, as a subquery so the ids never
+    #travel as a parameter list
+    hits = token_query(token, collection=collection, language=language,
+                       corpus=corpus, target_child=target_child, role=role,
+                       role_exclude=role_exclude, age=age, sex=sex,
+                       columns="DISTINCT utterance_id")
+    own_connection = connection is None
+    if own_connection:
+        connection = connect_to_childes(db_version, db_args)
+    try:
+        target_ids = run(hits, connection, db_version, db_args)["utterance_id"]
+        if before == 0 and after == 0:
+            context = Query("utterance").where(f"id IN ({hits.sql()})", *hits.params)
+        else:
+            #every utterance of the transcripts with a hit, fetched once
+            transcript_hits = hits.copy()
+            transcript_hits.columns = "DISTINCT transcript_id"
+            context = Query("utterance").where(f"transcript_id IN ({transcript_hits.sql()})",
+                                               *transcript_hits.params)
+        utterances = run(context, connection, db_version, db_args)
+    finally:
+        if own_connection:
+            connection.close()
+    return(context_windows(utterances, target_ids, window, remove_duplicates))
+
+### chunked queries ###
+def keyset_pages(query, fetch, chunk_size=100000):
+    '''
+    Yield the rows of `query` as dataframes of at most `chunk_size` rows in `id` order
+
+    Each page asks for the next `chunk_size` rows with an id above the last
+    one seen, so only one chunk is held in memory at a time.
+
+    Args:
+        query: A Query over a table with an `id` column
+        fetch: A function running a (sql, params) pair and returning a dataframe
+        chunk_size: The maximum number of rows per chunk (default 100000)
+    '''
+    if chunk_size < 1:
+        raise ValueError("`chunk_size` must be at least 1")
+    last_id = None
+    while True:
+        page = query.copy()
+        if last_id is not None:
+            page.where("id > ?", last_id)
+        chunk = fetch(f"{page.sql()} ORDER BY id LIMIT {int(chunk_size)}", page.params)
+        if len(chunk) == 0:
+            return
+        yield(chunk.reset_index(drop=True))
+        if len(chunk) < chunk_size:
+            return
+        last_id = int(chunk["id"].iloc[-1])
+
+def get_sql_query(sql_query_string, connection=None, db_version="current", db_args=None):
+    return(read_query(sql_query_string, (), connection, db_version, db_args))
@@ -0,0 +1,84 @@
+# parallel fan-out for queries over many corpora, children or collections
+# a request is split on one list-valued filter, the parts run in a pool of
+# worker processes (each with its own R or native backend and connection) and
+# the partial results are concatenated in the order of the split values
+
+import concurrent.futures
+import inspect
+import multiprocessing
+import multiprocessing.util
+
+import pandas as pd
+
+from . import childespy
+from .session import ChildesSession
+
+#the session of a worker process, set up by _init_worker
+_worker_session = None
+
+def _init_worker(db_version, db_args, backend):
+    global _worker_session
+    _worker_session = ChildesSession(db_version, db_args, backend, pool_size=1)
+    multiprocessing.util.Finalize(None, _worker_session.close, exitpriority=10)
+
+def _run_part(function_name, kwargs):
+    return(getattr(_worker_session, function_name)(**kwargs))
+
+def split_values(values, batch_size=1):
+    '''
+    Split filter values into consecutive batches of `batch_size`
+    '''
+    if isinstance(values, (str, int, float)):
+        values = [values]
+    values = list(values)
+    return([values[i:i + batch_size] for i in range(0, len(values), batch_size)])
+
+def parallel_query(function, split_by, values=None, processes=None, batch_size=1,
+                   db_version="current", db_args=None, backend=None, **kwargs):
+    '''
+    Run a query function in parallel, split on one of its list-valued filters
+
+    Each batch of values of `split_by` becomes one query in a pool of worker
+    processes. Workers are spawned rather than forked so that none of them
+    inherits an embedded R, and each keeps one connection for all its queries.
+
+    Args:
+        function: A query function such as childespy.get_tokens, or its name
+        split_by: The name of the filter to split on, e.g. "corpus", "target_child" or "collection"
+        values: The values of `split_by` to query (default None, taken from kwargs[split_by])
+        processes: The number of worker processes (default None, one per CPU)
+        batch_size: The number of values sent to a worker per query (default 1)
+        db_version: String of the name of the database version to use (default "current")
+        db_args: Dict with host, user, and password defined (default None)
+        backend: String naming the query backend, "r" or "native" (default None, see `set_backend`)
+        kwargs: The other arguments of `function`
+
+    Returns:
+    A pandas dataframe of the partial results concatenated in the order of `values`
+    '''
+    function_name = function if isinstance(function, str) else function.__name__
+    if function_name not in ("get_transcripts", "get_participants", "get_speaker_statistics",
+                             "get_tokens", "get_types", "get_utterances", "get_contexts"):
+        raise ValueError(f"{function_name} cannot be run in parallel")
+    parameters = inspect.signature(getattr(childespy, function_name)).parameters
+    if split_by not in parameters or split_by in ("connection", "db_version", "db_args", "backend"):
+        raise ValueError(f"{function_name} has no filter {split_by!r} to split on")
+    if values is None:
+        values = kwargs.pop(split_by, None)
+    elif split_by in kwargs:
+        raise TypeError(f"Pass the values of {split_by!r} either as `values` or as a keyword, not both")
+    if values is None:
+        raise ValueError(f"No values of {split_by!r} to split on")
+    if batch_size < 1:
+        raise ValueError("`batch_size` must be at least 1")
+    backend = backend or childespy.get_backend()
+
+    parts = [dict(kwargs, **{split_by: batch}) for batch in split_values(values, batch_size)]
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=processes, mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker, initargs=(db_version, db_args, backend)) as executor:
+        results = list(executor.map(_run_part, [function_name] * len(parts), parts))
+    results = [result for result in results if len(result.columns)]
+    if not results:
+        return(pd.DataFrame())
+    return(pd.concat(results, ignore_index=True))
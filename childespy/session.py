@@ -0,0 +1,268 @@
+# reusable connections for many queries
+# a ChildesSession keeps a bounded pool of connections per db_version/db_args
+# and runs the query functions over them, instead of connecting on every call
+
+import functools
+import threading
+import time
+
+from . import childespy
+
+#query functions exposed as session methods
+QUERY_FUNCTIONS = ["get_collections", "get_corpora", "get_transcripts",
+                   "get_participants", "get_speaker_statistics", "get_tokens",
+                   "get_types", "get_utterances", "get_contexts", "get_sql_query",
+                   "get_tokens_batch"]
+ITER_FUNCTIONS = ["iter_tokens", "iter_utterances"]
+
+class ConnectionPool:
+    '''
+    A bounded, thread-safe pool of connections to one database
+
+    Connections are health-checked when checked out and replaced when they
+    fail the check or are older than `recycle` seconds.
+
+    Args:
+        connect: A function opening a new connection
+        close: A function closing a connection
+        is_valid: A function returning whether a connection still works
+        size: The maximum number of open connections (default 4)
+        recycle: Seconds after which a connection is replaced, None to keep connections forever (default 3600)
+        timeout: Seconds to wait for a free connection before raising TimeoutError, None to wait forever (default None)
+    '''
+    def __init__(self, connect, close, is_valid, size=4, recycle=3600, timeout=None):
+        if size < 1:
+            raise ValueError("`size` must be at least 1")
+        self._connect = connect
+        self._close = close
+        self._is_valid = is_valid
+        self.size = size
+        self.recycle = recycle
+        self.timeout = timeout
+        #idle connections as (connection, time opened), most recently returned last
+        self._idle = []
+        self._open = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self.checkouts = 0
+        self.waits = 0
+        self.connects = 0
+        self.reconnects = 0
+
+    def acquire(self):
+        '''
+        Check out a healthy connection, opening one or waiting for one if needed
+        '''
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Connection pool is closed")
+            if not self._idle and self._open >= self.size:
+                self.waits += 1
+                if not self._condition.wait_for(lambda: self._idle or self._open < self.size or self._closed,
+                                                self.timeout):
+                    raise TimeoutError(f"No connection free after {self.timeout} seconds")
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+            self.checkouts += 1
+            if self._idle:
+                connection, opened = self._idle.pop()
+            else:
+                connection, opened = None, None
+                self._open += 1
+        #connect and health-check outside the lock
+        try:
+            if connection is not None:
+                expired = self.recycle is not None and time.monotonic() - opened > self.recycle
+                if expired or not self._is_valid(connection):
+                    self._discard(connection)
+                    connection = None
+                    with self._condition:
+                        self.reconnects += 1
+            if connection is None:
+                connection, opened = self._connect(), time.monotonic()
+                with self._condition:
+                    self.connects += 1
+        except BaseException:
+            with self._condition:
+                self._open -= 1
+                self._condition.notify()
+            raise
+        return(connection, opened)
+
+    def release(self, connection, opened):
+        '''
+        Return a checked out connection to the pool
+        '''
+        with self._condition:
+            if not self._closed:
+                self._idle.append((connection, opened))
+                self._condition.notify()
+                return
+            self._open -= 1
+        self._discard(connection)
+
+    def connection(self):
+        '''
+        A context manager checking a connection out for the duration of a `with` block
+        '''
+        pool = self
+
+        class _Checkout:
+            def __enter__(self):
+                self.connection, self.opened = pool.acquire()
+                return(self.connection)
+
+            def __exit__(self, *exc_info):
+                pool.release(self.connection, self.opened)
+        return(_Checkout())
+
+    def _discard(self, connection):
+        try:
+            self._close(connection)
+        except Exception:
+            pass
+
+    def close(self):
+        '''
+        Close idle connections now and checked out connections when they are returned
+        '''
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._condition.notify_all()
+        for connection, _ in idle:
+            self._discard(connection)
+
+    def metrics(self):
+        '''
+        Returns a dictionary of checkout, wait, connect and reconnect counts and current pool usage
+        '''
+        with self._condition:
+            return({"checkouts": self.checkouts, "waits": self.waits,
+                    "connects": self.connects, "reconnects": self.reconnects,
+                    "open": self._open, "idle": len(self._idle),
+                    "in_use": self._open - len(self._idle), "size": self.size})
+
+def _pool_key(db_version, db_args):
+    return((db_version, None if db_args is None else tuple(sorted(db_args.items()))))
+
+class ChildesSession:
+    '''
+    A set of connection pools, one per db_version/db_args, with the query functions as methods
+
+    Methods take the same arguments as the module level functions, except that
+    `connection` comes from the pool and `db_version`, `db_args` and `backend`
+    default to the session's. Use it as a context manager to close every
+    connection at the end:
+
+        with childespy.ChildesSession(backend="native") as session:
+            for corpus in corpora:
+                session.get_transcripts(corpus=corpus)
+
+    Args:
+        db_version: String of the name of the database version to use (default "current")
+        db_args: Dict with host, user, and password defined (default None)
+        backend: String naming the query backend, "r" or "native" (default None, see `set_backend`)
+        pool_size: The maximum number of open connections per pool (default 4)
+        recycle: Seconds after which a connection is replaced (default 3600)
+        timeout: Seconds to wait for a free connection before raising TimeoutError (default None)
+    '''
+    def __init__(self, db_version="current", db_args=None, backend=None,
+                 pool_size=4, recycle=3600, timeout=None):
+        self.db_version = db_version
+        self.db_args = db_args
+        self.backend = backend or childespy.get_backend()
+        self.pool_size = pool_size
+        self.recycle = recycle
+        self.timeout = timeout
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def pool(self, db_version=None, db_args=None):
+        '''
+        Returns the connection pool for a db_version/db_args, creating it on first use
+        '''
+        db_version = self.db_version if db_version is None else db_version
+        db_args = self.db_args if db_args is None else db_args
+        key = _pool_key(db_version, db_args)
+        with self._lock:
+            if key not in self._pools:
+                backend = self.backend
+                self._pools[key] = ConnectionPool(
+                    connect=lambda: childespy.connect_to_childes(db_version, db_args, backend=backend),
+                    close=lambda connection: childespy._disconnect(connection, backend),
+                    is_valid=lambda connection: childespy._is_valid(connection, backend),
+                    size=self.pool_size, recycle=self.recycle, timeout=self.timeout)
+            return(self._pools[key])
+
+    def metrics(self):
+        '''
+        Returns pool metrics summed over all pools, with per-pool metrics under "pools"
+        '''
+        with self._lock:
+            pools = {key: pool.metrics() for key, pool in self._pools.items()}
+        totals = {}
+        for metrics in pools.values():
+            for name, value in metrics.items():
+                totals[name] = totals.get(name, 0) + value
+        totals["pools"] = {self._pool_label(*key): metrics for key, metrics in pools.items()}
+        return(totals)
+
+    def _pool_label(self, db_version, db_args):
+        # "<database>@<backend>", with the host when one is given, e.g. "2020.1@native"
+        db_args = None if db_args is None else dict(db_args)
+        try:
+            db_version = childespy.resolve_db_version(db_version, db_args, self.backend)
+        except Exception:
+            #an unreachable settings file leaves the name as given
+            pass
+        host = (db_args or {}).get("host")
+        return(f"{db_version}@{self.backend}" + (f":{host}" if host else ""))
+
+    def close(self):
+        '''
+        Close every connection of the session
+        '''
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            pool.close()
+
+    def __enter__(self):
+        return(self)
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def _session_arguments(session, kwargs):
+    if "connection" in kwargs:
+        raise TypeError("Session methods take their connection from the session pool")
+    kwargs.setdefault("backend", session.backend)
+    pool = session.pool(kwargs.setdefault("db_version", session.db_version),
+                        kwargs.setdefault("db_args", session.db_args))
+    return(pool)
+
+def _query_method(name):
+    function = getattr(childespy, name)
+
+    @functools.wraps(function)
+    def method(self, *args, **kwargs):
+        with _session_arguments(self, kwargs).connection() as connection:
+            return(function(*args, connection=connection, **kwargs))
+    return(method)
+
+def _iter_method(name):
+    function = getattr(childespy, name)
+
+    @functools.wraps(function)
+    def method(self, *args, **kwargs):
+        #the connection stays checked out until the iteration ends
+        with _session_arguments(self, kwargs).connection() as connection:
+            yield from function(*args, connection=connection, **kwargs)
+    return(method)
+
+for _name in QUERY_FUNCTIONS:
+    setattr(ChildesSession, _name, _query_method(_name))
+for _name in ITER_FUNCTIONS:
+    setattr(ChildesSession, _name, _iter_method(_name))
@@ -0,0 +1,250 @@
+# query results written to memory-mappable Arrow IPC files
+# a getter called with `output=path` streams its result into an Arrow file
+# chunk by chunk and returns a SharedResult, a small picklable handle that any
+# process can open without copying the data. A sidecar index of row ranges
+# per corpus and transcript lets workers read only their part:
+#
+#   handle = childespy.get_tokens(token="%", collection="Eng-NA", output="tokens.arrow")
+#   pool.map(analyze, [(handle, corpus) for corpus in handle.values("corpus_name")])
+#   # in a worker: handle.to_pandas(corpus_name=corpus)
+
+import json
+import os
+
+import numpy as np
+
+#columns whose row ranges are indexed when a result has them: results come
+#in id order, which keeps these in long runs, while a column like
+#speaker_role changes every few rows and would get a range per row
+INDEX_COLUMNS = ["collection_name", "corpus_name", "target_child_id", "transcript_id"]
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+    except ImportError:
+        raise ImportError("Writing results to Arrow files needs pyarrow: pip install pyarrow")
+    return(pyarrow)
+
+def _key(value):
+    #index keys are strings, with integral floats (R integers) written as ints
+    if isinstance(value, float) and value.is_integer():
+        return(str(int(value)))
+    return(str(value))
+
+def _unify(pa, tables):
+    #one schema for all tables, widening types (int64 and double to double) where they differ
+    schemas = [table.schema for table in tables]
+    try:
+        return(pa.unify_schemas(schemas, promote_options="permissive"))
+    except TypeError:
+        #pyarrow before 14 only merges null fields
+        return(pa.unify_schemas(schemas))
+
+def index_path(path):
+    return(f"{path}.index.json")
+
+class _RangeIndex:
+    # row ranges of each value of some columns, extended chunk by chunk;
+    # consecutive rows with the same value become one [start, stop) range
+    def __init__(self, columns):
+        self.columns = columns
+        self.ranges = {column: {} for column in columns}
+        self.rows = 0
+
+    def add(self, chunk):
+        for column in self.columns:
+            values = chunk[column].to_numpy()
+            if len(values) == 0:
+                continue
+            #starts of runs of equal values
+            changes = [0] + (np.flatnonzero(values[1:] != values[:-1]) + 1).tolist()
+            for start, stop in zip(changes, changes[1:] + [len(values)]):
+                runs = self.ranges[column].setdefault(_key(values[start]), [])
+                if runs and runs[-1][1] == self.rows + start:
+                    runs[-1][1] = self.rows + stop
+                else:
+                    runs.append([self.rows + start, self.rows + stop])
+        self.rows += len(chunk)
+
+def write_result(chunks, path, index_columns=None):
+    '''
+    Stream dataframes into one Arrow IPC file with an index of row ranges
+
+    The schema comes from the first chunk with a type for every column
+    (earlier chunks are held until then) and later chunks are cast to it.
+    The file is written next to `path` and moved into place when complete.
+
+    Args:
+        chunks: An iterable of pandas dataframes with the same columns
+        path: Path of the Arrow file
+        index_columns: Columns to index (default None, those of INDEX_COLUMNS in the result)
+
+    Returns:
+    A SharedResult for the file
+    '''
+    pa = _pyarrow()
+    path = os.path.abspath(os.path.expanduser(path))
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    writer, held, index = None, [], None
+    try:
+        with open(tmp_path, "wb") as sink:
+            for chunk in chunks:
+                if index is None:
+                    index = _RangeIndex([column for column in (index_columns or INDEX_COLUMNS)
+                                         if column in chunk.columns])
+                if writer is None:
+                    held.append(pa.Table.from_pandas(chunk, preserve_index=False))
+                    schema = _unify(pa, held)
+                    if any(pa.types.is_null(field.type) for field in schema) and len(held) < 16:
+                        index.add(chunk)
+                        continue
+                    writer = pa.ipc.new_file(sink, schema)
+                    for table in held:
+                        writer.write_table(table.cast(schema))
+                    held = []
+                else:
+                    writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+                index.add(chunk)
+            if writer is None:
+                #an empty result, or columns that never had a value
+                tables = held or [pa.table({})]
+                schema = _unify(pa, tables)
+                writer = pa.ipc.new_file(sink, schema)
+                for table in held:
+                    writer.write_table(table.cast(schema))
+            writer.close()
+        index = index or _RangeIndex([])
+        with open(index_path(tmp_path), "w") as f:
+            json.dump({"rows": index.rows, "ranges": index.ranges}, f)
+    except BaseException:
+        for leftover in (tmp_path, index_path(tmp_path)):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+        raise
+    os.replace(index_path(tmp_path), index_path(path))
+    os.replace(tmp_path, path)
+    return(SharedResult(path))
+
+def _union(ranges):
+    #sorted, merged [start, stop) ranges
+    merged = []
+    for start, stop in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], stop)
+        else:
+            merged.append([start, stop])
+    return(merged)
+
+def _intersect(a, b):
+    #the overlap of two sorted, merged range lists
+    overlap, i, j = [], 0, 0
+    while i < len(a) and j < len(b):
+        start, stop = max(a[i][0], b[j][0]), min(a[i][1], b[j][1])
+        if start < stop:
+            overlap.append([start, stop])
+        if a[i][1] < b[j][1]:
+            i += 1
+        else:
+            j += 1
+    return(overlap)
+
+class SharedResult:
+    '''
+    A handle on a query result stored in an Arrow IPC file
+
+    Only the path travels when the handle is pickled to another process,
+    which opens the file memory-mapped on first use, so every process reads
+    the same pages without a copy.
+
+    Args:
+        path: Path of a file written by `write_result` (or a getter called with `output`)
+    '''
+    def __init__(self, path):
+        self.path = os.path.abspath(os.path.expanduser(path))
+        self._table = None
+        self._index = None
+
+    def __getstate__(self):
+        return({"path": self.path})
+
+    def __setstate__(self, state):
+        self.__init__(state["path"])
+
+    def __repr__(self):
+        return(f"<SharedResult {self.path}: {len(self)} rows>")
+
+    def __len__(self):
+        return(self.index["rows"])
+
+    @property
+    def index(self):
+        '''
+        The index: the number of rows and, per indexed column and value, a list of [start, stop) row ranges
+        '''
+        if self._index is None:
+            with open(index_path(self.path)) as f:
+                self._index = json.load(f)
+        return(self._index)
+
+    def table(self):
+        '''
+        The whole result as a memory-mapped pyarrow Table
+        '''
+        if self._table is None:
+            pa = _pyarrow()
+            self._table = pa.ipc.open_file(pa.memory_map(self.path, "r")).read_all()
+        return(self._table)
+
+    def values(self, column):
+        '''
+        The distinct values of an indexed column, as strings
+        '''
+        return(list(self.index["ranges"][column]))
+
+    def select(self, **filters):
+        '''
+        The rows matching column=value filters (a list matches any of its values) as a pyarrow Table
+
+        Indexed columns narrow the result to zero-copy slices of the file, other
+        columns are then matched over those rows only.
+
+            handle.select(corpus_name="Brown", speaker_role=["Mother", "Father"])
+        '''
+        pa = _pyarrow()
+        import pyarrow.compute
+        table = self.table()
+        ranges, masks = None, {}
+        for column, values in filters.items():
+            values = list(values) if isinstance(values, (list, tuple, set)) else [values]
+            if column in self.index["ranges"]:
+                matched = _union([run for value in values
+                                  for run in self.index["ranges"][column].get(_key(value), [])])
+                ranges = matched if ranges is None else _intersect(ranges, matched)
+            elif column in table.column_names:
+                masks[column] = values
+            else:
+                raise ValueError(f"{column!r} is not a column of the result")
+        if ranges is not None:
+            #each range is a zero-copy slice
+            slices = [table.slice(start, stop - start) for start, stop in ranges]
+            table = pa.concat_tables(slices) if slices else table.slice(0, 0)
+        for column, values in masks.items():
+            value_type = table.schema.field(column).type
+            if pa.types.is_dictionary(value_type):
+                value_type = value_type.value_type
+            mask = pa.compute.is_in(table[column], value_set=pa.array(values, type=value_type))
+            table = table.filter(mask)
+        return(table)
+
+    def to_pandas(self, **filters):
+        '''
+        The rows matching `select(**filters)` as a pandas dataframe
+        '''
+        return(self.select(**filters).to_pandas())
+
+def open_result(path):
+    '''
+    Open a result written with `output=path` in this or another process
+    '''
+    return(SharedResult(path))
@@ -13,10 +13,12 @@ setuptools.setup(
     long_description_content_type="text/markdown",
     packages=setuptools.find_packages(),
     install_requires=["rpy2>=3.3.5", "numpy>=1.19.2", "pandas>=1.1.2"],
+    extras_require={"native": ["pymysql>=0.10"], "cache": ["pyarrow>=1.0"], "shared": ["pyarrow>=1.0"],
+                    "arrow": ["pyarrow>=1.0", "rpy2-arrow>=0.0.3"]},
     classifiers=[
     "Programming Language :: Python :: 3",
     "License :: OSI Approved :: GNU Affero General Public License v3",
     "Operating System :: OS Independent",
     ],
-    python_requires='>=3.6',
+    python_requires='>=3.7',
 )
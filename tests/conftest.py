@@ -0,0 +1,124 @@
+# shared fixtures: a small synthetic childes-db built by benchmarks/synthetic.py
+# stands in for the server of the native backend (through sqlite, with the
+# MySQL functions sync() uses registered) and is copied into a snapshot for
+# the local backend, so the suite needs neither R nor network
+
+import contextlib
+import os
+import sqlite3
+import sys
+import types
+
+import pandas as pd
+import pytest
+
+import childespy
+from childespy import childespy as core, local, native
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+import synthetic
+
+#db_args of the native stand-in, so no server settings are looked up
+SERVER_ARGS = {"db_name": "v1"}
+
+@pytest.fixture(scope="session")
+def server(tmp_path_factory):
+    '''
+    The stand-in server: {"path": ...} of the database native connections open, switchable per test
+    '''
+    state = {"path": str(tmp_path_factory.mktemp("server") / "synthetic.sqlite")}
+    synthetic.build(state["path"], tokens=20000, corpora=4)
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(native, "connect_to_childes",
+                      lambda db_version="current", db_args=None:
+                      local.add_sql_functions(sqlite3.connect(state["path"], check_same_thread=False)))
+        yield state
+
+@pytest.fixture(scope="session")
+def snapshot(server, tmp_path_factory):
+    '''
+    Path of a snapshot of the whole stand-in database, registered as "v1"
+    '''
+    path = str(tmp_path_factory.mktemp("snapshots") / "v1.sqlite")
+    return(childespy.snapshot("v1", path, db_args=SERVER_ARGS, backend="native"))
+
+@pytest.fixture(params=["native", "local"])
+def backend_args(request, server, snapshot):
+    '''
+    backend and db_args keyword arguments of a query function, for each Python backend
+    '''
+    db_args = SERVER_ARGS if request.param == "native" else {"path": snapshot}
+    return({"backend": request.param, "db_args": db_args})
+
+@pytest.fixture
+def reference(server):
+    '''
+    A function running SQL on the stand-in database directly, for expected results
+    '''
+    def read(sql, params=()):
+        with contextlib.closing(sqlite3.connect(server["path"])) as connection:
+            return(pd.read_sql_query(sql, connection, params=params))
+    return(read)
+
+@pytest.fixture(autouse=True)
+def no_cache():
+    childespy.disable_cache()
+    childespy.refresh_metadata()
+    yield
+    childespy.disable_cache()
+    childespy.refresh_metadata()
+
+class RFrame:
+    '''
+    A collected R data.frame
+    '''
+    rclass = ("data.frame",)
+
+    def __init__(self, df):
+        self.df = df
+
+class RemoteTbl:
+    '''
+    The remote dbplyr tbl childesr returns for a query on a given connection
+    '''
+    rclass = ("tbl_SQLiteConnection", "tbl_dbi", "tbl_sql", "tbl_lazy", "tbl")
+
+    def __init__(self, sql, connection):
+        self.sql = sql
+        self.connection = connection
+
+@pytest.fixture
+def fake_r(server, monkeypatch):
+    '''
+    Stands in for R: childesr, DBI and dplyr over sqlite connections to the stand-in database
+    '''
+    null = types.SimpleNamespace()
+    read = lambda sql, connection: RFrame(pd.read_sql_query(sql, connection))
+    connect = lambda db_version="current", db_args=None: sqlite3.connect(server["path"], check_same_thread=False)
+
+    def childesr_query(sql, connection, db_version, db_args):
+        if connection is not null:
+            return(RemoteTbl(sql, connection))
+        with contextlib.closing(connect()) as own_connection:
+            return(read(sql, own_connection))
+
+    packages = {
+        "DBI": types.SimpleNamespace(dbGetQuery=lambda connection, sql: read(sql, connection),
+                                     dbDisconnect=lambda connection: connection.close(),
+                                     dbIsValid=lambda connection: [True]),
+        "dplyr": types.SimpleNamespace(collect=lambda tbl: read(tbl.sql, tbl.connection))}
+    r = types.SimpleNamespace(
+        rinterface=types.SimpleNamespace(NULL=null, NA_Character=object(), NA_Logical=object(),
+                                         NA_Integer=object()),
+        ro=types.SimpleNamespace(packages=types.SimpleNamespace(importr=packages.__getitem__),
+                                 default_converter=0, conversion=types.SimpleNamespace(rpy2py=lambda frame: frame.df)),
+        pandas2ri=types.SimpleNamespace(converter=0), localconverter=lambda converter: contextlib.nullcontext(),
+        ListVector=dict, StrVector=list, FloatVector=list, BoolVector=list,
+        childesr=types.SimpleNamespace(
+            connect_to_childes=connect,
+            get_sql_query=childesr_query,
+            get_corpora=lambda connection, db_version, db_args:
+                childesr_query("SELECT * FROM corpus", connection, db_version, db_args)))
+    monkeypatch.setattr(core, "_r_session", r)
+    monkeypatch.setitem(core._arrow_transfer, "enabled", False)
+    return(r)
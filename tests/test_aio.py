@@ -0,0 +1,74 @@
+# async query functions
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+import childespy
+from childespy import aio
+
+def run(coroutine):
+    return(asyncio.run(coroutine))
+
+def test_query(backend_args):
+    async def query():
+        async with aio.AsyncClient(workers=2, **backend_args) as client:
+            return(await asyncio.gather(client.get_corpora(), client.get_tokens(token="dog")))
+    corpora, tokens = run(query())
+    assert corpora.equals(childespy.get_corpora(**backend_args))
+    assert tokens.equals(childespy.get_tokens(token="dog", **backend_args))
+
+class SlowCalls:
+    '''
+    Stands in for a session method, recording the calls that ran and how many overlapped
+    '''
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.started = []
+        self.running = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, corpus):
+        with self.lock:
+            self.started.append(corpus)
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(self.seconds)
+        with self.lock:
+            self.running -= 1
+        return(corpus)
+
+def test_concurrency_limit(backend_args):
+    calls = SlowCalls(0.05)
+
+    async def query():
+        async with aio.AsyncClient(workers=4, max_concurrency=2, **backend_args) as client:
+            client._session.get_transcripts = calls
+            return(await asyncio.gather(*[client.get_transcripts(corpus=i) for i in range(6)]))
+    assert run(query()) == list(range(6))
+    assert calls.peak == 2
+
+def test_timeout(backend_args):
+    calls = SlowCalls(0.3)
+
+    async def query():
+        async with aio.AsyncClient(workers=1, **backend_args) as client:
+            client._session.get_transcripts = calls
+            running = asyncio.ensure_future(client.get_transcripts(corpus="running"))
+            await asyncio.sleep(0.05)
+            #waits for the busy worker and times out before it starts
+            with pytest.raises(asyncio.TimeoutError):
+                await client.get_transcripts(corpus="queued", timeout=0.05)
+            return(await running)
+    assert run(query()) == "running"
+    assert calls.started == ["running"]
+
+def test_unknown_function(backend_args):
+    async def query():
+        async with aio.AsyncClient(**backend_args) as client:
+            await client.run("snapshot")
+    with pytest.raises(ValueError):
+        run(query())
@@ -0,0 +1,42 @@
+# R data.frames handed to pandas through Arrow
+
+import pandas as pd
+import pytest
+
+import childespy
+from childespy import childespy as core
+
+pa = pytest.importorskip("pyarrow")
+
+@pytest.fixture
+def arrow_r(fake_r, monkeypatch):
+    monkeypatch.setitem(core._arrow_transfer, "pyarrow_dtypes", False)
+    fake_r.to_arrow = lambda frame: pa.Table.from_pandas(frame.df, preserve_index=False)
+    return(fake_r)
+
+def corpora():
+    return(childespy.get_sql_query("SELECT * FROM corpus", backend="r"))
+
+def test_arrow_transfer(arrow_r, reference):
+    expected = reference("SELECT * FROM corpus")
+    childespy.set_arrow_transfer(True)
+    assert corpora().equals(expected)
+    childespy.set_arrow_transfer(True, pyarrow_dtypes=True)
+    assert isinstance(corpora()["name"].dtype, pd.ArrowDtype)
+
+def test_arrow_fallback(arrow_r, reference):
+    def unsupported(frame):
+        raise pa.ArrowInvalid("unsupported column")
+    arrow_r.to_arrow = unsupported
+    childespy.set_arrow_transfer("auto")
+    assert corpora().equals(reference("SELECT * FROM corpus"))
+    childespy.set_arrow_transfer(True)
+    with pytest.raises(pa.ArrowInvalid):
+        corpora()
+
+def test_arrow_missing(arrow_r):
+    arrow_r.to_arrow = None
+    with pytest.raises(ImportError):
+        childespy.set_arrow_transfer(True)
+    with pytest.raises(ValueError):
+        childespy.set_arrow_transfer("always")
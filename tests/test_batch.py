@@ -0,0 +1,29 @@
+# many token patterns in a few queries with get_tokens_batch
+
+import childespy
+
+def ids(df):
+    return(sorted(df["id"].astype("int64")))
+
+def test_tokens_batch_tags(backend_args):
+    patterns = ["dog", "doggie", "b%", "zzz"]
+    batch = childespy.get_tokens_batch(patterns, corpus="Corpus1", batch_size=2, **backend_args)
+    assert set(batch["pattern"]) == {"dog", "doggie", "b%"}
+    for pattern in patterns:
+        single = childespy.get_tokens(token=pattern, corpus="Corpus1", **backend_args)
+        assert ids(batch[batch["pattern"] == pattern]) == ids(single)
+    #ball, baby, book and bye all match "b%"
+    assert set(batch.loc[batch["pattern"] == "b%", "gloss"]) == {"ball", "baby", "book", "bye"}
+
+    by_pattern = childespy.get_tokens_batch(patterns, corpus="Corpus1", as_dict=True, **backend_args)
+    assert list(by_pattern) == patterns
+    assert len(by_pattern["zzz"]) == 0
+
+def test_tokens_batch_ignores_case(backend_args):
+    #exact patterns match like get_tokens' LIKE does, whatever their case
+    patterns = ["DOG", "Ball", "b%"]
+    batch = childespy.get_tokens_batch(patterns, corpus="Corpus2", **backend_args)
+    for pattern in patterns:
+        single = childespy.get_tokens(token=pattern, corpus="Corpus2", **backend_args)
+        assert len(single) > 0
+        assert ids(batch[batch["pattern"] == pattern]) == ids(single)
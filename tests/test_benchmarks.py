@@ -0,0 +1,32 @@
+# the end-to-end benchmark suite, run once per case on the snapshot
+
+import contextlib
+import sqlite3
+
+import pytest
+
+import suite
+import synthetic
+
+@pytest.mark.parametrize("case", sorted(suite.CASES))
+def test_measure(snapshot, case):
+    result = suite.measure(case, "local", {"path": snapshot}, repeat=2, warmup=1)
+    assert (result["case"], result["calls"]) == (case, 2)
+    assert result["rows"] > 0
+    assert result["min_seconds"] <= result["p50_seconds"] <= result["max_seconds"]
+    assert result["stage_seconds"]
+
+def test_compare():
+    before = {"results": [{"case": "get_tokens", "p50_seconds": 0.2, "peak_rss_bytes": 100},
+                          {"case": "get_types", "p50_seconds": 0.1, "peak_rss_bytes": 100}]}
+    after = {"results": [{"case": "get_tokens", "p50_seconds": 0.1, "peak_rss_bytes": 50}]}
+    assert suite.compare(before, after) == [{"case": "get_tokens", "p50_before_seconds": 0.2,
+                                             "p50_after_seconds": 0.1, "p50_ratio": 0.5,
+                                             "peak_rss_ratio": 0.5}]
+
+def test_synthetic_indexes(tmp_path):
+    path = str(tmp_path / "indexed.sqlite")
+    synthetic.build(path, tokens=500, corpora=2, indexes=True)
+    with contextlib.closing(sqlite3.connect(path)) as connection:
+        indexes = {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert "idx_token_gloss" in indexes
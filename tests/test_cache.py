@@ -0,0 +1,45 @@
+# the on-disk result cache
+
+import pandas as pd
+import pytest
+
+import childespy
+
+def test_cache_hit_and_miss(backend_args, tmp_path):
+    childespy.enable_cache(str(tmp_path))
+    first = childespy.get_tokens(token="dog", **backend_args)
+    stats = childespy.cache_stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (0, 1, 1)
+    second = childespy.get_tokens(token="dog", **backend_args)
+    assert childespy.cache_stats()["hits"] == 1
+    pd.testing.assert_frame_equal(first, second, check_dtype=False)
+    #other arguments are another entry
+    childespy.get_tokens(token="ball", **backend_args)
+    assert childespy.cache_stats()["misses"] == 2
+    assert childespy.invalidate_cache("get_tokens") == 2
+
+def test_cache_local_version_from_snapshot(snapshot, tmp_path):
+    cache = childespy.enable_cache(str(tmp_path))
+    childespy.get_corpora(backend="local", db_args={"path": snapshot})
+    #keyed on the version stored in the snapshot, without asking childesr for the current one
+    assert [path.split("/")[-2] for path, _, _ in cache.entries()] == ["v1"]
+
+def test_cache_evicts_least_recently_used(backend_args, tmp_path):
+    childespy.enable_cache(str(tmp_path), max_bytes=1)
+    childespy.get_tokens(token="dog", **backend_args)
+    childespy.get_tokens(token="ball", **backend_args)
+    stats = childespy.cache_stats()
+    assert (stats["evictions"], stats["entries"]) == (1, 1)
+    childespy.get_tokens(token="ball", **backend_args)
+    childespy.get_tokens(token="dog", **backend_args)
+    assert (childespy.cache_stats()["hits"], childespy.cache_stats()["misses"]) == (1, 3)
+
+def test_cache_write_failure_still_returns(backend_args, tmp_path, monkeypatch):
+    cache = childespy.enable_cache(str(tmp_path))
+
+    def full_disk(path, result):
+        raise OSError(28, "No space left on device")
+    monkeypatch.setattr(cache, "put", full_disk)
+    with pytest.warns(UserWarning, match="No space left"):
+        tokens = childespy.get_tokens(token="dog", **backend_args)
+    assert len(tokens) > 0
@@ -0,0 +1,25 @@
+# dtypes shrunk by compact_dtypes
+
+import pandas as pd
+
+import childespy
+
+def test_compact_dtypes_round_trip(backend_args, tmp_path):
+    tokens = childespy.get_tokens(token="%", corpus=["Corpus1", "Corpus2"], **backend_args)
+    compacted = childespy.compact_dtypes(tokens)
+    assert compacted.attrs["compact"]["bytes_saved"] > 0
+    assert isinstance(compacted["speaker_role"].dtype, pd.CategoricalDtype)
+    assert compacted["target_child_age"].dtype == "float32"
+    for column in tokens.columns:
+        if column == "target_child_age":
+            assert (compacted[column].astype("float64") - tokens[column]).abs().max() < 1e-4
+        else:
+            assert compacted[column].astype(object).equals(tokens[column].astype(object)), column
+
+    #compact results survive the cache with their dtypes
+    childespy.enable_cache(str(tmp_path))
+    stored = childespy.get_tokens(token="%", corpus=["Corpus1", "Corpus2"], compact=True, **backend_args)
+    loaded = childespy.get_tokens(token="%", corpus=["Corpus1", "Corpus2"], compact=True, **backend_args)
+    assert childespy.cache_stats()["hits"] == 1
+    pd.testing.assert_frame_equal(stored, loaded)
+    assert isinstance(loaded["speaker_role"].dtype, pd.CategoricalDtype)
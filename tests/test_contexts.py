@@ -0,0 +1,35 @@
+# contexts computed from an utterance-order index
+
+import pytest
+
+import childespy
+
+def expected_contexts(utterances, hit_ids, before, after):
+    #the rows of every window, one target at a time
+    rows = []
+    for hit in sorted(hit_ids):
+        target = utterances.loc[utterances["id"] == hit].iloc[0]
+        window = utterances[(utterances["transcript_id"] == target["transcript_id"]) &
+                            (utterances["utterance_order"] >= target["utterance_order"] - before) &
+                            (utterances["utterance_order"] <= target["utterance_order"] + after)]
+        rows += [(hit, i) for i in window["id"]]
+    return(rows)
+
+@pytest.mark.parametrize("window", [[0, 0], [2, 1]])
+def test_contexts(backend_args, reference, window):
+    utterances = reference("SELECT id, transcript_id, utterance_order FROM utterance WHERE corpus_name = 'Corpus3'")
+    hit_ids = reference("SELECT DISTINCT utterance_id FROM token WHERE gloss = 'juice' "
+                        "AND corpus_name = 'Corpus3'")["utterance_id"]
+    expected = expected_contexts(utterances, hit_ids, *window)
+
+    contexts = childespy.get_contexts(token="juice", corpus="Corpus3", window=window,
+                                      remove_duplicates=False, **backend_args)
+    assert sorted(zip(contexts["context_id"], contexts["id"])) == sorted(expected)
+
+    deduplicated = childespy.get_contexts(token="juice", corpus="Corpus3", window=window, **backend_args)
+    assert deduplicated["id"].is_unique
+    first = {}
+    for context_id, i in sorted(expected):
+        first.setdefault(i, context_id)
+    assert sorted(zip(deduplicated["context_id"], deduplicated["id"])) == sorted(
+        (context_id, i) for i, context_id in first.items())
@@ -0,0 +1,41 @@
+# filter arguments converted to R vectors
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from childespy import childespy as core
+
+@pytest.mark.parametrize("values, kind, expected", [
+    (["Brown", "Providence"], "str", ["Brown", "Providence"]),
+    (("Brown",), "str", ["Brown"]),
+    (pd.Index(["Mother", "Father"]), "str", ["Mother", "Father"]),
+    (np.array(["a", "b"]), "str", ["a", "b"]),
+    ([], "str", []),
+    ([12, 24.5], "float", [12.0, 24.5]),
+    (range(3), "float", [0.0, 1.0, 2.0]),
+    (np.array([[1, 2], [3, 4]], dtype=np.int32), "float", [1.0, 2.0, 3.0, 4.0]),
+    (pd.Series([True, False]), "bool", [True, False]),
+])
+def test_vector_values(values, kind, expected):
+    inferred, converted = core._r_vector_values(values)
+    assert inferred == kind
+    assert list(converted) == expected
+    if kind == "float":
+        assert converted.dtype == np.float64 and converted.flags["C_CONTIGUOUS"]
+
+def test_mixed_values():
+    with pytest.raises(TypeError):
+        core._r_vector_values(["Brown", 1])
+
+def test_convert_r_vector(fake_r):
+    assert core.convert_r_vector(None) is fake_r.rinterface.NULL
+    assert core.convert_r_vector("Brown") == ["Brown"]
+    assert core.convert_r_vector(24) == [24.0]
+    assert core.convert_r_vector(True) == [True]
+    assert core.convert_r_vector({"host": "h"}) == {"host": "h"}
+    assert core.convert_r_vector({"Brown", "Brown"}) == ["Brown"]
+    assert list(core.convert_r_vector(np.array([1, 2]))) == [1.0, 2.0]
+    assert core.convert_r_vector(pd.Series([False, True])) == [False, True]
+    with pytest.raises(TypeError):
+        core.convert_r_vector(object())
@@ -0,0 +1,56 @@
+# the precomputed word frequency index
+
+import numpy as np
+import pytest
+
+import childespy
+
+@pytest.fixture
+def index(backend_args):
+    return(childespy.FrequencyIndex.build(chunk_size=500, **backend_args))
+
+def total(reference, where, params=()):
+    return(int(reference(f"SELECT COALESCE(SUM(count), 0) AS n FROM token_frequency WHERE {where}", params)["n"][0]))
+
+def test_counts(index, reference):
+    assert index.db_version == "v1"
+    assert index.frequency("dog") == total(reference, "gloss = 'dog'")
+    assert index.frequency("dog", corpus="Corpus2", role=["Mother", "Father"]) == total(
+        reference, "gloss = 'dog' AND corpus_name = 'Corpus2' AND speaker_role IN ('Mother', 'Father')")
+    assert index.frequency("dog", age=[24, 36]) == total(
+        reference, "gloss = 'dog' AND target_child_age >= 24 AND target_child_age < 36")
+    assert index.frequency("dog", age=30) == index.frequency("dog", age=[30, 36])
+    assert index.frequency("zzz") == 0 and "zzz" not in index
+    assert int(index.count.sum()) == total(reference, "gloss IS NOT NULL")
+
+def test_trajectory(index, reference):
+    trajectory = index.trajectory("ball", role="Target_Child")
+    expected = reference("SELECT CAST(target_child_age / 6 AS INTEGER) * 6 AS age, SUM(count) AS n "
+                         "FROM token_frequency WHERE gloss = 'ball' AND speaker_role = 'Target_Child' "
+                         "AND target_child_age IS NOT NULL GROUP BY 1 ORDER BY 1")
+    assert list(trajectory.index) == list(expected["age"])
+    assert list(trajectory) == list(expected["n"])
+
+def test_save_and_load(index, tmp_path):
+    path = index.save(str(tmp_path / "freq"))
+    for mmap in (True, False):
+        loaded = childespy.FrequencyIndex.load(path, mmap=mmap)
+        assert (loaded.db_version, loaded.key, loaded.bin_months) == ("v1", "gloss", 6)
+        assert loaded.to_frame().equals(index.to_frame())
+        assert loaded.frequency("dog", corpus="Corpus1") == index.frequency("dog", corpus="Corpus1")
+    #saving again replaces the index
+    index.save(path)
+    assert np.array_equal(childespy.FrequencyIndex.load(path).words, index.words)
+
+def test_stems(backend_args, reference):
+    index = childespy.FrequencyIndex.build(key="stem", corpus="Corpus3", **backend_args)
+    stem = reference("SELECT stem FROM token WHERE corpus_name = 'Corpus3' AND stem IS NOT NULL LIMIT 1")["stem"][0]
+    expected = reference("SELECT COUNT(*) AS n FROM token WHERE corpus_name = 'Corpus3' AND stem = ?", (stem,))
+    assert index.frequency(stem) == expected["n"][0]
+    assert index.corpora == ["Corpus3"]
+    with pytest.raises(ValueError):
+        childespy.FrequencyIndex.build(key="lemma", **backend_args)
+
+def test_build_r(fake_r, reference):
+    index = childespy.FrequencyIndex.build(db_args={"db_name": "v1"}, chunk_size=1000, backend="r")
+    assert index.frequency("dog") == total(reference, "gloss = 'dog'")
@@ -0,0 +1,10 @@
+# importing childespy must not start R
+
+import import_time
+
+import childespy
+
+def test_import_does_not_load_r():
+    times, overheads, loaded_r = import_time.time_import(repeat=1)
+    assert not loaded_r
+    assert repr(childespy.childesr) == "<R package 'childesr', loaded on first use>"
@@ -0,0 +1,28 @@
+# per-call records of the query functions
+
+import childespy
+
+def test_records(backend_args):
+    records = []
+    childespy.reset_stats()
+    childespy.add_hook(records.append)
+    try:
+        tokens = childespy.get_tokens(token="dog", **backend_args)
+        childespy.check_connection(db_args=backend_args["db_args"], backend=backend_args["backend"])
+    finally:
+        childespy.remove_hook(records.append)
+    #connection helpers are not queries
+    assert [record["function"] for record in records] == ["get_tokens"]
+    record = records[0]
+    assert (record["backend"], record["rows"], record["error"]) == (backend_args["backend"], len(tokens), None)
+    assert "query" in record["stages"]
+    stats = childespy.stats()
+    assert stats.loc["get_tokens", "calls"] == 1
+    assert stats.loc["get_tokens", "rows"] == len(tokens)
+
+def test_session_metrics_labels(backend_args):
+    with childespy.ChildesSession(**backend_args) as session:
+        session.get_corpora()
+        metrics = session.metrics()
+    assert list(metrics["pools"]) == [f"v1@{backend_args['backend']}"]
+    assert metrics["checkouts"] == 1
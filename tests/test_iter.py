@@ -0,0 +1,35 @@
+# chunked iter_tokens and iter_utterances
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import childespy
+
+def ids(df):
+    return(sorted(df["id"].astype("int64")))
+
+def test_iter_tokens_chunks(backend_args):
+    whole = childespy.get_tokens(token="%", corpus="Corpus1", **backend_args)
+    chunks = list(childespy.iter_tokens(token="%", corpus="Corpus1", chunk_size=1000, **backend_args))
+    assert [len(chunk) for chunk in chunks[:-1]] == [1000] * (len(chunks) - 1)
+    assert 0 < len(chunks[-1]) <= 1000
+    streamed = pd.concat(chunks, ignore_index=True)
+    assert np.all(np.diff(streamed["id"].to_numpy()) > 0)
+    assert ids(streamed) == ids(whole)
+
+def test_iter_tokens_exact_multiple(backend_args, reference):
+    total = len(reference("SELECT id FROM token WHERE gloss = 'dog' AND corpus_name = 'Corpus2'"))
+    chunks = list(childespy.iter_tokens(token="dog", corpus="Corpus2", replace=False,
+                                        chunk_size=total, **backend_args))
+    assert [len(chunk) for chunk in chunks] == [total]
+    with pytest.raises(ValueError):
+        next(childespy.iter_tokens(token="dog", chunk_size=0, **backend_args))
+
+def test_iter_utterances_r(fake_r, reference):
+    #pages come back collected from the R connection
+    chunks = list(childespy.iter_utterances(corpus="Corpus2", chunk_size=500, backend="r"))
+    assert all(isinstance(chunk, pd.DataFrame) for chunk in chunks)
+    assert [len(chunk) for chunk in chunks[:-1]] == [500] * (len(chunks) - 1)
+    expected = reference("SELECT id FROM utterance WHERE corpus_name = 'Corpus2'")
+    assert ids(pd.concat(chunks)) == ids(expected)
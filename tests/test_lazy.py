@@ -0,0 +1,45 @@
+# lazy queries built by chaining and run as one statement
+
+import contextlib
+import sqlite3
+
+import pytest
+
+import childespy
+
+def test_sql():
+    query = childespy.tokens(token="dog", corpus=["Corpus1", "Corpus2"], replace=False) \
+        .where("target_child_age < ?", 24).where(speaker_role=["Mother", "Father"]) \
+        .groupby("corpus_name").count().order_by("n", descending=True).limit(5)
+    sql, params = query.sql()
+    assert sql.startswith("SELECT corpus_name, COUNT(*) AS n FROM token WHERE ")
+    assert sql.endswith(" GROUP BY corpus_name ORDER BY n DESC LIMIT 5")
+    assert params.count("dog") == 1 and 24 in params and "Mother" in params
+    #chained calls leave the query they start from untouched
+    base = childespy.table("participant")
+    base.where(role="Mother")
+    assert base.sql() == ("SELECT * FROM participant", [])
+    with pytest.raises(ValueError):
+        base.select("name; DROP TABLE participant")
+    with pytest.raises(ValueError):
+        base.agg(n="median(age)")
+    with pytest.raises(ValueError):
+        base.groupby("role").sql()
+
+def test_collect(backend_args, reference):
+    counts = childespy.tokens(token="%", corpus="Corpus1", replace=False, **backend_args) \
+        .groupby("speaker_role").agg(n="count(*)", types="count(distinct gloss)").order_by("speaker_role").collect()
+    expected = reference("SELECT speaker_role, COUNT(*) AS n, COUNT(DISTINCT gloss) AS types FROM token "
+                         "WHERE corpus_name = 'Corpus1' GROUP BY speaker_role ORDER BY speaker_role")
+    assert counts.astype(expected.dtypes.to_dict()).equals(expected)
+
+    #the replaced gloss, like get_tokens
+    lazy = childespy.tokens(token="doggie", **backend_args).collect()
+    assert sorted(lazy["id"]) == sorted(childespy.get_tokens(token="doggie", **backend_args)["id"])
+    assert set(lazy["gloss"]) == {"doggie"}
+
+def test_collect_r_connection(fake_r, server, reference):
+    #a query on a given R connection comes back collected
+    with contextlib.closing(sqlite3.connect(server["path"])) as connection:
+        result = childespy.table("corpus", connection=connection, backend="r").select("id", "name").collect()
+    assert sorted(result["id"]) == sorted(reference("SELECT id FROM corpus")["id"])
@@ -0,0 +1,33 @@
+# snapshots of a db version in a local sqlite file
+
+import contextlib
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import childespy
+from childespy import local
+
+def read_table(path, table):
+    with contextlib.closing(sqlite3.connect(path)) as connection:
+        return(pd.read_sql_query(f"SELECT * FROM {table} ORDER BY id", connection))
+
+def test_snapshot(snapshot, server):
+    info = local.snapshot_info(snapshot)
+    assert info["db_version"] == "v1"
+    for table in local.TABLES:
+        pd.testing.assert_frame_equal(read_table(snapshot, table), read_table(server["path"], table),
+                                      check_dtype=False)
+    with contextlib.closing(sqlite3.connect(snapshot)) as connection:
+        indexes = {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert "idx_token_gloss" in indexes
+
+def test_snapshot_lookup(snapshot, tmp_path, monkeypatch):
+    #snapshots are registered under their db version
+    assert local.snapshot_path("v1") == snapshot
+    corpora = childespy.get_corpora(db_version="v1", backend="local")
+    assert corpora.equals(childespy.get_corpora(backend="local", db_args={"path": snapshot}))
+    monkeypatch.setenv("CHILDESPY_SNAPSHOT_DIR", str(tmp_path))
+    with pytest.raises(FileNotFoundError, match="childespy.snapshot"):
+        childespy.get_corpora(db_version="v404", backend="local")
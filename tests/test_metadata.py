@@ -0,0 +1,58 @@
+# the TTL cache of db info, collections and corpora
+
+import time
+
+import pytest
+
+import childespy
+from childespy import metadata
+
+@pytest.fixture(autouse=True)
+def restore_settings():
+    yield
+    metadata.set_metadata_ttl(metadata.DEFAULT_TTL)
+    childespy.set_name_validation(False)
+
+def test_lookup_maps(backend_args, reference):
+    meta = childespy.get_metadata(**backend_args)
+    corpora = reference("SELECT id, name, collection_name FROM corpus")
+    assert meta.corpus_ids == dict(zip(corpora["name"], corpora["id"]))
+    collection = corpora["collection_name"][0]
+    assert sorted(meta.expand(collection)) == sorted(corpora.loc[corpora["collection_name"] == collection, "name"])
+    meta.validate(corpus=["Corpus1", "Corpus2"])
+    with pytest.raises(ValueError, match="did you mean 'Corpus1'"):
+        meta.validate(corpus="Corpus01")
+
+def test_tables_served_from_cache(backend_args):
+    cache = metadata.default_cache
+    first = childespy.get_corpora(**backend_args)
+    misses = cache.stats()["misses"]
+    second = childespy.get_corpora(**backend_args)
+    assert cache.stats()["misses"] == misses
+    assert second.equals(first)
+    #callers get their own copy
+    second.drop(second.index, inplace=True)
+    assert childespy.get_corpora(**backend_args).equals(first)
+
+def test_ttl_expiry_and_refresh(backend_args):
+    cache = metadata.default_cache
+    childespy.get_metadata(**backend_args)
+    loaded = cache.stats()["misses"]
+    childespy.get_metadata(**backend_args)
+    assert cache.stats()["misses"] == loaded
+    childespy.set_metadata_ttl(0.01)
+    time.sleep(0.02)
+    childespy.get_metadata(**backend_args)
+    assert cache.stats()["misses"] > loaded
+    childespy.set_metadata_ttl(None)
+    reloaded = cache.stats()["misses"]
+    childespy.refresh_metadata("current")
+    childespy.get_metadata(**backend_args)
+    assert cache.stats()["misses"] > reloaded
+
+def test_name_validation(backend_args):
+    assert len(childespy.get_tokens(token="dog", corpus="Corpus01", **backend_args)) == 0
+    childespy.set_name_validation()
+    with pytest.raises(ValueError, match="unknown corpus 'Corpus01'"):
+        childespy.get_tokens(token="dog", corpus="Corpus01", **backend_args)
+    assert len(childespy.get_tokens(token="dog", corpus="Corpus1", **backend_args)) > 0
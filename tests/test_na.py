@@ -0,0 +1,41 @@
+# R NA values replaced column by column
+
+import numpy as np
+import pandas as pd
+
+from childespy.childespy import R_NA_INTEGER, replace_na
+
+class NACharacter(str):
+    '''
+    Stands in for rpy2's NA_character_, a str equal to "NA_character_"
+    '''
+    def __new__(cls):
+        return(super().__new__(cls, "NA_character_"))
+
+class NALogical:
+    '''
+    Stands in for rpy2's NA_logical
+    '''
+
+def test_replace_na():
+    na_character, na_logical = NACharacter(), NALogical()
+    df = pd.DataFrame({"gloss": pd.Series(["dog", na_character, "NA_character_"], dtype=object, index=[10, 11, 12]),
+                       "flag": [True, na_logical, False],
+                       "count": np.array([1, R_NA_INTEGER, 3], dtype=np.int32),
+                       "age": [1.5, np.nan, 3.0]}, index=[10, 11, 12])
+    replaced = replace_na(df, na_values=(na_character, na_logical))
+    #a real "NA_character_" string stays
+    assert replaced["gloss"].isna().tolist() == [False, True, False]
+    assert replaced["gloss"][12] == "NA_character_"
+    assert replaced["flag"].dtype == "boolean"
+    assert replaced["flag"].isna().tolist() == [False, True, False]
+    assert replaced["count"].dtype == "Int32"
+    assert replaced["count"].isna().tolist() == [False, True, False]
+    assert replaced["age"].equals(df["age"])
+    assert list(replaced.index) == [10, 11, 12]
+
+def test_replace_na_untouched():
+    df = pd.DataFrame({"gloss": ["dog", "NA_character_"], "count": np.array([1, 2], dtype=np.int64)})
+    replaced = replace_na(df, na_values=(NACharacter(),))
+    assert replaced.equals(df)
+    assert replace_na(df, na_integer=None).equals(df)
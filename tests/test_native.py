@@ -0,0 +1,33 @@
+# the native backend's server settings, read without R
+
+import json
+
+import pytest
+
+import childespy
+from childespy import native
+
+@pytest.fixture
+def db_info(tmp_path, monkeypatch):
+    path = tmp_path / "childes-db.json"
+    path.write_text(json.dumps({"host": "db.example.org", "user": "childes", "password": "secret",
+                                "current": "2021.1", "supported": ["2020.1", "2021.1"]}))
+    monkeypatch.setattr(native, "DB_INFO_URL", path.as_uri())
+
+def test_get_db_info(db_info):
+    info = childespy.get_db_info(backend="native")
+    assert info["current"] == ["2021.1"]
+    assert info["supported"] == ["2020.1", "2021.1"]
+
+def test_resolve_db_args(db_info):
+    assert native.resolve_db_args() == {"host": "db.example.org", "user": "childes",
+                                        "password": "secret", "db_name": "2021.1"}
+    assert native.resolve_db_args("2020.1")["db_name"] == "2020.1"
+    #given settings win, and a named database needs no lookup
+    assert native.resolve_db_args("current", {"host": "mirror", "user": "u", "password": "p"})["host"] == "mirror"
+    assert native.resolve_db_args("current", {"db_name": "v1"}) == {"db_name": "v1"}
+
+def test_db_info_unreachable(tmp_path, monkeypatch):
+    monkeypatch.setattr(native, "DB_INFO_URL", (tmp_path / "missing.json").as_uri())
+    with pytest.raises(ConnectionError, match="db_args"):
+        native.get_db_info()
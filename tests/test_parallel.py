@@ -0,0 +1,62 @@
+# queries split on one filter and run in worker processes
+
+import pandas as pd
+import pytest
+
+import childespy
+from childespy import parallel
+
+class InProcessPool:
+    '''
+    Stands in for the process pool, running the parts here, where the stand-in server is patched in,
+    and finishing them in reverse order
+    '''
+    def __init__(self, max_workers=None, mp_context=None, initializer=None, initargs=()):
+        initializer(*initargs)
+
+    def __enter__(self):
+        return(self)
+
+    def __exit__(self, *exc_info):
+        parallel._worker_session.close()
+
+    def map(self, function, *iterables):
+        parts = list(zip(*iterables))
+        results = {i: function(*part) for i, part in reversed(list(enumerate(parts)))}
+        return(iter([results[i] for i in range(len(parts))]))
+
+@pytest.fixture
+def in_process(monkeypatch):
+    monkeypatch.setattr(parallel.concurrent.futures, "ProcessPoolExecutor", InProcessPool)
+
+@pytest.mark.parametrize("batch_size", [1, 2])
+def test_merge_order(in_process, server, batch_size):
+    corpora = ["Corpus3", "Corpus1", "Corpus4"]
+    result = childespy.parallel_query(childespy.get_tokens, "corpus", corpora, batch_size=batch_size,
+                                      token="dog", db_args={"db_name": "v1"}, backend="native")
+    expected = pd.concat([childespy.get_tokens(token="dog", corpus=batch, db_args={"db_name": "v1"},
+                                               backend="native")
+                          for batch in parallel.split_values(corpora, batch_size)], ignore_index=True)
+    assert result.equals(expected)
+    if batch_size == 1:
+        assert list(result["corpus_name"].drop_duplicates()) == corpora
+
+def test_arguments(in_process, server):
+    with pytest.raises(ValueError):
+        childespy.parallel_query("get_corpora", "corpus", ["Corpus1"])
+    with pytest.raises(ValueError):
+        childespy.parallel_query("get_tokens", "backend", ["native"], token="dog")
+    with pytest.raises(TypeError):
+        childespy.parallel_query("get_tokens", "corpus", ["Corpus1"], corpus=["Corpus2"], token="dog")
+    empty = childespy.parallel_query("get_tokens", "corpus", ["Corpus404"], token="dog",
+                                     db_args={"db_name": "v1"}, backend="native")
+    assert len(empty) == 0
+
+def test_worker_processes(snapshot):
+    #spawned workers querying a snapshot, with nothing patched in
+    corpora = ["Corpus2", "Corpus1"]
+    result = childespy.parallel_query("get_utterances", "corpus", corpora, processes=2,
+                                      backend="local", db_args={"path": snapshot})
+    expected = pd.concat([childespy.get_utterances(corpus=corpus, backend="local", db_args={"path": snapshot})
+                          for corpus in corpora], ignore_index=True)
+    assert result.equals(expected)
@@ -0,0 +1,41 @@
+# the query functions on the Python backends against the synthetic database
+
+import pytest
+
+import childespy
+
+def ids(df):
+    return(sorted(df["id"].astype("int64")))
+
+def test_corpora(backend_args, reference):
+    corpora = childespy.get_corpora(**backend_args)
+    assert ids(corpora) == ids(reference("SELECT id FROM corpus"))
+
+def test_tokens_role_exclude(backend_args, reference):
+    tokens = childespy.get_tokens(token="ball", role_exclude=["Mother", "Father"], **backend_args)
+    expected = reference("SELECT id FROM token WHERE gloss = 'ball' AND speaker_role NOT IN ('Mother', 'Father')")
+    assert len(tokens) > 0
+    assert ids(tokens) == ids(expected)
+    assert set(tokens["speaker_role"]) == {"Target_Child"}
+
+@pytest.mark.parametrize("age, low, high", [(24, 24, 25), ([12, 20], 12, 20)])
+def test_tokens_age(backend_args, reference, age, low, high):
+    tokens = childespy.get_tokens(token="%", age=age, **backend_args)
+    expected = reference("SELECT id FROM token WHERE target_child_age >= ? AND target_child_age < ?", (low, high))
+    assert len(tokens) > 0
+    assert ids(tokens) == ids(expected)
+
+def test_participants_age_range(backend_args, reference):
+    participants = childespy.get_participants(age=30, **backend_args)
+    expected = reference("SELECT id FROM participant WHERE min_age <= 30 AND max_age >= 30")
+    assert ids(participants) == ids(expected)
+
+def test_tokens_replace(backend_args, reference):
+    replaced = childespy.get_tokens(token="doggie", **backend_args)
+    expected = reference("SELECT id FROM token WHERE replacement = 'doggie'")
+    assert len(replaced) > 0
+    assert ids(replaced) == ids(expected)
+    assert set(replaced["gloss"]) == {"doggie"}
+    assert len(childespy.get_tokens(token="doggie", replace=False, **backend_args)) == 0
+    glosses = childespy.get_tokens(token="dog", replace=False, **backend_args)
+    assert ids(glosses) == ids(reference("SELECT id FROM token WHERE gloss = 'dog'"))
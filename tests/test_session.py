@@ -0,0 +1,121 @@
+# connection pools and sessions
+
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+import childespy
+from childespy.session import ConnectionPool
+
+class Connections:
+    '''
+    Numbered stand-in connections, recording which are open
+    '''
+    def __init__(self):
+        self.opened = 0
+        self.open = set()
+        self.broken = set()
+        self.lock = threading.Lock()
+
+    def connect(self):
+        with self.lock:
+            self.opened += 1
+            self.open.add(self.opened)
+            return(self.opened)
+
+    def close(self, connection):
+        with self.lock:
+            self.open.discard(connection)
+
+    def is_valid(self, connection):
+        return(connection not in self.broken)
+
+    def pool(self, **kwargs):
+        return(ConnectionPool(self.connect, self.close, self.is_valid, **kwargs))
+
+def test_pool_reuses_connections():
+    connections = Connections()
+    pool = connections.pool(size=2)
+    with pool.connection() as first:
+        with pool.connection() as second:
+            assert first != second
+    with pool.connection() as again:
+        assert again in (first, second)
+    metrics = pool.metrics()
+    assert (metrics["checkouts"], metrics["connects"], metrics["open"], metrics["in_use"]) == (3, 2, 2, 0)
+    pool.close()
+    assert connections.open == set()
+    with pytest.raises(RuntimeError):
+        pool.acquire()
+
+def test_pool_replaces_broken_and_expired():
+    connections = Connections()
+    pool = connections.pool(size=1, recycle=None)
+    with pool.connection() as first:
+        pass
+    connections.broken.add(first)
+    with pool.connection() as second:
+        assert second != first
+    assert first not in connections.open
+
+    pool = connections.pool(size=1, recycle=0.01)
+    with pool.connection() as first:
+        pass
+    time.sleep(0.02)
+    with pool.connection() as second:
+        assert second != first
+    assert pool.metrics()["reconnects"] == 1
+
+def test_pool_timeout():
+    pool = Connections().pool(size=1, timeout=0.01)
+    with pool.connection():
+        with pytest.raises(TimeoutError):
+            pool.acquire()
+    assert pool.metrics()["waits"] == 1
+
+def test_pool_threads():
+    #never more than `size` connections in use, however many threads share the pool
+    connections = Connections()
+    pool = connections.pool(size=3)
+    in_use, peak = set(), []
+    lock = threading.Lock()
+
+    def work():
+        for _ in range(20):
+            with pool.connection() as connection:
+                with lock:
+                    assert connection not in in_use
+                    in_use.add(connection)
+                    peak.append(len(in_use))
+                time.sleep(0.001)
+                with lock:
+                    in_use.remove(connection)
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(peak) <= 3
+    assert connections.opened == 3
+    assert pool.metrics()["checkouts"] == 160
+
+def test_session_native(server, reference):
+    with childespy.ChildesSession(db_args={"db_name": "v1"}, backend="native", pool_size=2) as session:
+        corpora = session.get_corpora()
+        tokens = session.get_tokens(token="dog", corpus="Corpus1", replace=False)
+        with pytest.raises(TypeError):
+            session.get_corpora(connection=None)
+        assert session.metrics()["connects"] == 1
+    assert sorted(corpora["id"]) == sorted(reference("SELECT id FROM corpus")["id"])
+    assert len(tokens) == len(reference("SELECT id FROM token WHERE gloss = 'dog' AND corpus_name = 'Corpus1'"))
+
+def test_session_r(fake_r, reference):
+    #queries on pooled R connections come back collected
+    with childespy.ChildesSession(db_args={"db_name": "v1"}, backend="r") as session:
+        corpora = session.get_corpora()
+        utterances = session.get_sql_query("SELECT id FROM utterance WHERE corpus_name = 'Corpus4'")
+    assert isinstance(corpora, pd.DataFrame)
+    assert sorted(corpora["id"]) == sorted(reference("SELECT id FROM corpus")["id"])
+    assert len(utterances) == len(reference("SELECT id FROM utterance WHERE corpus_name = 'Corpus4'"))
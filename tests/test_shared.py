@@ -0,0 +1,45 @@
+# results written to Arrow IPC files and read back through SharedResult
+
+import pickle
+
+import pytest
+
+import childespy
+
+pytest.importorskip("pyarrow")
+
+@pytest.fixture
+def handle(backend_args, tmp_path):
+    return(childespy.get_tokens(token="%", output=str(tmp_path / "tokens.arrow"), **backend_args))
+
+def test_output_matches_dataframe(handle, backend_args):
+    tokens = childespy.get_tokens(token="%", **backend_args)
+    assert len(handle) == len(tokens)
+    assert list(handle.to_pandas()["id"]) == list(tokens["id"])
+    assert sorted(handle.values("corpus_name")) == sorted(tokens["corpus_name"].unique())
+    assert "speaker_role" not in handle.index["ranges"]
+
+def test_select(handle, backend_args):
+    tokens = childespy.get_tokens(token="%", **backend_args)
+    selected = handle.to_pandas(corpus_name=["Corpus1", "Corpus3"], transcript_id=[1, 2, 31],
+                                speaker_role="Mother")
+    expected = tokens[tokens["corpus_name"].isin(["Corpus1", "Corpus3"]) & tokens["transcript_id"].isin([1, 2, 31]) &
+                      (tokens["speaker_role"] == "Mother")]
+    assert len(selected) > 0
+    assert list(selected["id"]) == list(expected["id"])
+    #only masked columns
+    assert handle.select(speaker_role=["Mother", "Father"]).num_rows == tokens["speaker_role"].isin(
+        ["Mother", "Father"]).sum()
+    assert handle.select(corpus_name="Corpus404").num_rows == 0
+    with pytest.raises(ValueError):
+        handle.select(no_such_column=1)
+
+def test_pickled_handle(handle):
+    copy = pickle.loads(pickle.dumps(handle))
+    assert copy.path == handle.path
+    assert copy.select(corpus_name="Corpus2").equals(handle.select(corpus_name="Corpus2"))
+
+def test_empty_output(backend_args, tmp_path):
+    empty = childespy.get_tokens(token="zzz", output=str(tmp_path / "empty.arrow"), **backend_args)
+    assert len(empty) == 0
+    assert "gloss" in empty.table().column_names
@@ -0,0 +1,56 @@
+# snapshots synced to a new db version
+
+import contextlib
+import shutil
+import sqlite3
+
+import pandas as pd
+
+import childespy
+from childespy import local
+
+def read_table(path, table):
+    with contextlib.closing(sqlite3.connect(path)) as connection:
+        return(pd.read_sql_query(f"SELECT * FROM {table} ORDER BY id", connection))
+
+def new_version(path):
+    #transcript 2 removed, every gloss of transcript 3 edited in place, the
+    #filename of transcript 4 changed and transcript 999 added
+    with contextlib.closing(sqlite3.connect(path)) as connection:
+        for table in ["transcript_by_speaker", "utterance", "token", "token_frequency"]:
+            connection.execute(f"DELETE FROM {table} WHERE transcript_id = 2")
+        connection.execute("DELETE FROM transcript WHERE id = 2")
+        connection.execute("UPDATE token SET gloss = gloss || 's' WHERE transcript_id = 3")
+        connection.execute("UPDATE transcript SET filename = 'renamed.cha' WHERE id = 4")
+        added = pd.read_sql_query("SELECT * FROM transcript WHERE id = 1", connection).assign(id=999)
+        added.to_sql("transcript", connection, if_exists="append", index=False)
+        for table, offset in [("utterance", 1000000), ("token", 1000000)]:
+            rows = pd.read_sql_query(f"SELECT * FROM {table} WHERE transcript_id = 1", connection)
+            rows.assign(id=rows["id"] + offset, transcript_id=999).to_sql(
+                table, connection, if_exists="append", index=False)
+        connection.commit()
+
+def test_sync(server, snapshot, tmp_path, monkeypatch):
+    source = str(tmp_path / "v2-source.sqlite")
+    shutil.copy(server["path"], source)
+    new_version(source)
+    monkeypatch.setitem(server, "path", source)
+
+    report = childespy.sync(snapshot, "v2", path=str(tmp_path / "v2.sqlite"),
+                            batch_size=2, db_args={"db_name": "v2"}, backend="native")
+    status = dict(zip(report["transcripts"]["id"], report["transcripts"]["status"]))
+    assert status == {2: "removed", 3: "changed", 4: "changed", 999: "added"}
+    assert report["unchanged"] == len(read_table(server["path"], "transcript")) - 3
+    assert (report["db_version"], report["previous_db_version"]) == ("v2", "v1")
+    assert local.snapshot_info(report["path"])["synced_from"] == "v1"
+
+    fresh = childespy.snapshot("v2", str(tmp_path / "fresh.sqlite"), db_args={"db_name": "v2"}, backend="native")
+    for table in local.TABLES:
+        pd.testing.assert_frame_equal(read_table(report["path"], table), read_table(fresh, table))
+    assert len(childespy.get_tokens(token="balls", backend="local", db_args={"path": report["path"]})) > 0
+
+def test_sync_unchanged(snapshot, tmp_path):
+    report = childespy.sync(snapshot, "v1", path=str(tmp_path / "again.sqlite"),
+                            db_args={"db_name": "v1"}, backend="native")
+    assert len(report["transcripts"]) == 0
+    assert report["rows"]["token"] == 0